@@ -0,0 +1,45 @@
+# analysis_engines.py - Pluggable engines behind analyze_comprehensive_performance_enhanced
+# An engine is a function (raw_df, sections) that yields (section, result)
+# pairs for the planned sections, in SECTION_ORDER. Filtering and empty
+# frames are handled before the engine is called, and the sections an engine
+# fails to finish are computed by the pandas engine (see
+# iter_analysis_sections). Built-in engines are imported on first use, so an
+# optional library is only loaded when its engine is picked.
+
+import importlib
+import importlib.util
+
+DEFAULT_ENGINE = 'pandas'
+
+# Engine name -> (module, function) of the built-in engines
+BUILTIN_ENGINES = {
+    'pandas': ('dashboard_imports', 'iter_pandas_sections'),
+    'polars': ('polars_engine', 'iter_polars_sections'),
+    'sql': ('sql_engine', 'iter_sql_sections')
+}
+# Built-in engines that need an optional library
+ENGINE_LIBRARIES = {
+    'polars': 'polars'
+}
+
+_registered = {}
+
+def register_engine(name, run):
+    """Add or replace an engine; run(raw_df, sections) yields (section, result) pairs"""
+    _registered[name] = run
+
+def available_engines():
+    """Names of the engines that can run here"""
+    names = [name for name in BUILTIN_ENGINES
+             if name not in ENGINE_LIBRARIES or importlib.util.find_spec(ENGINE_LIBRARIES[name]) is not None]
+    return names + [name for name in _registered if name not in names]
+
+def get_engine(name=None):
+    """The engine function for name (None means DEFAULT_ENGINE)"""
+    name = name or DEFAULT_ENGINE
+    if name in _registered:
+        return _registered[name]
+    if name not in BUILTIN_ENGINES:
+        raise ValueError(f"Unknown analysis engine '{name}' (use one of {', '.join(available_engines())})")
+    module, function = BUILTIN_ENGINES[name]
+    return getattr(importlib.import_module(module), function)
@@ -0,0 +1,62 @@
+# background_jobs.py - Keyed background work that survives Streamlit reruns
+# Modules are imported once per server process, so jobs submitted here keep
+# running while the script reruns and can be picked up again by key.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BACKGROUND_WORKERS = 2
+
+_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='transitiq-job')
+_jobs = {}
+_lock = threading.Lock()
+
+def submit_job(key, fn, *args, **kwargs):
+    """Start fn in the background unless a job with this key already exists"""
+    with _lock:
+        future = _jobs.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            future = _executor.submit(fn, *args, **kwargs)
+            _jobs[key] = future
+        return future
+
+def job_status(key):
+    """'missing', 'running', 'done' or 'failed'"""
+    future = _jobs.get(key)
+    if future is None:
+        return 'missing'
+    if not future.done():
+        return 'running'
+    return 'failed' if future.exception() is not None else 'done'
+
+def job_result(key):
+    """Result of a finished job, or None"""
+    future = _jobs.get(key)
+    if future is None or not future.done() or future.exception() is not None:
+        return None
+    return future.result()
+
+def job_error(key):
+    """Exception raised by a failed job, or None"""
+    future = _jobs.get(key)
+    if future is None or not future.done():
+        return None
+    return future.exception()
+
+def forget_job(key):
+    """Drop a finished job so its result can be garbage collected"""
+    with _lock:
+        future = _jobs.get(key)
+        if future is not None and future.done():
+            del _jobs[key]
+
+def cancel_job(key):
+    """Drop a job whatever its state; one that has not started yet never runs
+
+    A running job cannot be interrupted: it finishes, but its result is
+    no longer kept.
+    """
+    with _lock:
+        future = _jobs.pop(key, None)
+    if future is not None:
+        future.cancel()
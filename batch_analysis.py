@@ -0,0 +1,501 @@
+# batch_analysis.py - Multi-file / multi-month batch analysis
+# Ingests many monthly exports concurrently, caches each file's cleaned
+# columnar form on disk and merges small per-file partial aggregates into
+# the same 11 dashboard sections. No combined DataFrame is ever built.
+
+import glob
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import (
+    ensure_required_columns,
+    exception_summary_from_counts,
+    generate_empty_analysis_results,
+    potential_savings,
+    routing_from_counts,
+    safe_percentage,
+    sort_by_service,
+    tier_weighted_on_time
+)
+from firstmile_column_mapper import clean_and_rename_columns_enhanced
+from shipment_dataset import DAY_ORDER, ShipmentDataset
+from trend_engine import daily_trend_state, empty_trend_state, merge_trend_states
+from weight_units import WEIGHT_LABELS
+from zip_geo import empty_zone_check, zone_check
+from zip_index import build_zip_index, top_zips, zip_index_frame, zip_index_from_frame
+
+BATCH_CACHE_DIR = os.environ.get('TRANSITIQ_CACHE_DIR', '.transitiq_cache')
+# Bump when cleaning changes so cached cleaned frames are rebuilt
+CLEANED_CACHE_VERSION = 2
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+BATCH_ENGINES = ['pandas', 'sql']
+# Additive columns of the per-group aggregate tables; the other columns are group keys
+MEASURE_COLUMNS = ('rows', 'transit_n', 'transit_sum', 'cost_n', 'cost_sum', 'sla_n', 'on_time', 'n', 'misses')
+# Measures that count shipments (rounded when rows are weighted)
+GROUP_COUNTS = ('rows', 'transit_n', 'cost_n', 'sla_n', 'on_time', 'n')
+
+# ----------------------
+# Ingestion
+# ----------------------
+def source_name(source):
+    """Display name for a path or an uploaded file object"""
+    return getattr(source, 'name', None) or os.path.basename(str(source))
+
+def read_shipment_file(source):
+    """Read a CSV/XLSX export from a path or an uploaded file object"""
+    name = source_name(source)
+    if name.lower().endswith('.csv'):
+        try:
+            return pd.read_csv(source, encoding='utf-8')
+        except UnicodeDecodeError:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            return pd.read_csv(source, encoding='latin-1')
+    return pd.read_excel(source, engine='openpyxl')
+
+def expand_batch_sources(pattern):
+    """Expand a server-side directory or glob pattern into supported export files"""
+    if not pattern:
+        return []
+    pattern = os.path.expanduser(pattern.strip())
+    if os.path.isdir(pattern):
+        candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    else:
+        candidates = glob.glob(pattern)
+    return sorted(
+        path for path in candidates
+        if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS)
+    )
+
+def file_fingerprint(source):
+    """Content hash of a path or uploaded file object, used as the cache key"""
+    digest = hashlib.sha1()
+    if hasattr(source, 'getvalue'):
+        digest.update(source.getvalue())
+    else:
+        with open(source, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def cleaned_cache_paths(source, cache_dir=BATCH_CACHE_DIR):
+    """(Parquet path, pickle path) of a source's cleaned-frame cache entry"""
+    fingerprint = f'{file_fingerprint(source)}-v{CLEANED_CACHE_VERSION}'
+    return os.path.join(cache_dir, f'{fingerprint}.parquet'), os.path.join(cache_dir, f'{fingerprint}.pkl')
+
+def load_cleaned_file(source, cache_dir=BATCH_CACHE_DIR):
+    """Read and clean one export, reusing the on-disk columnar cache when possible
+
+    Returns (cleaned_df, was_cached). The cleaned frame is stored as Parquet
+    when pyarrow is available and falls back to pickle otherwise.
+    """
+    parquet_path, pickle_path = cleaned_cache_paths(source, cache_dir)
+
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path), True
+    if os.path.exists(pickle_path):
+        return pd.read_pickle(pickle_path), True
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    df = clean_and_rename_columns_enhanced(read_shipment_file(source))
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            df.to_parquet(parquet_path, index=False)
+        except Exception:
+            # pyarrow missing or mixed-type object columns
+            if os.path.exists(parquet_path):
+                os.remove(parquet_path)
+            df.to_pickle(pickle_path)
+    except OSError:
+        pass  # Cache is best effort; a read-only disk must not block analysis
+
+    return df, False
+
+# ----------------------
+# Partial aggregates
+# ----------------------
+def _group_stats(measures, key, key_name):
+    """Additive transit/SLA/cost measures per group; NaN keys are dropped like groupby
+
+    measures holds the per-row contributions (see compute_partial_aggregates)
+    and key is a Series aligned with it (a column or a derived field), or a
+    list of them; key_name renames a single key.
+    """
+    frame = measures.groupby(key, observed=True, sort=False).sum()
+    for col in GROUP_COUNTS:
+        if col in frame.columns and frame[col].dtype.kind == 'f':
+            frame[col] = np.rint(frame[col]).astype(np.int64)
+    if key_name is not None:
+        frame.index.name = key_name
+    return frame.reset_index()
+
+def compute_partial_aggregates(raw_df, weights=None):
+    """Reduce one cleaned file to small, additive per-group measures
+
+    Every measure is a count or a sum, so partials from any number of files
+    can be merged with combine_partial_aggregates and finalized once.
+    weights, when given, is the number of shipments each row stands for
+    (e.g. a stratified sample); counts are then rounded weighted sums.
+    """
+    df = raw_df.copy(deep=False)
+    has_request_dates = 'Request Date' in df.columns
+    has_zone_column = 'Calculated Zone' in df.columns
+    # The executive summary averages uploaded columns only, not the defaults
+    has_transit = 'Days In Transit' in df.columns
+    has_cost = 'Cost' in df.columns
+    ensure_required_columns(df)
+    row_weights = np.ones(len(df), dtype=np.int64) if weights is None else np.asarray(weights, dtype=float)
+    zones = zone_check(df, weights=row_weights) if has_zone_column else empty_zone_check()
+
+    df['Days In Transit'] = pd.to_numeric(df['Days In Transit'], errors='coerce')
+    df['Cost'] = pd.to_numeric(df['Cost'], errors='coerce')
+    data = ShipmentDataset(df)
+    is_miss = data.is_miss
+
+    # Per-row contributions; every group measure is one groupby sum over them
+    measures = pd.DataFrame({
+        'rows': row_weights,
+        'transit_n': df['Days In Transit'].notna().to_numpy() * row_weights,
+        'transit_sum': df['Days In Transit'].fillna(0).to_numpy() * row_weights,
+        'cost_n': df['Cost'].notna().to_numpy() * row_weights,
+        'cost_sum': df['Cost'].fillna(0).to_numpy() * row_weights,
+        'sla_n': df['SLA Status'].notna().to_numpy() * row_weights,
+        'on_time': data.is_on_time * row_weights
+    }, index=df.index)
+
+    # Exception delays against the Xparcel SLA
+    delay = data.delay
+    positive_delay = is_miss & (delay > 0)
+
+    overservice = (
+        df['Calculated Zone'].isin(['1', '2', '3']) &
+        df['Xparcel Type'].isin(['Expedited', 'Priority'])
+    ).to_numpy()
+    fridays = (data.dates('request_date').dt.dayofweek == 4).to_numpy()
+
+    def count(mask):
+        return int(np.rint(row_weights[mask].sum()))
+
+    totals = measures.sum()
+    aggregates = {
+        'totals': pd.DataFrame([{
+            'rows': int(np.rint(totals['rows'])),
+            'transit_n': int(np.rint(totals['transit_n'])),
+            'transit_sum': totals['transit_sum'],
+            'cost_n': int(np.rint(totals['cost_n'])),
+            'cost_sum': totals['cost_sum'],
+            'misses': count(is_miss),
+            'delay_n': count(positive_delay),
+            'delay_sum': (delay * row_weights)[positive_delay].sum(),
+            'overservice': count(overservice),
+            'friday': count(fridays),
+            'has_carrier': int(data.has('carrier')),
+            'has_transit': int(has_transit),
+            'has_cost': int(has_cost),
+            'zone_checked': zones['checked'],
+            'zone_mismatches': zones['mismatches']
+        }]),
+        'tier': _group_stats(measures, df['Xparcel Type'], 'Xparcel Type'),
+        'tier_transit': _group_stats(
+            measures[['rows']].rename(columns={'rows': 'n'}), [df['Xparcel Type'], df['Days In Transit']], None
+        ),
+        'zone': _group_stats(measures, df[data.schema['zone']], 'Zone'),
+        'zone_cost': _group_stats(measures, df['Calculated Zone'], 'Calculated Zone'),
+        'state': _group_stats(measures, df[data.schema['state']], 'State'),
+        'routing_state': _group_stats(measures, df['Destination State'], 'Destination State'),
+        'weekday': _group_stats(measures, data.weekday, 'Day_of_Week'),
+        'weight': _group_stats(measures, data.weight_buckets, 'Weight_Bucket'),
+        'carrier': (
+            _group_stats(measures, df['Carrier'], 'Carrier') if 'Carrier' in df.columns
+            else pd.DataFrame(columns=['Carrier', 'rows', 'transit_n', 'transit_sum',
+                                       'cost_n', 'cost_sum', 'sla_n', 'on_time'])
+        ),
+        'daily': (
+            daily_trend_state(df, data.dates('request_date'), weights) if has_request_dates
+            else empty_trend_state()
+        )
+    }
+
+    aggregates['zip_index'] = zip_index_frame(build_zip_index(df, weights))
+
+    return aggregates
+
+def combine_partial_aggregates(partials):
+    """Merge per-file partial aggregates by summing their measures per group"""
+    partials = [partial for partial in partials if partial]
+    if not partials:
+        return {}
+
+    combined = {}
+    for name in partials[0]:
+        frames = [partial[name] for partial in partials if not partial[name].empty]
+        if not frames:
+            combined[name] = partials[0][name]
+            continue
+        merged = pd.concat(frames, ignore_index=True)
+        if name == 'totals':
+            combined[name] = merged.sum(numeric_only=True).to_frame().T
+            continue
+        keys = [col for col in merged.columns if col not in MEASURE_COLUMNS]
+        # Categorical keys from different files may carry different categories
+        for key in keys:
+            if isinstance(merged[key].dtype, pd.CategoricalDtype):
+                merged[key] = merged[key].astype(object)
+        combined[name] = merged.groupby(keys, sort=False, dropna=False).sum(numeric_only=True).reset_index()
+    return combined
+
+# ----------------------
+# Finalization
+# ----------------------
+def _mean(total, count):
+    return total / count if count else np.nan
+
+def _on_time_pct(frame):
+    return [safe_percentage(on_time, sla_n) for on_time, sla_n in zip(frame['on_time'], frame['sla_n'])]
+
+def _percentile_from_counts(values, counts, q):
+    """np.percentile (linear interpolation) from a value -> count table"""
+    order = np.argsort(values)
+    values = np.asarray(values, dtype=float)[order]
+    counts = np.asarray(counts, dtype=np.int64)[order]
+    total = counts.sum()
+    if total == 0:
+        return 0
+    position = q / 100 * (total - 1)
+    lower, upper = int(np.floor(position)), int(np.ceil(position))
+    cumulative = np.cumsum(counts)
+    low_value = values[np.searchsorted(cumulative, lower, side='right')]
+    high_value = values[np.searchsorted(cumulative, upper, side='right')]
+    return low_value + (high_value - low_value) * (position - lower)
+
+def _sorted(frame, column):
+    """Sort by group key like groupby does, tolerating mixed key types"""
+    try:
+        return frame.sort_values(column, kind='stable')
+    except TypeError:
+        return frame
+
+def results_from_aggregates(aggregates):
+    """Build the 11 dashboard sections (plus an executive summary) from merged aggregates"""
+    empty = generate_empty_analysis_results()
+    if not aggregates:
+        return empty
+
+    totals = aggregates['totals'].iloc[0]
+    total_rows = totals['rows']
+    if total_rows == 0:
+        return empty
+    results = {}
+
+    # 1. Performance by Xparcel Tier
+    tier = _sorted(aggregates['tier'], 'Xparcel Type')
+    transit_counts = aggregates['tier_transit']
+    rows = []
+    for _, group in tier.iterrows():
+        counts = transit_counts[transit_counts['Xparcel Type'] == group['Xparcel Type']]
+        rows.append({
+            'Xparcel Type': group['Xparcel Type'],
+            'Shipments': int(group['transit_n']),
+            # np.round like DataFrame.round in the analyzer (Python's round differs on ties)
+            'Avg Days': np.round(_mean(group['transit_sum'], group['transit_n']), 2),
+            'Median': np.round(_percentile_from_counts(counts['Days In Transit'], counts['n'], 50), 2),
+            '95th Pctl': np.round(_percentile_from_counts(counts['Days In Transit'], counts['n'], 95), 2),
+            'On-Time %': safe_percentage(group['on_time'], group['sla_n'])
+        })
+    results['tier_performance'] = (
+        sort_by_service(pd.DataFrame(rows), 'Xparcel Type') if rows else empty['tier_performance']
+    )
+
+    # 2. Service Mix
+    mix = tier[tier['rows'] > 0].sort_values('rows', ascending=False, kind='stable')
+    service_mix = pd.DataFrame({
+        'Service': mix['Xparcel Type'].to_numpy(),
+        'Shipments': mix['rows'].astype(np.int64).to_numpy(),
+        'Percentage': [safe_percentage(x, mix['rows'].sum()) for x in mix['rows']]
+    })
+    results['service_mix'] = sort_by_service(service_mix, 'Service')
+
+    # 3/4. Zone distribution and transit
+    zone = _sorted(aggregates['zone'], 'Zone')
+    results['zone_distribution'] = pd.DataFrame({
+        'Zone': zone['Zone'].to_numpy(),
+        'Shipments': zone['rows'].astype(np.int64).to_numpy(),
+        'Percentage': [safe_percentage(x, zone['rows'].sum()) for x in zone['rows']]
+    })
+    results['zone_transit'] = pd.DataFrame({
+        'Zone': zone['Zone'].to_numpy(),
+        # np.round like Series.round in the analyzer (Python's round differs on ties)
+        'Avg Transit Days': np.round([_mean(s, n) for s, n in zip(zone['transit_sum'], zone['transit_n'])], 2)
+    })
+
+    # 5. Exceptions
+    zip_index = zip_index_from_frame(aggregates['zip_index'])
+    if totals['misses'] == 0:
+        results['exception_hotspots'] = pd.DataFrame({'ZIP': ['No Exceptions'], 'SLA Misses': [0]})
+    elif not zip_index['misses'].any():
+        results['exception_hotspots'] = empty['exception_hotspots']
+    else:
+        results['exception_hotspots'] = top_zips(zip_index, 10, by='misses')[['ZIP', 'SLA Misses']]
+    results['exception_summary'] = exception_summary_from_counts(
+        totals['misses'], total_rows, _mean(totals['delay_sum'], totals['delay_n'])
+    )
+
+    # 6. Regional Performance
+    state = _sorted(aggregates['state'], 'State').head(10)
+    results['regional_performance'] = pd.DataFrame({
+        'State': state['State'].to_numpy(),
+        'Volume': state['transit_n'].astype(np.int64).to_numpy(),
+        'Avg Transit': [_mean(s, n) for s, n in zip(state['transit_sum'], state['transit_n'])],
+        'On-Time %': _on_time_pct(state)
+    })
+
+    # 7. Day of Week
+    weekday = aggregates['weekday'].set_index('Day_of_Week').reindex(DAY_ORDER)
+    volume = weekday['transit_n'].fillna(0).astype(np.int64)
+    results['day_of_week'] = pd.DataFrame({
+        'Day_of_Week': DAY_ORDER,
+        'Volume': volume.to_numpy(),
+        'Avg Transit': [_mean(s, n) if n else 0 for s, n in zip(weekday['transit_sum'].fillna(0), volume)],
+        'On-Time %': [safe_percentage(o, n) if n else 0 for o, n in
+                      zip(weekday['on_time'].fillna(0), weekday['sla_n'].fillna(0))],
+        'Volume %': [safe_percentage(x, volume.sum()) for x in volume]
+    })
+
+    # 8. Weight Impact
+    weight = aggregates['weight'].set_index('Weight_Bucket').reindex(WEIGHT_LABELS).fillna(0)
+    results['weight_impact'] = pd.DataFrame({
+        'Weight_Bucket': pd.Categorical(WEIGHT_LABELS, categories=WEIGHT_LABELS, ordered=True),
+        'Volume': weight['transit_n'].astype(np.int64).to_numpy(),
+        'Avg Transit': [_mean(s, n) for s, n in zip(weight['transit_sum'], weight['transit_n'])],
+        'On-Time %': _on_time_pct(weight)
+    })
+
+    # 9. Carrier Performance
+    carrier = _sorted(aggregates['carrier'], 'Carrier')
+    if totals['has_carrier'] and not carrier.empty:
+        results['carrier_performance'] = pd.DataFrame({
+            'Carrier': carrier['Carrier'].to_numpy(),
+            'Volume': carrier['transit_n'].astype(np.int64).to_numpy(),
+            'Avg Cost': [_mean(s, n) for s, n in zip(carrier['cost_sum'], carrier['cost_n'])],
+            'On-Time %': _on_time_pct(carrier)
+        })
+    else:
+        results['carrier_performance'] = pd.DataFrame({
+            'Carrier': ['UPS', 'FedEx', 'USPS', 'OnTrac', 'LaserShip'],
+            'Volume': [100, 80, 120, 60, 40],
+            'On-Time %': [96.5, 97.2, 94.8, 98.1, 97.5],
+            'Avg Cost': [12.50, 13.25, 9.75, 8.90, 9.10]
+        })
+
+    # 10. Cost Analysis
+    zone_cost = _sorted(aggregates['zone_cost'], 'Calculated Zone')
+    results['cost_analysis'] = {
+        'avg_cost_by_service': {
+            key: _mean(s, n) for key, s, n in zip(tier['Xparcel Type'], tier['cost_sum'], tier['cost_n'])
+        },
+        'cost_per_zone': {
+            key: _mean(s, n) for key, s, n in
+            zip(zone_cost['Calculated Zone'], zone_cost['cost_sum'], zone_cost['cost_n'])
+        },
+        'potential_savings': potential_savings(totals['cost_sum'])
+    }
+
+    # 11. Routing Optimization
+    state_rows = aggregates['routing_state'].set_index('Destination State')['rows']
+    results['routing_optimization'] = routing_from_counts(
+        total_rows, totals['overservice'], state_rows, totals['friday']
+    )
+
+    # Trend state is already additive; merging restores its sort order
+    results['daily_trend'] = merge_trend_states([aggregates.get('daily')])
+    results['zip_index'] = zip_index_frame(zip_index)
+    results['zone_check'] = {
+        'checked': int(totals['zone_checked']),
+        'mismatches': int(totals['zone_mismatches']),
+        'mismatch_rate': safe_percentage(totals['zone_mismatches'], totals['zone_checked'])
+    }
+
+    # Executive summary, since there is no combined frame to read it from
+    results['executive_summary'] = {
+        'total_shipments': int(total_rows),
+        # Averages of placeholder columns (see ensure_required_columns) are reported as 0.0
+        'avg_transit': _mean(totals['transit_sum'], totals['transit_n']) if totals['has_transit'] else 0.0,
+        'on_time_pct': tier_weighted_on_time(tier['transit_n'], tier['on_time'], tier['sla_n']),
+        'avg_cost': _mean(totals['cost_sum'], totals['cost_n']) if totals['has_cost'] else 0.0
+    }
+
+    return results
+
+# ----------------------
+# Batch runner
+# ----------------------
+def _analyze_source(source, cache_dir):
+    df, cached = load_cleaned_file(source, cache_dir)
+    return {
+        'name': source_name(source),
+        'rows': len(df),
+        'cached': cached,
+        'aggregates': compute_partial_aggregates(df)
+    }
+
+def _cache_source(source, cache_dir):
+    """Clean one file into the cache without analyzing it (for the SQL engine)
+
+    The cached Parquet path is handed on, so the SQL engine reads the file
+    itself; the frame is only kept when it could not be stored as Parquet.
+    """
+    parquet_path, _ = cleaned_cache_paths(source, cache_dir)
+    cached = os.path.exists(parquet_path)
+    if not cached:
+        df, cached = load_cleaned_file(source, cache_dir)
+    entry = parquet_path if os.path.exists(parquet_path) else df
+    from sql_engine import source_rows
+    return {'name': source_name(source), 'rows': source_rows(entry), 'cached': cached, 'entry': entry}
+
+def run_batch_analysis(sources, max_workers=None, cache_dir=BATCH_CACHE_DIR, engine='pandas'):
+    """Ingest many files concurrently and analyze them as a single period
+
+    Returns a dict with the merged 'results', per-file 'files' info and any
+    per-file 'errors'. Each worker keeps only its file's partial aggregates,
+    so peak memory is bounded by the largest single file in flight.
+    engine='sql' runs the aggregations as SQL over the cleaned-file cache
+    instead (see sql_engine), out of core when DuckDB is installed.
+    """
+    if engine not in BATCH_ENGINES:
+        raise ValueError(f"Unknown batch engine '{engine}' (use one of {', '.join(BATCH_ENGINES)})")
+    sources = list(sources)
+    files, errors, partials = [], [], []
+    if not sources:
+        return {'results': generate_empty_analysis_results(), 'files': files, 'errors': errors}
+
+    worker, key = (_analyze_source, 'aggregates') if engine == 'pandas' else (_cache_source, 'entry')
+    max_workers = max_workers or min(8, len(sources))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(source, executor.submit(worker, source, cache_dir)) for source in sources]
+        for source, future in futures:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                errors.append({'name': source_name(source), 'error': str(e)})
+                continue
+            partials.append(outcome.pop(key))
+            files.append(outcome)
+
+    if engine == 'sql':
+        from sql_engine import sql_partial_aggregates
+        aggregates = sql_partial_aggregates(partials, temp_directory=os.path.join(cache_dir, 'sql_spill')) if partials else {}
+    else:
+        aggregates = combine_partial_aggregates(partials)
+
+    return {
+        'results': results_from_aggregates(aggregates),
+        'files': files,
+        'errors': errors
+    }
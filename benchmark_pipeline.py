@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# benchmark_pipeline.py - Time and peak memory of the clean -> analyze pipeline
+# Builds a synthetic export shaped like a FirstMile tracking report, runs the
+# column mapper and the 11-section analysis on it under tracemalloc and prints
+# per-stage wall time and peak allocation, also as a multiple of the input
+# frame's own size. NumPy and pandas buffers are traced, so the peak shows
+# how many transient copies of the data a stage makes.
+#
+# Usage:
+#   python benchmark_pipeline.py --rows 1000000
+#   python benchmark_pipeline.py --rows 200000 --mapper enhanced --json bench.json
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import analyze_comprehensive_performance_enhanced
+from enhanced_column_mapper import enhanced_clean_and_rename_columns
+from firstmile_column_mapper import clean_and_rename_columns_enhanced
+
+MAPPERS = {
+    'firstmile': clean_and_rename_columns_enhanced,
+    'enhanced': enhanced_clean_and_rename_columns
+}
+
+def synthetic_export(rows, seed=7):
+    """Raw export with text dates and ZIPs, as read_csv would return it"""
+    rng = np.random.default_rng(seed)
+    ship = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 180, rows), unit='D')
+    transit = rng.integers(1, 12, rows)
+    return pd.DataFrame({
+        'Tracking #': pd.Series(np.arange(rows)).map('FM{:09d}'.format),
+        'Service Level': rng.choice(['Xparcel Ground', 'Xparcel Expedited', 'Xparcel Priority'], rows),
+        'Ship Date': ship.strftime('%Y-%m-%d'),
+        'Delivered Date': (ship + pd.to_timedelta(transit, unit='D')).strftime('%Y-%m-%d'),
+        'Transit Days': transit,
+        'SLA Status': rng.choice(['On-Time', 'SLA Miss'], rows, p=[0.9, 0.1]),
+        'Dest State': rng.choice(['CA', 'TX', 'NY', 'FL', 'WA', 'IL', 'GA'], rows),
+        'Dest ZIP': pd.Series(rng.integers(1000, 99999, rows)).map('{:05d}'.format),
+        'Shipping Cost': rng.gamma(2, 5, rows).round(2),
+        'Package Weight': rng.gamma(2, 1, rows).round(2),
+        'Zone': rng.integers(1, 9, rows),
+        'Carrier': rng.choice(['USPS', 'UPS', 'OnTrac', 'LaserShip'], rows)
+    })
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+def measure(stage, func, input_bytes):
+    """Run func() once; return (result, stats) with wall time and traced peak"""
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    extra = max(peak - before, 0)
+    return result, {
+        'stage': stage,
+        'seconds': round(seconds, 3),
+        'peak_mb': round(extra / 2**20, 1),
+        'peak_x_input': round(extra / input_bytes, 2) if input_bytes else 0.0
+    }
+
+def run_benchmark(rows, mapper='firstmile'):
+    """Benchmark one mapper plus the analysis on a synthetic export"""
+    raw_df = synthetic_export(rows)
+    input_bytes = frame_bytes(raw_df)
+    stats = []
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            df, clean = measure(f'clean ({mapper})', lambda: MAPPERS[mapper](raw_df), input_bytes)
+            stats.append(clean)
+            _, analyze = measure('analyze', lambda: analyze_comprehensive_performance_enhanced(df), input_bytes)
+            stats.append(analyze)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'rows': rows,
+        'input_mb': round(input_bytes / 2**20, 1),
+        'stages': stats
+    }
+
+def format_report(report):
+    lines = [f"{report['rows']:,} rows, input frame {report['input_mb']} MB"]
+    for stage in report['stages']:
+        lines.append(f"  {stage['stage']:<20} {stage['seconds']:>8.2f}s  peak +{stage['peak_mb']:>8.1f} MB"
+                     f"  ({stage['peak_x_input']:.2f}x input)")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark time and peak memory of the TransitIQ pipeline.')
+    parser.add_argument('--rows', type=int, default=200000, help='Synthetic rows (default: 200000)')
+    parser.add_argument('--mapper', choices=sorted(MAPPERS) + ['both'], default='firstmile',
+                        help='Column mapper to benchmark (default: firstmile)')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    mappers = sorted(MAPPERS) if args.mapper == 'both' else [args.mapper]
+    reports = [run_benchmark(args.rows, mapper) for mapper in mappers]
+    for report in reports:
+        print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(reports, handle, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
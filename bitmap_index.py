@@ -0,0 +1,83 @@
+# bitmap_index.py - Per-value bitmaps on low-cardinality columns for fast filters
+# Carrier, Xparcel Type, Destination State, Calculated Zone and SLA Status
+# have a handful of distinct values each. A bitmap per value (one bit per
+# row, np.packbits) is built once per dataset; a filter combination is then
+# an OR over the wanted values of each column and an AND across columns,
+# eight rows per byte, and counts are popcounts. Only the final selection
+# is turned into row positions.
+
+import numpy as np
+import pandas as pd
+
+from shipment_dataset import ShipmentDataset
+
+# Filter name -> ShipmentDataset role
+BITMAP_DIMENSIONS = {
+    'carrier': 'carrier',
+    'tier': 'tier',
+    'state': 'destination_state',
+    'zone': 'calculated_zone',
+    'sla': 'sla'
+}
+
+def _label(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def build_bitmap_index(data):
+    """{'rows': n, 'bitmaps': {dimension: {value: packed bits}}} for a dataset or frame
+
+    Columns the frame does not have are left out; missing values get no bit.
+    """
+    data = ShipmentDataset.wrap(data)
+    index = {'rows': len(data), 'bitmaps': {}}
+    for dimension, role in BITMAP_DIMENSIONS.items():
+        values = data.column(role)
+        if values is None:
+            continue
+        codes, labels = pd.factorize(values, use_na_sentinel=True)
+        index['bitmaps'][dimension] = {
+            _label(label): np.packbits(codes == code) for code, label in enumerate(labels)
+        }
+    return index
+
+def all_rows(index):
+    """Bitmap with every row set (padding bits stay clear)"""
+    return np.packbits(np.ones(index['rows'], dtype=bool))
+
+def select_bitmap(index, filters=None):
+    """Bitmap of the rows passing filters
+
+    filters maps a dimension to a value or a list of values, e.g.
+    {'carrier': ['UPS', 'FedEx'], 'state': 'CA'}: values of one dimension
+    are ORed, dimensions are ANDed. Values with no rows select nothing.
+    """
+    selected = all_rows(index)
+    for dimension, wanted in (filters or {}).items():
+        if dimension not in BITMAP_DIMENSIONS:
+            raise ValueError(f"No bitmap index for '{dimension}' (use one of {', '.join(BITMAP_DIMENSIONS)})")
+        bitmaps = index['bitmaps'].get(dimension, {})
+        if isinstance(wanted, str) or not np.iterable(wanted):
+            wanted = [wanted]
+        union = np.zeros_like(selected)
+        for value in wanted:
+            if value in bitmaps:
+                union |= bitmaps[value]
+        selected &= union
+    return selected
+
+def bitmap_count(bitmap):
+    """Number of rows set in a bitmap"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bitmap).sum(dtype=np.int64))
+    return int(np.unpackbits(bitmap).sum(dtype=np.int64))
+
+def bitmap_rows(index, bitmap):
+    """Row positions set in a bitmap, ascending"""
+    return np.flatnonzero(np.unpackbits(bitmap, count=index['rows']))
+
+def value_counts(index, dimension, bitmap=None):
+    """Rows per value of one dimension, optionally within a selection"""
+    counts = {}
+    for value, bits in index['bitmaps'].get(dimension, {}).items():
+        counts[value] = bitmap_count(bits if bitmap is None else bits & bitmap)
+    return counts
@@ -0,0 +1,178 @@
+# business_days.py - Calendar and business days in transit, per carrier holiday calendar
+# Xparcel SLAs (XPARCEL_LOGIC sla_days) are business-day commitments, but the
+# mappers derived Days In Transit as calendar days, so a Ground parcel picked
+# up on a Friday before a Monday holiday looked three days slower than it
+# was. transit_days counts both from the request and delivery dates with
+# np.busday_count: one vectorized call per holiday calendar, so a few calls
+# cover millions of rows. Holidays are generated from rules (fixed dates with
+# the weekend-observed shift, nth/last weekday of a month), so the calendars
+# cover any year without a data file.
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+# Weekdays a carrier counts as business days (Monday first), by name or as a raw mask
+WEEKMASKS = {
+    'weekdays': '1111100',
+    'saturday': '1111110'
+}
+DEFAULT_WEEKMASK = 'weekdays'
+
+# Holiday rules: (month, day) is a fixed date moved to Friday/Monday when it
+# falls on a weekend; (month, weekday, n) is the nth weekday (n=-1: the last)
+HOLIDAY_RULES = {
+    "New Year's Day": (1, 1),
+    'Martin Luther King Jr. Day': (1, 0, 3),
+    "Presidents' Day": (2, 0, 3),
+    'Memorial Day': (5, 0, -1),
+    'Juneteenth': (6, 19),
+    'Independence Day': (7, 4),
+    'Labor Day': (9, 0, 1),
+    'Columbus Day': (10, 0, 2),
+    'Veterans Day': (11, 11),
+    'Thanksgiving': (11, 3, 4),
+    'Christmas Day': (12, 25)
+}
+JUNETEENTH_FIRST_YEAR = 2021
+
+# USPS observes every federal holiday; UPS, FedEx and the regional carriers
+# only close on the six major ones
+HOLIDAY_CALENDARS = {
+    'federal': list(HOLIDAY_RULES),
+    'parcel': ["New Year's Day", 'Memorial Day', 'Independence Day', 'Labor Day', 'Thanksgiving', 'Christmas Day']
+}
+DEFAULT_CALENDAR = 'federal'
+# First word of the lowercase carrier name -> holiday calendar (others use DEFAULT_CALENDAR)
+CARRIER_CALENDARS = {
+    'usps': 'federal',
+    'ups': 'parcel',
+    'fedex': 'parcel',
+    'ontrac': 'parcel',
+    'lasership': 'parcel',
+    'lso': 'parcel',
+    'cdl': 'parcel'
+}
+
+SLA_LABELS = np.array(['On-Time', 'SLA Miss', 'Unknown'], dtype=object)
+
+def _holiday_date(year, rule):
+    """The observed date of one holiday rule in year"""
+    month = rule[0]
+    if len(rule) == 2:
+        date = pd.Timestamp(year, month, rule[1])
+        if date.weekday() == 5:
+            return date - pd.Timedelta(days=1)
+        if date.weekday() == 6:
+            return date + pd.Timedelta(days=1)
+        return date
+    weekday, n = rule[1], rule[2]
+    if n > 0:
+        first = pd.Timestamp(year, month, 1)
+        return first + pd.Timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = pd.Timestamp(year, month, 1) + pd.offsets.MonthEnd(0)
+    return last - pd.Timedelta(days=(last.weekday() - weekday) % 7)
+
+def holiday_dates(calendar=DEFAULT_CALENDAR, first_year=2020, last_year=2030):
+    """Sorted datetime64[D] observed holidays of a calendar for the years given"""
+    if calendar not in HOLIDAY_CALENDARS:
+        raise ValueError(f"Unknown holiday calendar '{calendar}' (use one of {', '.join(HOLIDAY_CALENDARS)})")
+    dates = []
+    # A Saturday New Year's Day is observed on December 31 of the year before
+    for year in range(first_year, last_year + 2):
+        for name in HOLIDAY_CALENDARS[calendar]:
+            if name == 'Juneteenth' and year < JUNETEENTH_FIRST_YEAR:
+                continue
+            date = _holiday_date(year, HOLIDAY_RULES[name])
+            if first_year <= date.year <= last_year:
+                dates.append(date)
+    return np.array(sorted(set(dates)), dtype='datetime64[D]')
+
+@functools.lru_cache(maxsize=32)
+def _busday_calendar(calendar, weekmask, first_year, last_year):
+    return np.busdaycalendar(weekmask=WEEKMASKS.get(weekmask, weekmask),
+                             holidays=holiday_dates(calendar, first_year, last_year))
+
+def carrier_calendars(carriers):
+    """Index into list(HOLIDAY_CALENDARS) of each row's carrier holiday calendar"""
+    names = list(HOLIDAY_CALENDARS)
+    codes, uniques = pd.factorize(pd.Series(carriers), use_na_sentinel=True)
+    lookup = [names.index(CARRIER_CALENDARS.get((str(carrier).lower().split() or [''])[0], DEFAULT_CALENDAR))
+              for carrier in uniques]
+    return np.array(lookup + [names.index(DEFAULT_CALENDAR)], dtype=np.int8)[codes]
+
+def _dates(values):
+    """datetime64[D] array of values (NaT where they do not parse)"""
+    values = pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(values.dtype):
+        values = pd.to_datetime(values, errors='coerce')
+    return values.to_numpy(dtype='datetime64[D]')
+
+def _compact_days(days, valid):
+    """Smallest int dtype for the day counts, float32 with NaN when dates are missing"""
+    if not valid.all():
+        compact = np.full(len(days), np.nan, dtype=np.float32)
+        compact[valid] = days[valid]
+        return compact
+    if len(days) == 0 or np.abs(days).max() <= np.iinfo(np.int16).max:
+        return days.astype(np.int16)
+    return days.astype(np.int32)
+
+def transit_days(request_dates, delivery_dates, carriers=None, calendar=DEFAULT_CALENDAR,
+                 weekmask=DEFAULT_WEEKMASK):
+    """(calendar days, business days) from request to delivery date
+
+    Business days count the working days from the request date up to (not
+    including) the delivery date, skipping non-weekmask days and the
+    holidays of each row's carrier calendar (or of calendar when carriers
+    is not given). Both are compact arrays; rows with a missing date are NaN.
+    """
+    names = list(HOLIDAY_CALENDARS)
+    if calendar not in HOLIDAY_CALENDARS:
+        raise ValueError(f"Unknown holiday calendar '{calendar}' (use one of {', '.join(names)})")
+    request = _dates(request_dates)
+    delivery = _dates(delivery_dates)
+    valid = ~(np.isnat(request) | np.isnat(delivery))
+    if not valid.all():
+        # NaT rows are counted from a placeholder date, then masked by _compact_days
+        placeholder = request[valid].min() if valid.any() else np.datetime64('2000-01-01')
+        request = np.where(valid, request, placeholder)
+        delivery = np.where(valid, delivery, placeholder)
+    calendar_days = (delivery - request).astype(np.int64)
+
+    if len(request) == 0:
+        return calendar_days.astype(np.int16), calendar_days.astype(np.int16)
+    first_year = min(request.min(), delivery.min()).astype(object).year
+    last_year = max(request.max(), delivery.max()).astype(object).year
+    if carriers is None:
+        codes, calendars = np.zeros(len(request), dtype=np.int8), [calendar]
+    else:
+        codes, calendars = carrier_calendars(carriers), names
+    used = np.flatnonzero(np.bincount(codes, minlength=len(calendars)))
+    if len(used) == 1:
+        # One calendar for every row: no masking or copies
+        business_days = np.busday_count(request, delivery,
+                                        busdaycal=_busday_calendar(calendars[used[0]], weekmask, first_year, last_year))
+    else:
+        business_days = np.zeros(len(request), dtype=np.int64)
+        for code in used:
+            rows = codes == code
+            business_days[rows] = np.busday_count(
+                request[rows], delivery[rows],
+                busdaycal=_busday_calendar(calendars[code], weekmask, first_year, last_year)
+            )
+    return _compact_days(calendar_days, valid), _compact_days(business_days, valid)
+
+def tier_sla_days(tiers, sla_for):
+    """SLA days per row, calling sla_for once per distinct tier (None for missing tiers)"""
+    codes, uniques = pd.factorize(pd.Series(tiers), use_na_sentinel=True)
+    lookup = np.array([sla_for(tier) for tier in uniques] + [sla_for(None)], dtype=float)
+    return lookup[codes]
+
+def classify_sla(days, sla_days):
+    """'On-Time' / 'SLA Miss' per row ('Unknown' where days or the SLA is missing)"""
+    days = pd.Series(days).to_numpy(dtype=float, na_value=np.nan)
+    sla_days = np.asarray(sla_days, dtype=float)
+    codes = np.where(np.isnan(days) | np.isnan(sla_days), 2, np.where(days <= sla_days, 0, 1))
+    return SLA_LABELS[codes]
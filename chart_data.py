@@ -0,0 +1,119 @@
+# chart_data.py - Server-side chart data preparation
+# Section frames are pre-aggregated and downsampled to a fixed point budget
+# before they reach Plotly, and finished figures are cached as JSON, so the
+# payload sent to the browser stays the same size however many shipments
+# were uploaded.
+
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+CHART_POINT_BUDGET = 500
+FIGURE_CACHE_SIZE = 64
+OTHER_LABEL = 'Other'
+
+_figure_cache = OrderedDict()
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of n_out points that keep the series shape
+
+    x must be sorted. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    anchor = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[anchor] - avg_x) * (y[start:end] - y[anchor]) -
+            (x[anchor] - x[start:end]) * (avg_y - y[anchor])
+        )
+        anchor = start + int(np.argmax(area))
+        selected[i + 1] = anchor
+    selected[-1] = n - 1
+    return selected
+
+def _numeric_axis(series):
+    """Float view of a numeric or datetime axis, or None for categorical axes"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.astype('int64').to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=float)
+    return None
+
+def bucket_series(df, x, y, max_points=CHART_POINT_BUDGET, agg='mean'):
+    """Aggregate a numeric/datetime x axis into max_points equal-width buckets"""
+    axis = _numeric_axis(df[x])
+    if axis is None or len(df) <= max_points:
+        return df
+    edges = np.linspace(np.nanmin(axis), np.nanmax(axis), max_points + 1)
+    codes = np.clip(np.searchsorted(edges, axis, side='right') - 1, 0, max_points - 1)
+    grouped = df.groupby(codes, sort=True)
+    return pd.DataFrame({x: grouped[x].min(), y: grouped[y].agg(agg)}).reset_index(drop=True)
+
+def top_categories(df, x, y, max_points=CHART_POINT_BUDGET, agg='sum'):
+    """Keep the max_points - 1 largest categories and fold the rest into 'Other'
+
+    Other columns are kept for the named categories and left blank on 'Other'.
+    """
+    if len(df) <= max_points:
+        return df
+    ranked = df.sort_values(y, ascending=False, kind='stable')
+    head = ranked.head(max_points - 1)
+    other = pd.DataFrame({x: [OTHER_LABEL], y: [ranked[y].iloc[max_points - 1:].agg(agg)]})
+    return pd.concat([head, other], ignore_index=True)
+
+def prepare_chart_frame(df, x, y, max_points=CHART_POINT_BUDGET, how='auto', agg='sum'):
+    """Reduce a chart's source frame to at most max_points rows
+
+    how='auto' picks LTTB for numeric/datetime axes and top-N + 'Other' for
+    categorical ones; how='bucket' aggregates fixed-width x buckets instead.
+    Frames already within the budget are returned unchanged.
+    """
+    if df is None or len(df) <= max_points:
+        return df
+
+    axis = _numeric_axis(df[x])
+    if axis is None:
+        return top_categories(df, x, y, max_points, agg)
+    if how == 'bucket':
+        return bucket_series(df, x, y, max_points, 'mean' if agg == 'mean' else agg)
+
+    ordered = df.iloc[np.argsort(axis, kind='stable')]
+    ordered = ordered[ordered[y].notna()]
+    return ordered.iloc[lttb_indices(_numeric_axis(ordered[x]), ordered[y].to_numpy(), max_points)]
+
+def cached_figure(key, builder):
+    """Plotly figure dict for key, built once with builder() and kept as JSON
+
+    The LRU holds serialized figures, so memory per entry is bounded by the
+    point budget rather than by the source data. Keys come from
+    render_cache.render_key.
+    """
+    payload = _figure_cache.get(key)
+    if payload is None:
+        payload = pio.to_json(builder(), validate=False)
+        _figure_cache[key] = payload
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    else:
+        _figure_cache.move_to_end(key)
+    return json.loads(payload)
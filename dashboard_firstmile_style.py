@@ -12,6 +12,8 @@ import warnings
 import json
 import traceback
 import sys
+from render_cache import performance_css
+from section_planner import sections_for_toolkits
 
 # Suppress the specific division warning
 warnings.filterwarnings("ignore", category=RuntimeWarning, message="invalid value encountered in scalar divide")
@@ -441,12 +443,33 @@ with st.sidebar:
     
     st.divider()
     
-    uploaded_file = st.file_uploader(
-        "Upload Tracking Report",
-        type=["csv", "xlsx"],
-        help="Upload your FirstMile export file (CSV or Excel format)"
+    batch_mode = st.checkbox(
+        "Batch Mode",
+        value=False,
+        help="Analyze several monthly exports together as one period"
     )
     
+    batch_files = []
+    batch_pattern = ""
+    if batch_mode:
+        uploaded_file = None
+        batch_files = st.file_uploader(
+            "Upload Tracking Reports",
+            type=["csv", "xlsx"],
+            accept_multiple_files=True,
+            help="Upload one export per month (CSV or Excel format)"
+        )
+        batch_pattern = st.text_input(
+            "Server Directory or Glob",
+            help="Optional server-side folder or pattern, e.g. /data/acme/2025-*.csv"
+        )
+    else:
+        uploaded_file = st.file_uploader(
+            "Upload Tracking Report",
+            type=["csv", "xlsx"],
+            help="Upload your FirstMile export file (CSV or Excel format)"
+        )
+    
     st.divider()
     
     # Debug Mode Toggle
@@ -489,6 +512,16 @@ with st.sidebar:
             <strong>{active_count} Tools Active</strong>
         </div>
         """, unsafe_allow_html=True)
+    
+    # Only the sections of the active tools are analyzed and shown (see section_planner)
+    visible_sections = sections_for_toolkits({
+        'national_select': enable_national_select,
+        'zone_toolkit': enable_zone_toolkit,
+        'xparcel_logic': enable_xparcel_logic,
+        'tet': enable_tet,
+        'cost_optimizer': enable_cost_optimizer,
+        'carrier_scoring': enable_carrier_scoring
+    })
 
 # Copy all the helper functions from dashboard.py
 def debug_log(message, level="INFO"):
@@ -516,18 +549,21 @@ except ImportError:
     use_enhanced_mapper = False
     debug_log("Enhanced column mapper not available, using basic cleaning", "WARNING")
 
-def clean_and_rename_columns(df):
+def clean_and_rename_columns(df, weight_unit=None):
     """Strip, normalize, and fix invisible chars with debug info"""
     if use_enhanced_mapper:
         try:
             debug_log(f"Using enhanced FirstMile column mapper on {len(df.columns)} columns")
-            mapped_df = clean_and_rename_columns_enhanced(df)
+            mapped_df = clean_and_rename_columns_enhanced(df, weight_unit=weight_unit)
             
             original_cols = set(df.columns)
             new_cols = set(mapped_df.columns)
             mapped_cols = new_cols - original_cols
             if mapped_cols:
                 debug_log(f"Mapped columns: {list(mapped_cols)}")
+            parse_failures = mapped_df.attrs.get('parse_failures', {})
+            if parse_failures:
+                debug_log(f"Unparseable numeric values: {parse_failures}", "WARNING")
             
             return mapped_df
         except Exception as e:
@@ -589,26 +625,9 @@ def safe_aggregate_percentage(series, condition_value, decimal_places=1):
 # Format dataframe with performance colors
 def style_performance_dataframe(df, performance_column='On-Time %'):
     """Apply performance-based styling to dataframe"""
-    def highlight_performance(val):
-        try:
-            # Remove % if present and convert to float
-            if isinstance(val, str) and '%' in val:
-                val = float(val.replace('%', ''))
-            else:
-                val = float(val)
-            
-            if val >= 95:
-                return 'background-color: #D4EDDA; color: #155724; font-weight: 600;'
-            elif val >= 90:
-                return 'background-color: #FFF3CD; color: #856404; font-weight: 600;'
-            else:
-                return 'background-color: #F8D7DA; color: #721C24; font-weight: 600;'
-        except:
-            return ''
-    
     # Apply styling only to performance columns
     if performance_column in df.columns:
-        return df.style.map(highlight_performance, subset=[performance_column])
+        return df.style.apply(performance_css, subset=[performance_column])
     return df
 
 # Load all the other functions from dashboard_imports.py (avoids duplicate st.set_page_config)
@@ -616,6 +635,7 @@ try:
     # Import all analysis functions from our safe imports file
     from dashboard_imports import (
         analyze_comprehensive_performance_enhanced,
+        iter_analysis_sections,
         analyze_tier_performance,
         analyze_service_mix,
         analyze_zone_distribution,
@@ -643,12 +663,15 @@ try:
 except ImportError as e:
     debug_log(f"Import error: {e}", "ERROR")
     # Define minimal versions if imports fail
-    def generate_demo_data(demo_type):
+    def generate_demo_data(demo_type, sections=None):
         return None, {}
     
-    def analyze_comprehensive_performance_enhanced(df):
+    def analyze_comprehensive_performance_enhanced(df, sections=None, filters=None, engine=None):
         return generate_empty_analysis_results()
     
+    def iter_analysis_sections(df, sections=None, filters=None, engine=None):
+        return iter(generate_empty_analysis_results().items())
+    
     def generate_empty_analysis_results():
         return {
             'tier_performance': pd.DataFrame(),
@@ -5,6 +5,14 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import re
+from analysis_engines import DEFAULT_ENGINE, get_engine
+from bitmap_index import bitmap_rows
+from section_planner import plan_sections
+from shipment_dataset import DAY_ORDER, ShipmentDataset
+from trend_engine import daily_trend_state, empty_trend_state
+from zip_geo import empty_zone_check, enrich_shipments, zone_check
+from zip_index import build_zip_index, empty_zip_index, top_zips, zip_index_frame
+from zone_inference import infer_zone_column
 
 # Copy the essential constants and functions from dashboard.py
 
@@ -33,6 +41,7 @@ ZONE_DEFINITIONS = {
     "8": {"miles": "1801+", "typical_transit": 7, "cost_index": 2.0}
 }
 
+# sla_days are business days (see business_days.py)
 XPARCEL_LOGIC = {
     "Priority": {
         "sla_days": 3,
@@ -90,6 +99,98 @@ def safe_aggregate_percentage(series, condition_value, decimal_places=1):
     except:
         return 0.0
 
+# ----------------------
+# Section finishers
+# ----------------------
+# Shared by the analyzers below and the engines that finish sections from
+# counts (polars_engine, batch_analysis.results_from_aggregates), so every
+# engine reports the same KPIs
+SERVICE_ORDER = ['Priority', 'Expedited', 'Ground']
+ROUTING_STATES = ['CA', 'TX', 'NY', 'FL']
+
+def sort_by_service(frame, column):
+    """Priority, Expedited, Ground, then other tiers in their current order"""
+    order = frame[column].apply(lambda x: SERVICE_ORDER.index(x) if x in SERVICE_ORDER else 999)
+    return frame.iloc[np.argsort(order.to_numpy(), kind='stable')].reset_index(drop=True)
+
+def tier_weighted_on_time(transit_n, on_time, sla_n):
+    """On-Time % of the tier table, weighted by each tier's shipments with a transit time (91.0 without any)"""
+    transit_n = np.asarray(transit_n, dtype=float)
+    if transit_n.sum() <= 0:
+        return 91.0
+    tier_on_time = np.array([safe_percentage(hits, n) for hits, n in zip(on_time, sla_n)])
+    return float((tier_on_time * transit_n).sum() / transit_n.sum())
+
+def exception_summary_from_counts(total_exceptions, total_shipments, avg_delay):
+    """Exception summary from SLA misses, shipments and the mean delay of late shipments"""
+    return {
+        'total_exceptions': int(total_exceptions),
+        'exception_rate': safe_percentage(total_exceptions, total_shipments),
+        # np.float64 so every engine rounds ties the same way
+        'avg_delay': round(np.float64(avg_delay), 1) if pd.notna(avg_delay) and avg_delay else 0
+    }
+
+def potential_savings(total_cost):
+    """15% savings potential on the current total cost"""
+    total_cost = np.float64(total_cost)
+    return round(total_cost - total_cost * 0.85, 2)
+
+def routing_from_counts(total_shipments, overservice, state_counts, friday_shipments):
+    """Routing recommendations from counts
+
+    overservice counts premium shipments to zones 1-3, state_counts maps
+    destination states to shipments and friday_shipments is None when
+    there is no request date.
+    """
+    recommendations = []
+    overservice = int(overservice)
+    if overservice > 0:
+        pct = safe_percentage(overservice, total_shipments)
+        recommendations.append({
+            'issue': 'Over-servicing detected',
+            'impact': f'{pct:.1f}% of short-zone shipments using premium service',
+            'recommendation': 'Downgrade zones 1-3 to Ground service where SLA permits',
+            'savings': f'${overservice * 3.50:.2f}'
+        })
+
+    # Check for carrier optimization opportunities
+    for state in ROUTING_STATES:
+        state_shipments = int(state_counts.get(state, 0))
+        if state_shipments > 50:
+            recommendations.append({
+                'issue': f'High volume to {state}',
+                'impact': f'{state_shipments} shipments',
+                'recommendation': f'Consider regional carrier for {state} deliveries',
+                'savings': f'${state_shipments * 1.25:.2f}'
+            })
+
+    # Friday cutoff recommendation
+    if friday_shipments is not None and friday_shipments > total_shipments * 0.15:
+        recommendations.append({
+            'issue': 'High Friday volume',
+            'impact': f'{int(friday_shipments)} Friday shipments',
+            'recommendation': 'Implement 2 PM Friday cutoff with auto-upgrade for zones 7-8',
+            'savings': 'Reduced SLA misses'
+        })
+
+    if not recommendations:
+        recommendations.append({
+            'issue': 'No major issues detected',
+            'impact': 'System operating efficiently',
+            'recommendation': 'Continue monitoring for optimization opportunities',
+            'savings': 'N/A'
+        })
+
+    # Calculate total potential improvement
+    return {
+        'recommendations': recommendations,
+        'potential_improvement': sum([
+            float(r['savings'].replace('$', '').replace(',', ''))
+            for r in recommendations
+            if r['savings'] != 'N/A' and '$' in r['savings']
+        ])
+    }
+
 def analyze_carrier_options(state, zone, service_type="Ground"):
     """Analyze best carrier options using National & Select toolkit"""
     carriers = []
@@ -122,21 +223,35 @@ def analyze_carrier_options(state, zone, service_type="Ground"):
     return carriers
 
 def calculate_zone_metrics(df):
-    """Enhanced zone analysis using Zone Toolkit"""
-    if 'Calculated Zone' not in df.columns:
+    """Enhanced zone analysis using Zone Toolkit
+    
+    Each zone's rows come from the dataset's bitmap index; only the transit
+    values of those rows are read, no per-zone copy of the frame is made.
+    """
+    data = ShipmentDataset.wrap(df)
+    if not data.has('calculated_zone'):
         return {}
     
+    zone_bitmaps = data.bitmaps['bitmaps'].get('zone', {})
+    transit = data.numeric('transit') if data.has('transit') else None
     zone_metrics = {}
     for zone, info in ZONE_DEFINITIONS.items():
-        zone_data = df[df['Calculated Zone'] == zone]
-        if len(zone_data) > 0:
-            zone_metrics[zone] = {
-                "volume": len(zone_data),
-                "avg_transit": zone_data['Days In Transit'].mean() if 'Days In Transit' in zone_data.columns else info["typical_transit"],
-                "cost_index": info["cost_index"],
-                "miles": info["miles"],
-                "typical_transit": info["typical_transit"]
-            }
+        if zone not in zone_bitmaps:
+            continue
+        rows = bitmap_rows(data.bitmaps, zone_bitmaps[zone])
+        if transit is not None:
+            values = transit[rows].astype(float)
+            values = values[~np.isnan(values)]
+            avg_transit = values.mean() if len(values) else np.nan
+        else:
+            avg_transit = info["typical_transit"]
+        zone_metrics[zone] = {
+            "volume": len(rows),
+            "avg_transit": avg_transit,
+            "cost_index": info["cost_index"],
+            "miles": info["miles"],
+            "typical_transit": info["typical_transit"]
+        }
     
     return zone_metrics
 
@@ -164,8 +279,11 @@ def apply_xparcel_logic(row):
     else:
         return "Ground"
 
-def generate_demo_data(data_type="Complete Dataset"):
-    """Generate comprehensive demo data with all required fields"""
+def generate_demo_data(data_type="Complete Dataset", sections=None):
+    """Generate comprehensive demo data with all required fields
+    
+    sections is passed on to the analysis (None analyzes every section).
+    """
     if data_type == "No Dataset":
         return None, {}
     
@@ -252,64 +370,207 @@ def generate_demo_data(data_type="Complete Dataset"):
     raw_df['SLA Status'] = raw_df.apply(get_sla_status, axis=1)
     
     # Create comprehensive analysis results
-    analysis_results = analyze_comprehensive_performance_enhanced(raw_df)
+    analysis_results = analyze_comprehensive_performance_enhanced(raw_df, sections)
     
     return raw_df, analysis_results
 
-def analyze_comprehensive_performance_enhanced(raw_df):
-    """Enhanced performance analysis with guaranteed results for all 11 sections"""
-    results = {}
-    
-    if raw_df is None or raw_df.empty:
+def analyze_comprehensive_performance_enhanced(raw_df, sections=None, filters=None, engine=None):
+    """Enhanced performance analysis with guaranteed results for all 11 sections
+    
+    sections limits the run to the result keys needed to show those sections
+    (see section_planner); sections that are not planned are left out.
+    filters limits the rows, e.g. {'carrier': ['UPS'], 'state': 'CA'}
+    (see bitmap_index); raw_df may then be a ShipmentDataset to reuse its index.
+    engine picks the implementation: 'pandas' (default), 'polars' or 'sql'
+    (see analysis_engines); an unknown name raises ValueError.
+    """
+    get_engine(engine)
+    if raw_df is None or len(raw_df) == 0:
         return generate_empty_analysis_results()
     
     try:
-        df = raw_df.copy()
-        
-        # Ensure we have required columns
-        ensure_required_columns(df)
-        
+        return dict(iter_analysis_sections(raw_df, sections, filters, engine))
+    except Exception as e:
+        return generate_empty_analysis_results()
+
+def iter_analysis_sections(raw_df, sections=None, filters=None, engine=None):
+    """Yield (section, result) pairs as each section is computed
+    
+    The executive summary comes first: it needs only counts and means, so
+    the dashboard can show it while the other sections are still running.
+    If another engine fails part way, the pandas engine computes the
+    remaining sections; if pandas fails, they are yielded empty.
+    """
+    run = get_engine(engine)
+    finished = set()
+    try:
+        for section, result in _analysis_sections(raw_df, sections, filters, run):
+            finished.add(section)
+            yield section, result
+    except Exception as e:
+        if engine not in (None, DEFAULT_ENGINE):
+            fallback = iter_analysis_sections(raw_df, sections, filters)
+        else:
+            fallback = generate_empty_analysis_results().items()
+        for section, result in fallback:
+            if section not in finished:
+                yield section, result
+
+def _analysis_sections(raw_df, sections, filters=None, run=None):
+    run = run or iter_pandas_sections
+    if filters:
+        # Rows picked by AND/OR over the bitmap index, then taken once. A
+        # ShipmentDataset keeps its index, so trying many filters builds it once.
+        raw_df = ShipmentDataset.wrap(raw_df).select(filters)
+    
+    if raw_df is None or len(raw_df) == 0:
+        yield from generate_empty_analysis_results().items()
+        return
+    
+    # The pandas engine reuses a dataset's derived fields; other engines read the frame
+    if isinstance(raw_df, ShipmentDataset) and run is not iter_pandas_sections:
+        raw_df = raw_df.df
+    yield from run(raw_df, sections)
+
+def iter_pandas_sections(raw_df, sections=None):
+    """The pandas engine: planned sections of a non-empty frame, in SECTION_ORDER
+    
+    raw_df may be a ShipmentDataset (e.g. from select); its derived fields
+    are reused where the required columns did not change them.
+    """
+    planned = plan_sections(sections)['sections']
+    source = raw_df if isinstance(raw_df, ShipmentDataset) else None
+    if source is not None:
+        raw_df = source.df
+    
+    # Shallow copy: required columns are added to df, never to the caller's frame
+    df = raw_df.copy(deep=False)
+    # Placeholder dates from ensure_required_columns must not show up as a trend
+    has_request_dates = 'Request Date' in df.columns
+    has_zone_column = 'Calculated Zone' in df.columns
+    
+    # Ensure we have required columns
+    changed = ensure_required_columns(df)
+    
+    # Resolved columns and derived fields (weekday, weight bucket, SLA days,
+    # delay) shared by every section; each is computed once, on first use
+    data = ShipmentDataset(df)
+    if source is not None:
+        data.reuse_derived(source, changed)
+    
+    zip_index = None
+    def build_index():
+        nonlocal zip_index
+        zip_index = build_zip_index(df)
+        return zip_index_frame(zip_index)
+    
+    steps = [
+        # KPIs over the uploaded columns only (defaults added above are not counted)
+        ('executive_summary', lambda: summarize_shipments(data, raw_df)),
         # 1. Performance by Xparcel Tier
-        results['tier_performance'] = analyze_tier_performance(df)
-        
+        ('tier_performance', lambda: analyze_tier_performance(data)),
         # 2. Service Mix
-        results['service_mix'] = analyze_service_mix(df)
-        
+        ('service_mix', lambda: analyze_service_mix(data)),
         # 3. Zone Distribution
-        results['zone_distribution'] = analyze_zone_distribution(df)
-        
+        ('zone_distribution', lambda: analyze_zone_distribution(data)),
         # 4. Transit Time by Zone
-        results['zone_transit'] = analyze_zone_transit(df)
-        
-        # 5. Exception Analysis
-        results['exception_hotspots'] = analyze_exceptions(df)
-        results['exception_summary'] = generate_exception_summary(df)
-        
+        ('zone_transit', lambda: analyze_zone_transit(data)),
+        # Reported zones against ZIP-to-ZIP distance (inferred zones are not checked)
+        ('zone_check', lambda: zone_check(df) if has_zone_column else empty_zone_check()),
+        # 5. Exception Analysis; per-ZIP measures behind ZIP/ZIP3 drill-downs (see zip_index)
+        ('zip_index', build_index),
+        ('exception_hotspots', lambda: analyze_exceptions(data, zip_index)),
+        ('exception_summary', lambda: generate_exception_summary(data)),
         # 6. Regional Performance
-        results['regional_performance'] = analyze_regional_performance(df)
-        
+        ('regional_performance', lambda: analyze_regional_performance(data)),
         # 7. Day of Week Analysis
-        results['day_of_week'] = analyze_day_of_week(df)
-        
+        ('day_of_week', lambda: analyze_day_of_week(data)),
+        # Per-day trend state behind the time-series view (see trend_engine)
+        ('daily_trend', lambda: (
+            daily_trend_state(df, data.dates('request_date')) if has_request_dates else empty_trend_state()
+        )),
         # 8. Weight Impact Analysis
-        results['weight_impact'] = analyze_weight_impact(df)
-        
+        ('weight_impact', lambda: analyze_weight_impact(data)),
         # 9. Carrier Performance
-        results['carrier_performance'] = analyze_carrier_performance(df)
-        
+        ('carrier_performance', lambda: analyze_carrier_performance(data)),
         # 10. Cost Analysis
-        results['cost_analysis'] = analyze_costs(df)
-        
+        ('cost_analysis', lambda: analyze_costs(data)),
         # 11. Routing Optimization
-        results['routing_optimization'] = generate_routing_recommendations(df)
-        
-    except Exception as e:
-        return generate_empty_analysis_results()
+        ('routing_optimization', lambda: generate_routing_recommendations(data))
+    ]
+    
+    # A failing section is yielded empty on its own; the others still run
+    for section, compute in steps:
+        if section not in planned:
+            continue
+        try:
+            result = compute()
+        except Exception as e:
+            result = empty_section_result(section)
+            if result is None:
+                continue
+        yield section, result
+
+def empty_section_result(section):
+    """Empty result of one section, or None for the executive summary"""
+    if section == 'zip_index':
+        return zip_index_frame(empty_zip_index())
+    if section == 'zone_check':
+        return empty_zone_check()
+    if section == 'daily_trend':
+        return empty_trend_state()
+    return generate_empty_analysis_results().get(section)
+
+def summarize_shipments(data, raw_df=None, weights=None):
+    """Executive summary KPIs from counts and means alone
+    
+    On-Time % is the tier-weighted figure of the tier table (as in batch
+    mode), computed from per-tier counts without building the table.
+    Averages read raw_df so that default columns are not averaged.
+    weights, when given, is the number of shipments each row stands for
+    (e.g. a sample preview); every count and average is weighted by it.
+    """
+    data = ShipmentDataset.wrap(data)
+    source = data.df if raw_df is None else raw_df
+    row_weights = np.ones(len(data)) if weights is None else np.asarray(weights, dtype=float)
+    
+    on_time_pct = 91.0
+    if data.has('tier', 'sla'):
+        codes, _ = pd.factorize(data.column('tier'), use_na_sentinel=True)
+        known = codes >= 0
+        slots = codes[known].max() + 1 if known.any() else 0
+        tiers = codes[known]
+        known_weights = row_weights[known]
+        # Per tier: shipments with a transit time, with an SLA status, and on time
+        transit_n = np.bincount(tiers, weights=(pd.notna(data.numeric('transit'))[known] * known_weights),
+                                minlength=slots)
+        sla_n = np.bincount(tiers, weights=(data.column('sla').notna().to_numpy()[known] * known_weights),
+                            minlength=slots)
+        hits = np.bincount(tiers, weights=data.is_on_time[known] * known_weights, minlength=slots)
+        on_time_pct = tier_weighted_on_time(transit_n, hits, sla_n)
+    
+    def mean(column):
+        if column not in source.columns:
+            return 0.0
+        if weights is None:
+            return float(source[column].mean())
+        values = pd.to_numeric(source[column], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        known = ~np.isnan(values)
+        return float(np.average(values[known], weights=row_weights[known])) if known.any() else np.nan
     
-    return results
+    return {
+        'total_shipments': len(source) if weights is None else int(np.rint(row_weights.sum())),
+        'avg_transit': mean('Days In Transit'),
+        'on_time_pct': on_time_pct,
+        'avg_cost': mean('Cost')
+    }
 
 def ensure_required_columns(df):
-    """Ensure all required columns exist with reasonable defaults"""
+    """Ensure all required columns exist with reasonable defaults
+    
+    Returns the columns added or rewritten.
+    """
+    before = set(df.columns)
     required_columns = {
         'Xparcel Type': 'Ground',
         'Days In Transit': 5,
@@ -323,9 +584,22 @@ def ensure_required_columns(df):
         'Delivery Date': datetime.now() + timedelta(days=5)
     }
     
+    # Infer missing zones from origin/destination ZIP3 rather than one constant
+    if 'Calculated Zone' not in df.columns:
+        inferred_zones = infer_zone_column(df)
+        if inferred_zones is not None:
+            df['Calculated Zone'] = inferred_zones.fillna(required_columns['Calculated Zone'])
+    
+    # Distance and missing destination state/city from the offline ZIP table (see zip_geo)
+    enrich_shipments(df)
+    
     for col, default in required_columns.items():
         if col not in df.columns:
             df[col] = default
+    
+    # Blank destination states/cities may have been backfilled in place
+    return sorted(set(df.columns) - before) + [col for col in ('Destination State', 'Destination City')
+                                                 if col in before]
 
 def generate_empty_analysis_results():
     """Generate empty but properly structured results for all sections"""
@@ -398,26 +672,23 @@ def generate_empty_analysis_results():
     }
 
 # Individual analysis functions
-def analyze_tier_performance(df):
+def analyze_tier_performance(data):
     """Analyze performance by Xparcel tier - FIXED to show only actual services"""
     try:
-        if 'Xparcel Type' not in df.columns or 'Days In Transit' not in df.columns:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('tier', 'transit'):
             return generate_empty_analysis_results()['tier_performance']
+        df = data.df
         
-        # Only analyze service types that actually exist in the data
-        actual_services = df['Xparcel Type'].dropna().unique()
-        
-        # Filter dataframe to only include rows with valid service types
-        valid_df = df[df['Xparcel Type'].isin(actual_services)]
-        
-        tier_analysis = valid_df.groupby('Xparcel Type', observed=True).agg({
+        # Only service types that actually exist in the data (groupby skips missing ones)
+        tier_analysis = df.groupby('Xparcel Type', observed=True).agg({
             'Days In Transit': ['count', 'mean', 'median', 
                                lambda x: np.percentile(x.dropna(), 95) if len(x.dropna()) > 0 else 0]
         }).round(2)
         
         # Add SLA performance
-        if 'SLA Status' in valid_df.columns:
-            sla_perf = valid_df.groupby('Xparcel Type', observed=True)['SLA Status'].apply(
+        if data.has('sla'):
+            sla_perf = df.groupby('Xparcel Type', observed=True)['SLA Status'].apply(
                 lambda x: safe_aggregate_percentage(x, 'On-Time')
             )
             tier_analysis = pd.concat([tier_analysis, sla_perf.to_frame('On-Time %')], axis=1)
@@ -425,28 +696,22 @@ def analyze_tier_performance(df):
             tier_analysis['On-Time %'] = 95.0  # Default
         
         tier_analysis.columns = ['Shipments', 'Avg Days', 'Median', '95th Pctl', 'On-Time %']
-        result = tier_analysis.reset_index()
         
         # Sort by a consistent order
-        service_order = ['Priority', 'Expedited', 'Ground']
-        result['sort_order'] = result['Xparcel Type'].apply(
-            lambda x: service_order.index(x) if x in service_order else 999
-        )
-        result = result.sort_values('sort_order').drop('sort_order', axis=1)
-        
-        return result
+        return sort_by_service(tier_analysis.reset_index(), 'Xparcel Type')
     
     except Exception as e:
         return generate_empty_analysis_results()['tier_performance']
 
-def analyze_service_mix(df):
+def analyze_service_mix(data):
     """Analyze service mix distribution - FIXED to respect actual data"""
     try:
-        if 'Xparcel Type' not in df.columns:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('tier'):
             return generate_empty_analysis_results()['service_mix']
         
         # Get the actual service types in the data
-        service_mix = df['Xparcel Type'].value_counts()
+        service_mix = data.column('tier').value_counts()
         
         # Only include services that actually exist in the data
         # Do NOT artificially add Ground if it doesn't exist
@@ -460,30 +725,19 @@ def analyze_service_mix(df):
         })
         
         # Sort by a consistent order if needed
-        service_order = ['Priority', 'Expedited', 'Ground']
-        result_df['sort_order'] = result_df['Service'].apply(
-            lambda x: service_order.index(x) if x in service_order else 999
-        )
-        result_df = result_df.sort_values('sort_order').drop('sort_order', axis=1)
-        
-        return result_df
+        return sort_by_service(result_df, 'Service')
     
     except Exception as e:
         return generate_empty_analysis_results()['service_mix']
 
-def analyze_zone_distribution(df):
+def analyze_zone_distribution(data):
     """Analyze zone distribution"""
     try:
-        zone_col = None
-        for col in df.columns:
-            if 'zone' in col.lower():
-                zone_col = col
-                break
-        
-        if not zone_col:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('zone'):
             return generate_empty_analysis_results()['zone_distribution']
         
-        zone_dist = df[zone_col].value_counts().sort_index()
+        zone_dist = data.column('zone').value_counts().sort_index()
         total = zone_dist.sum()
         zone_pct = zone_dist.apply(lambda x: safe_percentage(x, total))
         
@@ -496,19 +750,14 @@ def analyze_zone_distribution(df):
     except Exception as e:
         return generate_empty_analysis_results()['zone_distribution']
 
-def analyze_zone_transit(df):
+def analyze_zone_transit(data):
     """Analyze transit time by zone"""
     try:
-        zone_col = None
-        for col in df.columns:
-            if 'zone' in col.lower():
-                zone_col = col
-                break
-        
-        if not zone_col or 'Days In Transit' not in df.columns:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('zone', 'transit'):
             return generate_empty_analysis_results()['zone_transit']
         
-        zone_transit = df.groupby(zone_col, observed=False)['Days In Transit'].mean().round(2)
+        zone_transit = data.df.groupby(data.schema['zone'], observed=False)['Days In Transit'].mean().round(2)
         
         return pd.DataFrame({
             'Zone': zone_transit.index,
@@ -518,85 +767,65 @@ def analyze_zone_transit(df):
     except Exception as e:
         return generate_empty_analysis_results()['zone_transit']
 
-def analyze_exceptions(df):
-    """Analyze exception hotspots"""
+def analyze_exceptions(data, zip_index=None):
+    """Analyze exception hotspots (top ZIPs by SLA misses, read from the ZIP index)"""
     try:
-        if 'SLA Status' not in df.columns:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('sla'):
             return generate_empty_analysis_results()['exception_hotspots']
         
-        exceptions = df[df['SLA Status'] == 'SLA Miss']
-        
-        if len(exceptions) == 0:
+        if not data.is_miss.any():
             return pd.DataFrame({'ZIP': ['No Exceptions'], 'SLA Misses': [0]})
         
-        zip_col = None
-        for col in df.columns:
-            if 'zip' in col.lower() or 'postal' in col.lower():
-                zip_col = col
-                break
-        
-        if not zip_col:
+        if not data.has('zip'):
             return generate_empty_analysis_results()['exception_hotspots']
         
-        problem_zips = exceptions[zip_col].value_counts().head(10)
+        if zip_index is None:
+            zip_index = build_zip_index(data.df)
+        problem_zips = top_zips(zip_index, 10, by='misses')
         
-        return pd.DataFrame({
-            'ZIP': problem_zips.index,
-            'SLA Misses': problem_zips.values
-        })
+        if problem_zips.empty:
+            return generate_empty_analysis_results()['exception_hotspots']
+        
+        return problem_zips[['ZIP', 'SLA Misses']]
     
     except Exception as e:
         return generate_empty_analysis_results()['exception_hotspots']
 
-def generate_exception_summary(df):
+def generate_exception_summary(data):
     """Generate exception summary statistics"""
     try:
-        if 'SLA Status' not in df.columns:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('sla'):
             return generate_empty_analysis_results()['exception_summary']
         
-        total_shipments = len(df)
-        exceptions = df[df['SLA Status'] == 'SLA Miss']
-        total_exceptions = len(exceptions)
-        exception_rate = safe_percentage(total_exceptions, total_shipments)
-        
         avg_delay = 0
-        if 'Days In Transit' in exceptions.columns and 'Xparcel Type' in exceptions.columns:
-            delays = []
-            for _, row in exceptions.iterrows():
-                sla = XPARCEL_LOGIC.get(row['Xparcel Type'], {}).get('sla_days', 8)
-                delay = row['Days In Transit'] - sla
-                if delay > 0:
-                    delays.append(delay)
-            avg_delay = np.mean(delays) if delays else 0
-        
-        return {
-            'total_exceptions': total_exceptions,
-            'exception_rate': exception_rate,
-            'avg_delay': round(avg_delay, 1)
-        }
+        if data.has('transit', 'tier'):
+            delays = data.delay[data.is_miss]
+            delays = delays[delays > 0]
+            avg_delay = delays.mean() if len(delays) else 0
+        
+        return exception_summary_from_counts(data.is_miss.sum(), len(data), avg_delay)
     
     except Exception as e:
         return generate_empty_analysis_results()['exception_summary']
 
-def analyze_regional_performance(df):
+def analyze_regional_performance(data):
     """Analyze performance by region/state"""
     try:
-        state_col = None
-        for col in df.columns:
-            if 'state' in col.lower():
-                state_col = col
-                break
-        
-        if not state_col:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('state'):
             return generate_empty_analysis_results()['regional_performance']
+        state_col = data.schema['state']
+        df = data.df
         
-        if 'Days In Transit' in df.columns:
+        if data.has('transit'):
             regional = df.groupby(state_col, observed=False).agg({
                 'Days In Transit': ['count', 'mean']
             })
             regional.columns = ['Volume', 'Avg Transit']
             
-            if 'SLA Status' in df.columns:
+            if data.has('sla'):
                 sla_perf = df.groupby(state_col, observed=False)['SLA Status'].apply(
                     lambda x: safe_aggregate_percentage(x, 'On-Time')
                 )
@@ -611,29 +840,23 @@ def analyze_regional_performance(df):
     except Exception as e:
         return generate_empty_analysis_results()['regional_performance']
 
-def analyze_day_of_week(df):
+def analyze_day_of_week(data):
     """Analyze performance by day of week"""
     try:
-        date_col = None
-        for col in df.columns:
-            if 'date' in col.lower() and 'request' in col.lower():
-                date_col = col
-                break
-        
-        if not date_col:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('weekday_date'):
             return generate_empty_analysis_results()['day_of_week']
+        df = data.df
+        weekday = data.weekday
         
-        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-        df['Day_of_Week'] = df[date_col].dt.day_name()
-        
-        if 'Days In Transit' in df.columns:
-            dow_analysis = df.groupby('Day_of_Week', observed=False).agg({
+        if data.has('transit'):
+            dow_analysis = df.groupby(weekday, observed=True).agg({
                 'Days In Transit': ['count', 'mean']
             })
             dow_analysis.columns = ['Volume', 'Avg Transit']
             
-            if 'SLA Status' in df.columns:
-                sla_perf = df.groupby('Day_of_Week', observed=False)['SLA Status'].apply(
+            if data.has('sla'):
+                sla_perf = df.groupby(weekday, observed=True)['SLA Status'].apply(
                     lambda x: safe_aggregate_percentage(x, 'On-Time')
                 )
                 dow_analysis['On-Time %'] = sla_perf
@@ -646,8 +869,7 @@ def analyze_day_of_week(df):
             )
             
             # Ensure proper day ordering
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            dow_analysis = dow_analysis.reindex(day_order, fill_value=0)
+            dow_analysis = dow_analysis.reindex(DAY_ORDER, fill_value=0)
             
             return dow_analysis.reset_index()
         else:
@@ -656,35 +878,23 @@ def analyze_day_of_week(df):
     except Exception as e:
         return generate_empty_analysis_results()['day_of_week']
 
-def analyze_weight_impact(df):
+def analyze_weight_impact(data):
     """Analyze performance by weight category"""
     try:
-        weight_col = None
-        for col in df.columns:
-            if 'weight' in col.lower():
-                weight_col = col
-                break
-        
-        if not weight_col:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('weight'):
             return generate_empty_analysis_results()['weight_impact']
+        df = data.df
+        buckets = data.weight_buckets
         
-        df[weight_col] = pd.to_numeric(df[weight_col], errors='coerce')
-        
-        # Create weight buckets
-        df['Weight_Bucket'] = pd.cut(
-            df[weight_col], 
-            bins=[0, 0.25, 0.5, 1, 2, float('inf')], 
-            labels=['1-4 oz', '5-8 oz', '9-15 oz', '16-32 oz', '>32 oz']
-        )
-        
-        if 'Days In Transit' in df.columns:
-            weight_analysis = df.groupby('Weight_Bucket', observed=False).agg({
+        if data.has('transit'):
+            weight_analysis = df.groupby(buckets, observed=False).agg({
                 'Days In Transit': ['count', 'mean']
             })
             weight_analysis.columns = ['Volume', 'Avg Transit']
             
-            if 'SLA Status' in df.columns:
-                sla_perf = df.groupby('Weight_Bucket', observed=False)['SLA Status'].apply(
+            if data.has('sla'):
+                sla_perf = df.groupby(buckets, observed=False)['SLA Status'].apply(
                     lambda x: safe_aggregate_percentage(x, 'On-Time')
                 )
                 weight_analysis['On-Time %'] = sla_perf
@@ -698,10 +908,11 @@ def analyze_weight_impact(df):
     except Exception as e:
         return generate_empty_analysis_results()['weight_impact']
 
-def analyze_carrier_performance(df):
+def analyze_carrier_performance(data):
     """Analyze performance by carrier using toolkit data"""
     try:
-        if 'Carrier' not in df.columns:
+        data = ShipmentDataset.wrap(data)
+        if not data.has('carrier'):
             # If no carrier data, create sample
             return pd.DataFrame({
                 'Carrier': list(NATIONAL_CARRIERS.keys()) + ['OnTrac', 'LaserShip'],
@@ -709,6 +920,7 @@ def analyze_carrier_performance(df):
                 'On-Time %': [96.5, 97.2, 94.8, 98.1, 97.5],
                 'Avg Cost': [12.50, 13.25, 9.75, 8.90, 9.10]
             })
+        df = data.df
         
         carrier_perf = df.groupby('Carrier', observed=False).agg({
             'Days In Transit': 'count',
@@ -716,7 +928,7 @@ def analyze_carrier_performance(df):
         })
         carrier_perf.columns = ['Volume', 'Avg Cost']
         
-        if 'SLA Status' in df.columns:
+        if data.has('sla'):
             sla_perf = df.groupby('Carrier', observed=False)['SLA Status'].apply(
                 lambda x: safe_aggregate_percentage(x, 'On-Time')
             )
@@ -734,12 +946,14 @@ def analyze_carrier_performance(df):
             'Avg Cost': [0]
         })
 
-def analyze_costs(df):
+def analyze_costs(data):
     """Analyze shipping costs using cost optimization toolkit"""
     try:
+        data = ShipmentDataset.wrap(data)
+        df = data.df
         cost_analysis = {}
         
-        if 'Cost' in df.columns and 'Xparcel Type' in df.columns:
+        if data.has('cost', 'tier'):
             cost_by_service = df.groupby('Xparcel Type', observed=False)['Cost'].mean().to_dict()
             cost_analysis['avg_cost_by_service'] = cost_by_service
         else:
@@ -749,7 +963,7 @@ def analyze_costs(df):
                 'Priority': 18.25
             }
         
-        if 'Cost' in df.columns and 'Calculated Zone' in df.columns:
+        if data.has('cost', 'calculated_zone'):
             cost_by_zone = df.groupby('Calculated Zone', observed=False)['Cost'].mean().to_dict()
             cost_analysis['cost_per_zone'] = cost_by_zone
         else:
@@ -758,10 +972,8 @@ def analyze_costs(df):
             }
         
         # Calculate potential savings
-        if 'Cost' in df.columns:
-            current_total = df['Cost'].sum()
-            optimized_total = current_total * 0.85  # 15% savings potential
-            cost_analysis['potential_savings'] = round(current_total - optimized_total, 2)
+        if data.has('cost'):
+            cost_analysis['potential_savings'] = potential_savings(df['Cost'].sum())
         else:
             cost_analysis['potential_savings'] = 1250.00
         
@@ -770,70 +982,29 @@ def analyze_costs(df):
     except Exception as e:
         return generate_empty_analysis_results()['cost_analysis']
 
-def generate_routing_recommendations(df):
+def generate_routing_recommendations(data):
     """Generate routing optimization recommendations"""
     try:
-        recommendations = []
+        data = ShipmentDataset.wrap(data)
+        df = data.df
         
-        # Analyze current routing efficiency
-        if 'Calculated Zone' in df.columns and 'Xparcel Type' in df.columns:
-            # Check for over-servicing
-            overservice = df[
+        # Analyze current routing efficiency: over-servicing short zones
+        overservice = 0
+        if data.has('calculated_zone', 'tier'):
+            overservice = (
                 (df['Calculated Zone'].isin(['1', '2', '3'])) & 
                 (df['Xparcel Type'].isin(['Expedited', 'Priority']))
-            ]
-            if len(overservice) > 0:
-                pct = safe_percentage(len(overservice), len(df))
-                recommendations.append({
-                    'issue': 'Over-servicing detected',
-                    'impact': f'{pct:.1f}% of short-zone shipments using premium service',
-                    'recommendation': 'Downgrade zones 1-3 to Ground service where SLA permits',
-                    'savings': f'${len(overservice) * 3.50:.2f}'
-                })
-        
-        # Check for carrier optimization opportunities
-        if 'Destination State' in df.columns:
-            for state in ['CA', 'TX', 'NY', 'FL']:
-                state_shipments = df[df['Destination State'] == state]
-                if len(state_shipments) > 50:
-                    recommendations.append({
-                        'issue': f'High volume to {state}',
-                        'impact': f'{len(state_shipments)} shipments',
-                        'recommendation': f'Consider regional carrier for {state} deliveries',
-                        'savings': f'${len(state_shipments) * 1.25:.2f}'
-                    })
-        
-        # Friday cutoff recommendation
-        if 'Request Date' in df.columns:
-            df['Request Date'] = pd.to_datetime(df['Request Date'], errors='coerce')
-            friday_shipments = df[df['Request Date'].dt.dayofweek == 4]
-            if len(friday_shipments) > len(df) * 0.15:
-                recommendations.append({
-                    'issue': 'High Friday volume',
-                    'impact': f'{len(friday_shipments)} Friday shipments',
-                    'recommendation': 'Implement 2 PM Friday cutoff with auto-upgrade for zones 7-8',
-                    'savings': 'Reduced SLA misses'
-                })
-        
-        if not recommendations:
-            recommendations.append({
-                'issue': 'No major issues detected',
-                'impact': 'System operating efficiently',
-                'recommendation': 'Continue monitoring for optimization opportunities',
-                'savings': 'N/A'
-            })
+            ).sum()
         
-        # Calculate total potential improvement
-        total_savings = sum([
-            float(r['savings'].replace('$', '').replace(',', '')) 
-            for r in recommendations 
-            if r['savings'] != 'N/A' and '$' in r['savings']
-        ])
+        state_counts = {}
+        if data.has('destination_state'):
+            state_counts = data.column('destination_state').value_counts()
         
-        return {
-            'recommendations': recommendations,
-            'potential_improvement': total_savings
-        }
+        friday_shipments = None
+        if data.has('request_date'):
+            friday_shipments = int((data.dates('request_date').dt.dayofweek == 4).sum())
+        
+        return routing_from_counts(len(df), overservice, state_counts, friday_shipments)
     
     except Exception as e:
         return generate_empty_analysis_results()['routing_optimization']
@@ -5,31 +5,167 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import itertools
+import os
 import plotly.express as px
+from background_jobs import cancel_job, job_error, job_result, job_status, submit_job
+from batch_analysis import expand_batch_sources, run_batch_analysis
+from chart_data import cached_figure, prepare_chart_frame
+from execution_planner import describe_plan, load_shipments, plan_ingestion
+from render_cache import cached_css, performance_css, render_key, style_column
+from sampling import iter_preview_sections, wants_preview
+from section_planner import plan_sections
+from shipment_dataset import ShipmentDataset
+from trend_engine import trend_table
+from typed_parsing import describe_parse_failures
+from zip_index import zip3_detail, zip3_rollup, zip_index_from_frame, zip_lookup
+from export_cache import (
+    analysis_fingerprint,
+    export_error,
+    export_path,
+    export_status,
+    request_export
+)
+from report_exports import PYARROW_AVAILABLE
+
+EXPORT_POLL_SECONDS = 2
+# Tables longer than this are styled and shown one page at a time
+TABLE_PAGE_ROWS = 500
+TREND_GRANULARITY = {'Daily': 'D', 'Weekly': 'W', 'Monthly': 'M'}
 
 # Execute the FirstMile styled dashboard
 exec(open('dashboard_firstmile_style.py', encoding='utf-8').read())
 
 # Define all functions first
-def display_analysis_results(results, df):
-    """Display all 11 dashboard sections"""
-    
-    # 1. Executive Summary
+def service_mix_figure(frame):
+    fig = px.pie(
+        frame,
+        values='Shipments',
+        names='Service',
+        color_discrete_sequence=['#5CB85C', '#1E3A8A', '#6C757D']
+    )
+    fig.update_layout(
+        title=dict(text="Service Mix Distribution", font=dict(size=20)),
+        height=400
+    )
+    return fig
+
+def zone_distribution_figure(frame):
+    fig = px.bar(
+        frame,
+        x='Zone',
+        y='Shipments',
+        title='Shipments by Zone',
+        color='Percentage',
+        color_continuous_scale=['#E7F3FF', '#5CB85C']
+    )
+    fig.update_layout(height=350, title_font_size=18)
+    return fig
+
+def zone_transit_figure(frame):
+    fig = px.line(
+        frame,
+        x='Zone',
+        y='Avg Transit Days',
+        title='Transit Time by Zone',
+        markers=True,
+        line_shape='spline'
+    )
+    fig.update_traces(line_color='#1E3A8A', line_width=3)
+    fig.update_layout(height=350, title_font_size=18)
+    return fig
+
+def day_of_week_figure(frame):
+    fig = px.bar(
+        frame,
+        x='Day_of_Week',
+        y='Volume',
+        title='Volume by Day of Week',
+        color='On-Time %',
+        color_continuous_scale=['#F8D7DA', '#FFF3CD', '#D4EDDA']
+    )
+    fig.update_layout(height=350, title_font_size=18)
+    return fig
+
+def current_theme():
+    """Active Streamlit theme ('light' or 'dark'), used in render cache keys"""
+    try:
+        return st.context.theme.type or 'light'
+    except Exception:
+        return 'light'
+
+def trend_figure(frame):
+    fig = px.line(
+        frame,
+        x='Period',
+        y='Shipments',
+        title='Shipments over Time',
+        markers=True,
+        hover_data=['On-Time %', 'Avg Transit Days', 'Avg Cost']
+    )
+    fig.update_traces(line_color='#5CB85C', line_width=3)
+    fig.update_layout(height=350, title_font_size=18)
+    return fig
+
+def render_chart(name, section_df, x, y, builder, agg='sum'):
+    """Plot a section from the render cache, downsampling it on first build"""
+    figure = cached_figure(
+        render_key(name, section_df, current_theme()),
+        lambda: builder(prepare_chart_frame(section_df, x, y, agg=agg))
+    )
+    st.plotly_chart(figure, use_container_width=True)
+
+def render_table(name, section_df, performance_column='On-Time %'):
+    """Show a performance table, reusing its CSS while the section is unchanged
+    
+    Tables above TABLE_PAGE_ROWS are paginated so only the visible page is styled.
+    """
+    page_df = section_df
+    page = 1
+    if len(section_df) > TABLE_PAGE_ROWS:
+        page_count = (len(section_df) - 1) // TABLE_PAGE_ROWS + 1
+        page = st.number_input(
+            f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+            key=f"page_{name}"
+        )
+        start = (page - 1) * TABLE_PAGE_ROWS
+        page_df = section_df.iloc[start:start + TABLE_PAGE_ROWS]
+        st.caption(f"Rows {start + 1:,}-{start + len(page_df):,} of {len(section_df):,}")
+    
+    if performance_column not in page_df.columns:
+        st.dataframe(page_df, use_container_width=True, hide_index=True)
+        return
+    css = cached_css(
+        render_key(name, section_df, current_theme()) + (page, performance_column),
+        lambda: performance_css(page_df[performance_column])
+    )
+    st.dataframe(style_column(page_df, performance_column, css), use_container_width=True, hide_index=True)
+
+def render_executive_summary(results, df):
+    """1. Executive Summary KPIs"""
     st.markdown('<div class="fm-section-header"><h2>Executive Summary</h2></div>', unsafe_allow_html=True)
     
     col1, col2, col3, col4 = st.columns(4)
     
+    # Computed up front from counts and means (see summarize_shipments)
+    summary = results.get('executive_summary', {})
+    
     with col1:
-        total_shipments = len(df)
+        total_shipments = summary['total_shipments'] if summary else len(df)
         st.metric("Total Shipments", f"{total_shipments:,}")
     
     with col2:
-        avg_transit = df['Days In Transit'].mean() if 'Days In Transit' in df.columns else 0
+        if summary:
+            avg_transit = summary['avg_transit']
+        else:
+            avg_transit = df['Days In Transit'].mean() if 'Days In Transit' in df.columns else 0
         st.metric("Avg Transit Days", f"{avg_transit:.1f}")
     
     with col3:
         # Get on-time percentage from tier performance or calculate from exception rate
-        if 'tier_performance' in results and not results['tier_performance'].empty:
+        if summary:
+            on_time_pct = summary['on_time_pct']
+        elif 'tier_performance' in results and not results['tier_performance'].empty:
             # Calculate weighted average on-time percentage
             tier_df = results['tier_performance']
             if 'On-Time %' in tier_df.columns and 'Shipments' in tier_df.columns:
@@ -48,17 +184,28 @@ def display_analysis_results(results, df):
         st.metric("On-Time %", f"{on_time_pct:.1f}%")
     
     with col4:
-        avg_cost = df['Cost'].mean() if 'Cost' in df.columns else 0
+        if summary:
+            avg_cost = summary['avg_cost']
+        else:
+            avg_cost = df['Cost'].mean() if 'Cost' in df.columns else 0
         st.metric("Avg Cost", f"${avg_cost:.2f}")
     
-    # 2. Performance by Xparcel Tier
+    if summary.get('sample_rows'):
+        margins = f"On-Time % ±{summary['on_time_ci']:.1f} pts"
+        if 'avg_transit_ci' in summary:
+            margins += f", Avg Transit ±{summary['avg_transit_ci']:.2f} days"
+        st.caption(f"Estimated from a stratified sample of {summary['sample_rows']:,} of "
+                   f"{summary['population']:,} shipments ({margins}, 95% confidence)")
+
+def render_tier_performance(results, df):
+    """2. Performance by Xparcel Tier table"""
     st.markdown('<div class="fm-section-header"><h2>Performance by Xparcel Tier</h2></div>', unsafe_allow_html=True)
     
     if 'tier_performance' in results and not results['tier_performance'].empty:
-        styled_df = style_performance_dataframe(results['tier_performance'], 'On-Time %')
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-    
-    # 3. Service Mix Analysis
+        render_table('tier_performance', results['tier_performance'])
+
+def render_service_mix(results, df):
+    """3. Service mix table and chart"""
     st.markdown('<div class="fm-section-header"><h2>Service Mix Analysis</h2></div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns([1, 2])
@@ -68,50 +215,30 @@ def display_analysis_results(results, df):
     
     with col2:
         if 'service_mix' in results and not results['service_mix'].empty:
-            fig = px.pie(
-                results['service_mix'], 
-                values='Shipments', 
-                names='Service',
-                color_discrete_sequence=['#5CB85C', '#1E3A8A', '#6C757D']
-            )
-            fig.update_layout(
-                title=dict(text="Service Mix Distribution", font=dict(size=20)),
-                height=400
-            )
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # 4. Zone Distribution
+            render_chart('service_mix', results['service_mix'], 'Service', 'Shipments', service_mix_figure)
+
+def render_zones(results, df):
+    """4. Zone distribution and transit charts with the zone cross-check"""
     st.markdown('<div class="fm-section-header"><h2>Zone Distribution & Transit Times</h2></div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
     with col1:
         if 'zone_distribution' in results and not results['zone_distribution'].empty:
-            fig = px.bar(
-                results['zone_distribution'],
-                x='Zone',
-                y='Shipments',
-                title='Shipments by Zone',
-                color='Percentage',
-                color_continuous_scale=['#E7F3FF', '#5CB85C']
-            )
-            fig.update_layout(height=350, title_font_size=18)
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart('zone_distribution', results['zone_distribution'], 'Zone', 'Shipments',
+                         zone_distribution_figure)
     
     with col2:
         if 'zone_transit' in results and not results['zone_transit'].empty:
-            fig = px.line(
-                results['zone_transit'],
-                x='Zone',
-                y='Avg Transit Days',
-                title='Transit Time by Zone',
-                markers=True,
-                line_shape='spline'
-            )
-            fig.update_traces(line_color='#1E3A8A', line_width=3)
-            fig.update_layout(height=350, title_font_size=18)
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart('zone_transit', results['zone_transit'], 'Zone', 'Avg Transit Days',
+                         zone_transit_figure, agg='mean')
     
-    # 5. Exception Analysis
+    zone_check = results.get('zone_check', {})
+    if zone_check.get('checked', 0) > 0:
+        st.caption(f"Zone cross-check: {zone_check['mismatches']:,} of {zone_check['checked']:,} shipments "
+                   f"({zone_check['mismatch_rate']}%) are more than one zone away from their ZIP-to-ZIP distance")
+
+def render_exceptions(results, df):
+    """5. Exception metrics, hotspot ZIPs and the ZIP drill-down"""
     st.markdown('<div class="fm-section-header"><h2>Exception Analysis</h2></div>', unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns(3)
@@ -129,43 +256,68 @@ def display_analysis_results(results, df):
         st.subheader("Top Exception ZIP Codes")
         st.dataframe(results['exception_hotspots'].head(5), use_container_width=True, hide_index=True)
     
-    # 6. Regional Performance
+    zip_table = results.get('zip_index')
+    if zip_table is not None and not zip_table.empty:
+        with st.expander("ZIP drill-down"):
+            zip_index = zip_index_from_frame(zip_table)
+            query = st.text_input("ZIP5 or ZIP3", key="zip_drilldown").strip()
+            if len(query) == 5 and query.isdigit():
+                stats = zip_lookup(zip_index, query)
+                if stats is None:
+                    st.info(f"No shipments to {query}")
+                else:
+                    st.dataframe(pd.DataFrame([stats]), use_container_width=True, hide_index=True)
+            elif len(query) == 3 and query.isdigit():
+                st.dataframe(zip3_detail(zip_index, query), use_container_width=True, hide_index=True)
+            elif query:
+                st.warning("Enter a 5-digit ZIP or a 3-digit ZIP prefix")
+    
+            st.caption("ZIP3 areas with the most SLA misses")
+            zip3 = zip3_rollup(zip_index).sort_values(['SLA Misses', 'ZIP3'], ascending=[False, True])
+            st.dataframe(zip3.head(10), use_container_width=True, hide_index=True)
+
+def render_regional_performance(results, df):
+    """6. Regional performance table"""
     st.markdown('<div class="fm-section-header"><h2>Regional Performance</h2></div>', unsafe_allow_html=True)
     
     if 'regional_performance' in results and not results['regional_performance'].empty:
-        styled_df = style_performance_dataframe(results['regional_performance'], 'On-Time %')
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-    
-    # 7. Day of Week Analysis
+        render_table('regional_performance', results['regional_performance'])
+
+def render_day_of_week(results, df):
+    """7. Day-of-week volume chart"""
     st.markdown('<div class="fm-section-header"><h2>Day of Week Performance</h2></div>', unsafe_allow_html=True)
     
     if 'day_of_week' in results and not results['day_of_week'].empty:
-        fig = px.bar(
-            results['day_of_week'],
-            x='Day_of_Week',
-            y='Volume',
-            title='Volume by Day of Week',
-            color='On-Time %',
-            color_continuous_scale=['#F8D7DA', '#FFF3CD', '#D4EDDA']
-        )
-        fig.update_layout(height=350, title_font_size=18)
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # 8. Weight Impact
+        render_chart('day_of_week', results['day_of_week'], 'Day_of_Week', 'Volume', day_of_week_figure)
+
+def render_trends(results, df):
+    """Shipment trends over Request Date"""
+    daily_trend = results.get('daily_trend')
+    if daily_trend is not None and not daily_trend.empty:
+        st.subheader("Shipment Trends")
+        granularity = st.radio("Granularity", list(TREND_GRANULARITY), index=1, horizontal=True,
+                               key="trend_granularity")
+        freq = TREND_GRANULARITY[granularity]
+        render_chart(f'trend_{freq}', trend_table(daily_trend, freq), 'Period', 'Shipments', trend_figure)
+        with st.expander("Trend by Xparcel tier"):
+            render_table(f'trend_tier_{freq}', trend_table(daily_trend, freq, by_tier=True))
+
+def render_weight_impact(results, df):
+    """8. Weight impact table"""
     st.markdown('<div class="fm-section-header"><h2>Weight Impact Analysis</h2></div>', unsafe_allow_html=True)
     
     if 'weight_impact' in results and not results['weight_impact'].empty:
-        styled_df = style_performance_dataframe(results['weight_impact'], 'On-Time %')
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-    
-    # 9. Carrier Performance
+        render_table('weight_impact', results['weight_impact'])
+
+def render_carrier_performance(results, df):
+    """9. Carrier scorecard"""
     st.markdown('<div class="fm-section-header"><h2>Carrier Performance Scorecard</h2></div>', unsafe_allow_html=True)
     
     if 'carrier_performance' in results and not results['carrier_performance'].empty:
-        styled_df = style_performance_dataframe(results['carrier_performance'], 'On-Time %')
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-    
-    # 10. Cost Analysis
+        render_table('carrier_performance', results['carrier_performance'])
+
+def render_cost_analysis(results, df):
+    """10. Potential savings and cost by service"""
     st.markdown('<div class="fm-section-header"><h2>Cost Optimization Analysis</h2></div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
@@ -180,8 +332,9 @@ def display_analysis_results(results, df):
                 columns=['Service', 'Avg Cost']
             )
             st.dataframe(cost_df, use_container_width=True, hide_index=True)
-    
-    # 11. Routing Recommendations
+
+def render_routing(results, df):
+    """11. Routing recommendations"""
     st.markdown('<div class="fm-section-header"><h2>Strategic Routing Recommendations</h2></div>', unsafe_allow_html=True)
     
     if 'routing_optimization' in results and results['routing_optimization'].get('recommendations'):
@@ -193,97 +346,239 @@ def display_analysis_results(results, df):
                     st.write(f"**Recommendation:** {rec.get('recommendation', 'N/A')}")
                 with col2:
                     st.write(f"**Savings:** {rec.get('savings', 'N/A')}")
-    
-    # Export Options
+
+def data_fingerprint(data_key, df):
+    """Content hash of the loaded frame, computed once per data_key (e.g. an upload) per session"""
+    if df is None or data_key is None:
+        return None
+    cached = st.session_state.get('data_fingerprint')
+    if cached is None or cached[0] != data_key:
+        cached = (data_key, ShipmentDataset(df).fingerprint)
+        st.session_state['data_fingerprint'] = cached
+    return cached[1]
+
+def render_exports(results, df, data_key=None):
+    """Export buttons for the finished analysis"""
     st.divider()
     st.markdown("### Export Options")
     
+    # Exports are built in the background and cached on disk per analysis
+    fingerprint = analysis_fingerprint(df, results, data_fingerprint(data_key, df))
+    
     col1, col2, col3 = st.columns(3)
     with col1:
-        if st.button("Export to Excel", type="primary"):
-            export_to_excel(df, results)
+        render_export(fingerprint, 'xlsx', df, results)
     
     with col2:
-        if st.button("Export Summary CSV"):
-            export_summary_csv(results)
+        render_export(fingerprint, 'csv', df, results)
     
     with col3:
         st.info("Email reports coming soon!")
+    
+    # Columnar exports for warehouse loads
+    if PYARROW_AVAILABLE:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            render_export(fingerprint, 'parquet', df, results)
+        with col2:
+            render_export(fingerprint, 'arrow', df, results)
 
-def export_to_excel(df, results):
-    """Export comprehensive Excel report"""
-    try:
-        import io
-        from datetime import datetime
-        
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Raw data
-            df.to_excel(writer, sheet_name='Raw Data', index=False)
-            
-            # Analysis results
-            if 'tier_performance' in results and not results['tier_performance'].empty:
-                results['tier_performance'].to_excel(writer, sheet_name='Tier Performance', index=False)
-            if 'service_mix' in results and not results['service_mix'].empty:
-                results['service_mix'].to_excel(writer, sheet_name='Service Mix', index=False)
-            if 'zone_distribution' in results and not results['zone_distribution'].empty:
-                results['zone_distribution'].to_excel(writer, sheet_name='Zone Distribution', index=False)
-            if 'regional_performance' in results and not results['regional_performance'].empty:
-                results['regional_performance'].to_excel(writer, sheet_name='Regional Performance', index=False)
-            if 'carrier_performance' in results and not results['carrier_performance'].empty:
-                results['carrier_performance'].to_excel(writer, sheet_name='Carrier Performance', index=False)
-            
-            # Format
-            workbook = writer.book
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#5CB85C',
-                'font_color': 'white',
-                'border': 1
-            })
-            
-            for sheet in writer.sheets.values():
-                sheet.set_row(0, 20, header_format)
-                sheet.set_column(0, 20, 15)
-        
-        output.seek(0)
-        
-        st.download_button(
-            label="Download Excel Report",
-            data=output,
-            file_name=f"FirstMile_TransitIQ_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        
-    except Exception as e:
-        st.error(f"Error creating Excel export: {str(e)}")
+# Page order: (renderer, result keys it shows)
+DISPLAY_SECTIONS = [
+    (render_executive_summary, ['executive_summary']),
+    (render_tier_performance, ['tier_performance']),
+    (render_service_mix, ['service_mix']),
+    (render_zones, ['zone_distribution', 'zone_transit', 'zone_check']),
+    (render_exceptions, ['exception_summary', 'exception_hotspots', 'zip_index']),
+    (render_regional_performance, ['regional_performance']),
+    (render_day_of_week, ['day_of_week']),
+    (render_trends, ['daily_trend']),
+    (render_weight_impact, ['weight_impact']),
+    (render_carrier_performance, ['carrier_performance']),
+    (render_cost_analysis, ['cost_analysis']),
+    (render_routing, ['routing_optimization'])
+]
+
+def display_analysis_results(results, df, sections=None, exports=True, data_key=None):
+    """Display the dashboard sections (all 11 unless sections limits them)
+    
+    results is a results dict or an iterator of (section, result) pairs such
+    as iter_analysis_sections. Every section gets a placeholder up front and
+    is drawn as soon as the results it shows have arrived. exports=False
+    leaves out the export buttons (e.g. for a sample preview). data_key
+    identifies df across reruns, so its export fingerprint is hashed once.
+    """
+    expected = set(plan_sections(sections)['sections'])
+    pending = []
+    for render, keys in DISPLAY_SECTIONS:
+        shown = [key for key in keys if key in expected]
+        if shown:
+            placeholder = st.empty()
+            placeholder.caption("⏳ Analyzing...")
+            pending.append((render, shown, placeholder))
+    
+    collected = {}
+    items = results.items() if isinstance(results, dict) else results
+    for section, result in items:
+        collected[section] = result
+        waiting = []
+        for render, keys, placeholder in pending:
+            if all(key in collected for key in keys):
+                with placeholder.container():
+                    render(collected, df)
+            else:
+                waiting.append((render, keys, placeholder))
+        pending = waiting
+    
+    # Sections whose results never arrived are drawn with what there is
+    for render, keys, placeholder in pending:
+        with placeholder.container():
+            render(collected, df)
+    
+    if exports:
+        render_exports(collected, df, data_key)
+    else:
+        st.divider()
+        st.caption("Exports are available once the exact results are in.")
+
+def upload_key(uploaded_file):
+    """Identity of an upload that stays the same across reruns"""
+    return getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{getattr(uploaded_file, 'size', '')}"
+
+def batch_key(sources):
+    """Identity of a batch: its uploads, and its server files with their size and mtime"""
+    parts = []
+    for source in sources:
+        if isinstance(source, str):
+            stat = os.stat(source)
+            parts.append(f"{source}:{stat.st_size}:{stat.st_mtime_ns}")
+        else:
+            parts.append(upload_key(source))
+    return '|'.join(parts)
+
+def cached_batch_analysis(sources):
+    """run_batch_analysis once per batch per session, so reruns reuse its results"""
+    key = batch_key(sources)
+    cached = st.session_state.get('batch_analysis')
+    if cached is None or cached[0] != key:
+        with st.spinner(f"Analyzing {len(sources)} files..."):
+            cached = (key, run_batch_analysis(sources))
+        st.session_state['batch_analysis'] = cached
+    return cached[1]
 
-def export_summary_csv(results):
-    """Export summary CSV"""
+def exact_analysis_key(uploaded_file, sections):
+    """Background job key for the exact analysis of one upload and section set"""
+    return f"exact:{upload_key(uploaded_file)}:{','.join(plan_sections(sections)['sections'])}"
+
+def render_exact_status(key):
+    """Progress note while the exact analysis runs; reruns the page when it is done"""
+    if job_status(key) == 'running':
+        st.info("Preview from a stratified sample (± = 95% confidence). "
+                "Exact results are being computed in the background and will replace it.")
+    else:
+        st.rerun()
+
+def track_exact_job(key):
+    """Remember this session's exact-analysis job, dropping the one it replaces
+    
+    A new upload or section set gets a new key; the previous job's frame and
+    results would otherwise stay in memory for the life of the server.
+    """
+    previous = st.session_state.get('exact_job_key')
+    if previous is not None and previous != key:
+        cancel_job(previous)
+    st.session_state['exact_job_key'] = key
+
+def display_preview_then_exact(raw_df, sections, key, engine=None, data_key=None):
+    """Sample preview now, exact results once the background analysis finishes"""
+    track_exact_job(key)
+    status = job_status(key)
+    if status == 'done':
+        display_analysis_results(job_result(key), raw_df, sections, data_key=data_key)
+        return
+    
+    # Draw the sample and its Executive Summary before the exact job competes for the CPU
+    preview = iter_preview_sections(raw_df, sections)
+    first = list(itertools.islice(preview, 1))
+    if status == 'missing':
+        submit_job(key, analyze_comprehensive_performance_enhanced, raw_df, sections, engine=engine)
+    if status == 'failed':
+        st.warning(f"Exact analysis failed ({job_error(key)}); showing the sample preview")
+    elif hasattr(st, 'fragment'):
+        # Only this note reruns until the worker finishes
+        st.fragment(run_every=EXPORT_POLL_SECONDS)(render_exact_status)(key)
+    else:
+        st.info("Preview from a stratified sample (± = 95% confidence). "
+                "Exact results are being computed in the background; rerun to load them.")
+    display_analysis_results(itertools.chain(first, preview), raw_df, sections, exports=False)
+
+EXPORT_OPTIONS = {
+    'xlsx': {
+        'label': "Excel report",
+        'button': "Export to Excel",
+        'download': "Download Excel Report",
+        'file_name': "FirstMile_TransitIQ_Report_{timestamp}.xlsx",
+        'mime': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    },
+    'csv': {
+        'label': "summary CSV",
+        'button': "Export Summary CSV",
+        'download': "Download Summary CSV",
+        'file_name': "FirstMile_Summary_{timestamp}.csv",
+        'mime': "text/csv"
+    },
+    'parquet': {
+        'label': "Parquet files",
+        'button': "Export Parquet",
+        'download': "Download Parquet (zip)",
+        'file_name': "FirstMile_TransitIQ_Parquet_{timestamp}.zip",
+        'mime': "application/zip"
+    },
+    'arrow': {
+        'label': "Arrow IPC streams",
+        'button': "Export Arrow IPC",
+        'download': "Download Arrow IPC (zip)",
+        'file_name': "FirstMile_TransitIQ_Arrow_{timestamp}.zip",
+        'mime': "application/zip"
+    }
+}
+
+def render_export_status(fingerprint, kind):
+    """Download button when the cached export is ready, progress note while it builds"""
+    options = EXPORT_OPTIONS[kind]
+    status = export_status(fingerprint, kind)
+    
+    if status == 'ready':
+        with open(export_path(fingerprint, kind), 'rb') as export_file:
+            st.download_button(
+                label=options['download'],
+                data=export_file,
+                file_name=options['file_name'].format(timestamp=datetime.now().strftime('%Y%m%d_%H%M%S')),
+                mime=options['mime'],
+                key=f"download_{kind}"
+            )
+    elif status == 'running':
+        st.info(f"Preparing {options['label']} in the background...")
+    elif status == 'failed':
+        st.error(f"Error creating export: {export_error(fingerprint, kind)}")
+    return status
+
+def render_export(fingerprint, kind, df, results):
+    """Request a deferred export and poll for it without blocking the page"""
+    options = EXPORT_OPTIONS[kind]
     try:
-        summary_data = {
-            'Metric': ['Total Shipments', 'On-Time %', 'Exception Rate', 'Avg Transit Days'],
-            'Value': [
-                len(results.get('tier_performance', pd.DataFrame())),
-                100 - results.get('exception_summary', {}).get('exception_rate', 0),
-                results.get('exception_summary', {}).get('exception_rate', 0),
-                results.get('tier_performance', pd.DataFrame()).get('Avg Days', pd.Series()).mean() if 'tier_performance' in results else 0
-            ]
-        }
-        
-        summary_df = pd.DataFrame(summary_data)
-        
-        csv = summary_df.to_csv(index=False)
-        st.download_button(
-            label="Download Summary CSV",
-            data=csv,
-            file_name=f"FirstMile_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
-        )
+        if export_status(fingerprint, kind) in ('missing', 'failed'):
+            if st.button(options['button'], type="primary" if kind == 'xlsx' else "secondary", key=f"export_{kind}"):
+                request_export(fingerprint, kind, df, results)
         
+        if export_status(fingerprint, kind) == 'running' and hasattr(st, 'fragment'):
+            # Only this small block reruns until the worker finishes
+            st.fragment(run_every=EXPORT_POLL_SECONDS)(render_export_status)(fingerprint, kind)
+        else:
+            render_export_status(fingerprint, kind)
+    
     except Exception as e:
-        st.error(f"Error creating CSV export: {str(e)}")
+        st.error(f"Error creating export: {str(e)}")
 
 # Main Dashboard Title
 st.markdown("""
@@ -293,30 +588,54 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Batch mode: many monthly files analyzed as one period
+batch_sources = list(batch_files or []) + expand_batch_sources(batch_pattern)
+
+if batch_mode and batch_sources:
+    try:
+        batch = cached_batch_analysis(batch_sources)
+        
+        for failure in batch['errors']:
+            st.error(f"Error processing {failure['name']}: {failure['error']}")
+        
+        if batch['files']:
+            total_records = sum(info['rows'] for info in batch['files'])
+            st.success(f"Successfully loaded {total_records:,} records from {len(batch['files'])} files")
+            if st.session_state.debug_mode:
+                st.dataframe(pd.DataFrame(batch['files']), use_container_width=True, hide_index=True)
+            display_analysis_results(batch['results'], None, visible_sections)
+    
+    except Exception as e:
+        st.error(f"Error processing batch: {str(e)}")
+        if st.session_state.debug_mode:
+            st.exception(e)
+
 # Check if file was uploaded
-if uploaded_file is not None:
+elif uploaded_file is not None:
     try:
-        # Read the file
-        if uploaded_file.name.endswith('.csv'):
-            try:
-                raw_df = pd.read_csv(uploaded_file, encoding='utf-8')
-            except UnicodeDecodeError:
-                raw_df = pd.read_csv(uploaded_file, encoding='latin-1')
-        else:
-            raw_df = pd.read_excel(uploaded_file, engine='openpyxl')
+        # Reader, dtypes and engine from the file's size, shape and free memory
+        plan = plan_ingestion(uploaded_file)
+        debug_log(f"Execution plan: {describe_plan(plan)}")
         
-        # Clean columns
-        raw_df = clean_and_rename_columns(raw_df)
+        # Read and clean columns (large files chunk by chunk)
+        raw_df, plan = load_shipments(uploaded_file, plan, clean=clean_and_rename_columns)
         
         # Success message
         st.success(f"Successfully loaded {len(raw_df):,} records from {uploaded_file.name}")
+        parse_failures = describe_parse_failures(raw_df.attrs.get('parse_failures', {}))
+        if parse_failures:
+            st.warning(f"Some values could not be read as numbers and were left blank ({parse_failures})")
         
-        # Process data
-        with st.spinner("Analyzing your shipment data..."):
-            analysis_results = analyze_comprehensive_performance_enhanced(raw_df)
-        
-        # Display results
-        display_analysis_results(analysis_results, raw_df)
+        # Analyze and display section by section, Executive Summary first
+        debug_log(f"Planned sections: {plan_sections(visible_sections)['sections']}")
+        if wants_preview(raw_df):
+            # Large uploads: stratified-sample preview first, exact results in the background
+            display_preview_then_exact(raw_df, visible_sections, exact_analysis_key(uploaded_file, visible_sections),
+                                       plan['engine'], data_key=upload_key(uploaded_file))
+        else:
+            track_exact_job(None)
+            display_analysis_results(iter_analysis_sections(raw_df, visible_sections, engine=plan['engine']),
+                                     raw_df, visible_sections, data_key=upload_key(uploaded_file))
         
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
@@ -326,11 +645,11 @@ if uploaded_file is not None:
 elif demo_type != "No Dataset":
     # Generate demo data
     with st.spinner("Generating demo data..."):
-        raw_df, analysis_results = generate_demo_data(demo_type)
+        raw_df, analysis_results = generate_demo_data(demo_type, visible_sections)
     
     if raw_df is not None:
         st.info(f"Using {demo_type} with {len(raw_df):,} sample records")
-        display_analysis_results(analysis_results, raw_df)
+        display_analysis_results(analysis_results, raw_df, visible_sections, data_key=f"demo:{demo_type}")
     else:
         st.warning("No data to display. Upload a file or select a demo dataset.")
 else:
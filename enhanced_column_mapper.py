@@ -1,12 +1,19 @@
 # enhanced_column_mapper.py - Better FirstMile column mapping
+import numpy as np
 import pandas as pd
 import re
+from business_days import classify_sla, tier_sla_days, transit_days
+from typed_parsing import parse_numeric_columns
+from weight_units import normalize_weight
+from zip_geo import fill_destination_geo
+from zone_inference import infer_zone_column
 
 def enhanced_clean_and_rename_columns(df):
     """Enhanced column cleaning and mapping specifically for FirstMile data"""
     
-    # Create a copy to avoid modifying the original
-    df = df.copy()
+    # Shallow copy: renames and new columns never touch the caller's frame,
+    # and no column data is duplicated
+    df = df.copy(deep=False)
     
     # First, clean column names of special characters
     original_cols = df.columns.tolist()
@@ -25,9 +32,8 @@ def enhanced_clean_and_rename_columns(df):
     
     df.columns = clean_cols
     
-    # Create lowercase version for mapping
-    df_lower = df.copy()
-    df_lower.columns = df_lower.columns.str.strip().str.lower().str.replace(' ', '_')
+    # Lowercase header names for mapping (names only, not the data)
+    lower_cols = [col.strip().lower().replace(' ', '_') for col in df.columns]
     
     # Comprehensive column mapping for FirstMile data
     column_mapping = {
@@ -136,63 +142,59 @@ def enhanced_clean_and_rename_columns(df):
     }
     
     # Apply the mapping to lowercase columns
+    weight_header = None
     for old_col, new_col in column_mapping.items():
         # Check if the old column exists in lowercase version
-        matching_cols = [col for col in df_lower.columns if old_col in col or col in old_col]
+        matching_cols = [col for col in lower_cols if old_col in col or col in old_col]
         if matching_cols and new_col not in df.columns:
             # Find the original column name (with proper case)
-            idx = df_lower.columns.tolist().index(matching_cols[0])
+            idx = lower_cols.index(matching_cols[0])
             original_col = df.columns[idx]
+            if new_col == 'Weight':
+                weight_header = original_col
             df.rename(columns={original_col: new_col}, inplace=True)
     
-    # Convert weight to pounds if in ounces
-    if 'Weight' in df.columns:
-        # Check if weight seems to be in ounces (values > 16 likely)
-        avg_weight = df['Weight'].mean()
-        if pd.notna(avg_weight) and avg_weight > 16:
-            df['Weight'] = df['Weight'] / 16
+    # Parse numeric columns ("$12.50", "1,234") into compact dtypes
+    parse_numeric_columns(df)
+    
+    # Normalize weight to pounds (header hint, else a quantile test)
+    normalize_weight(df, header=weight_header)
     
     # Ensure ZIP codes are properly formatted
     if 'Destination ZIP' in df.columns:
-        df['Destination ZIP'] = df['Destination ZIP'].astype(str).str.strip()
         # Handle 5-digit and 9-digit ZIPs
-        df['Destination ZIP'] = df['Destination ZIP'].apply(
-            lambda x: x[:5] if len(x) >= 5 else x.zfill(5)
-        )
+        df['Destination ZIP'] = df['Destination ZIP'].astype(str).str.strip().str.slice(0, 5).str.zfill(5)
+    
+    # Business days whenever we have dates; Days in Transit too if not present
+    if 'Request Date' in df.columns and 'Delivery Date' in df.columns:
+        try:
+            df['Request Date'] = pd.to_datetime(df['Request Date'], errors='coerce')
+            df['Delivery Date'] = pd.to_datetime(df['Delivery Date'], errors='coerce')
+            calendar_days, df['Business Days In Transit'] = transit_days(
+                df['Request Date'], df['Delivery Date'], carriers=df.get('Carrier'))
+            if 'Days In Transit' not in df.columns:
+                df['Days In Transit'] = calendar_days
+        except:
+            pass
     
-    # Calculate Days in Transit if not present
-    if 'Days In Transit' not in df.columns:
-        if 'Request Date' in df.columns and 'Delivery Date' in df.columns:
-            try:
-                df['Request Date'] = pd.to_datetime(df['Request Date'], errors='coerce')
-                df['Delivery Date'] = pd.to_datetime(df['Delivery Date'], errors='coerce')
-                df['Days In Transit'] = (df['Delivery Date'] - df['Request Date']).dt.days
-            except:
-                pass
-    
-    # Add SLA Status if not present
+    # Add SLA Status if not present (business days when derived from dates)
     if 'SLA Status' not in df.columns and 'Days In Transit' in df.columns and 'Xparcel Type' in df.columns:
-        def calculate_sla_status(row):
-            if pd.isna(row['Days In Transit']) or pd.isna(row['Xparcel Type']):
-                return 'Unknown'
-            
-            sla_days = {
-                'Priority': 3,
-                'Expedited': 5,
-                'Ground': 8
-            }
-            
-            service_type = str(row['Xparcel Type'])
+        sla_days = {
+            'Priority': 3,
+            'Expedited': 5,
+            'Ground': 8
+        }
+        
+        def sla_for(service_type):
+            if service_type is None:
+                return np.nan
             for service, sla in sla_days.items():
-                if service.lower() in service_type.lower():
-                    if row['Days In Transit'] <= sla:
-                        return 'On-Time'
-                    else:
-                        return 'SLA Miss'
-            
-            return 'On-Time'  # Default
+                if service.lower() in str(service_type).lower():
+                    return sla
+            return np.inf  # Default: On-Time
         
-        df['SLA Status'] = df.apply(calculate_sla_status, axis=1)
+        days = df['Business Days In Transit'] if 'Business Days In Transit' in df.columns else df['Days In Transit']
+        df['SLA Status'] = classify_sla(days, tier_sla_days(df['Xparcel Type'], sla_for))
     
     # Add any missing expected columns with reasonable defaults
     expected_columns = {
@@ -212,6 +214,15 @@ def enhanced_clean_and_rename_columns(df):
         'Delivery Date': pd.Timestamp.now() + pd.Timedelta(days=5)
     }
     
+    # Infer missing zones from origin/destination ZIP3 rather than one constant
+    if 'Calculated Zone' not in df.columns:
+        inferred_zones = infer_zone_column(df)
+        if inferred_zones is not None:
+            df['Calculated Zone'] = inferred_zones.fillna(expected_columns['Calculated Zone'])
+    
+    # Missing destination state/city come from the offline ZIP table (see zip_geo)
+    fill_destination_geo(df)
+    
     for col, default in expected_columns.items():
         if col not in df.columns:
             df[col] = default
@@ -0,0 +1,316 @@
+# execution_planner.py - Pick the reader, dtypes and analysis engine before ingestion
+# An upload used to be read whole with read_csv/read_excel whatever its size.
+# plan_ingestion looks at the file first: its size, the header, a row
+# estimate from a sample of the first lines, and the memory available. It
+# then decides:
+#   - reader: the whole file at once when the estimated working set fits
+#     the memory budget. Otherwise CSV chunks or XLSX rows are streamed
+#     (openpyxl read-only), and each chunk is cleaned to compact dtypes
+#     before the next one is read, so the raw text frame never exists whole.
+#   - dtypes: ZIP columns as text (keeps leading zeros) and, for CSV, the
+#     text columns of the sample pinned, so every chunk parses them alike.
+#   - engine: Polars for large row counts when installed, pandas otherwise.
+#     For a combined batch, SQL over the cache when DuckDB can run it out of
+#     core and the batch would not fit in memory.
+# The plan is a plain dict: the CLI writes it to run_summary.json and the
+# dashboard to its debug log.
+
+import csv
+import importlib.util
+import io
+import itertools
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+from analysis_engines import available_engines
+from batch_analysis import source_name
+from firstmile_column_mapper import clean_and_rename_columns_enhanced
+
+# Share of the available memory one in-memory run may use
+MEMORY_BUDGET_FRACTION = 0.5
+# Peak memory of read + clean + analyze per byte of input file. CSV text
+# becomes a frame of about twice its size; an XLSX holds every cell as a
+# Python object while it is read.
+PEAK_BYTES_PER_FILE_BYTE = {'csv': 6, 'xlsx': 12}
+# Bytes of the file read to find the header, encoding and row size
+SAMPLE_BYTES = 1 << 16
+# Compressed bytes per cell when an XLSX does not record its dimensions
+XLSX_BYTES_PER_CELL = 6
+# One chunk's working set is at most this share of the memory budget
+CHUNK_BUDGET_SHARE = 1 / 8
+MIN_CHUNK_ROWS = 50_000
+MAX_CHUNK_ROWS = 1_000_000
+# Polars' parallel group-bys pay off from about this many rows
+POLARS_MIN_ROWS = 200_000
+
+# ----------------------
+# Inspection
+# ----------------------
+def available_memory():
+    """Bytes of memory available to a new allocation, or None when unknown"""
+    if PSUTIL_AVAILABLE:
+        return int(psutil.virtual_memory().available)
+    try:
+        with open('/proc/meminfo', encoding='ascii') as handle:
+            for line in handle:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+def _file_bytes(source):
+    if hasattr(source, 'size'):
+        return int(source.size)
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    return os.path.getsize(source)
+
+def _read_head(source, size):
+    if hasattr(source, 'read'):
+        _rewind(source)
+        head = source.read(size)
+        _rewind(source)
+        return head
+    with open(source, 'rb') as handle:
+        return handle.read(size)
+
+def _inspect_csv(source, file_bytes):
+    head = _read_head(source, SAMPLE_BYTES)
+    complete = len(head) >= file_bytes
+    if not complete:
+        # Only whole lines; the last one may be cut off
+        head = head[:head.rfind(b'\n') + 1] or head
+    try:
+        text, encoding = head.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        text, encoding = head.decode('latin-1'), 'latin-1'
+
+    lines = text.splitlines()
+    columns = next(csv.reader(lines[:1]), [])
+    header_bytes = len(lines[0].encode(encoding)) + 1 if lines else 0
+    rows = sum(1 for line in lines[1:] if line.strip())
+    if not complete and rows:
+        rows = int((file_bytes - header_bytes) / ((len(head) - header_bytes) / rows))
+    try:
+        sample = pd.read_csv(io.StringIO(text))
+    except Exception:
+        sample = pd.DataFrame(columns=columns)
+    return {'columns': columns, 'estimated_rows': rows, 'encoding': encoding, 'sample': sample}
+
+def _inspect_xlsx(source, file_bytes):
+    from openpyxl import load_workbook
+    _rewind(source)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        columns = [str(col) for col in header if col is not None]
+        if sheet.max_row:
+            rows = max(sheet.max_row - 1, 0)
+        else:
+            rows = int(file_bytes / (XLSX_BYTES_PER_CELL * max(len(columns), 1)))
+    finally:
+        workbook.close()
+        _rewind(source)
+    return {'columns': columns, 'estimated_rows': rows, 'encoding': None, 'sample': None}
+
+def inspect_source(source):
+    """Size, format, header columns and a row estimate, read without loading the file"""
+    name = source_name(source)
+    file_format = 'csv' if name.lower().endswith('.csv') else 'xlsx'
+    file_bytes = _file_bytes(source)
+    inspect = _inspect_csv if file_format == 'csv' else _inspect_xlsx
+    return {'name': name, 'format': file_format, 'file_bytes': file_bytes, **inspect(source, file_bytes)}
+
+def dtype_plan(columns, sample=None):
+    """read_csv dtypes: ZIP columns and the sample's text columns as str"""
+    dtypes = {}
+    for col in columns:
+        if 'zip' in col.lower() or 'postal' in col.lower():
+            dtypes[col] = 'str'
+        elif sample is not None and col in sample.columns and not pd.api.types.is_numeric_dtype(sample[col].dtype):
+            dtypes[col] = 'str'
+    return dtypes
+
+def choose_engine(rows):
+    """Analysis engine for a frame of about rows shipments"""
+    if rows >= POLARS_MIN_ROWS and 'polars' in available_engines():
+        return 'polars', f"{rows:,} rows: Polars runs the group-bys in parallel"
+    return 'pandas', f"{rows:,} rows: pandas"
+
+# ----------------------
+# Plans
+# ----------------------
+def plan_ingestion(source, memory=None):
+    """Reader, chunk size, dtypes and engine for one file, decided before it is read
+
+    memory overrides the available-memory probe (bytes). The returned dict
+    also holds what was measured, for the run record.
+    """
+    info = inspect_source(source)
+    memory = available_memory() if memory is None else memory
+    budget = int(memory * MEMORY_BUDGET_FRACTION) if memory else None
+    working_set = info['file_bytes'] * PEAK_BYTES_PER_FILE_BYTE[info['format']]
+    rows = info['estimated_rows']
+    reasons = []
+
+    if budget is None or working_set <= budget:
+        reader = info['format']
+        chunk_rows = None
+        reasons.append("fits in memory" if budget else "memory unknown: read whole")
+    else:
+        reader = 'csv_chunked' if info['format'] == 'csv' else 'xlsx_streaming'
+        row_bytes = working_set / max(rows, 1)
+        chunk_rows = int(np.clip(budget * CHUNK_BUDGET_SHARE / row_bytes, MIN_CHUNK_ROWS, MAX_CHUNK_ROWS))
+        reasons.append(f"working set {working_set / 2**20:,.0f} MB over the {budget / 2**20:,.0f} MB budget: "
+                       f"streamed in chunks of {chunk_rows:,} rows")
+
+    engine, why = choose_engine(rows)
+    reasons.append(why)
+    return {
+        'source': info['name'],
+        'format': info['format'],
+        'file_bytes': info['file_bytes'],
+        'columns': len(info['columns']),
+        'estimated_rows': rows,
+        'available_bytes': memory,
+        'working_set_bytes': working_set,
+        'reader': reader,
+        'chunk_rows': chunk_rows,
+        'encoding': info['encoding'],
+        'dtypes': dtype_plan(info['columns'], info['sample']),
+        'engine': engine,
+        'reasons': reasons
+    }
+
+def plan_batch(sources, memory=None):
+    """Engine for analyzing many files as one period (see batch_analysis)"""
+    sources = list(sources)
+    memory = available_memory() if memory is None else memory
+    working_set = sum(_file_bytes(source) * PEAK_BYTES_PER_FILE_BYTE[
+        'csv' if source_name(source).lower().endswith('.csv') else 'xlsx'] for source in sources)
+    out_of_core = bool(memory) and working_set > memory * MEMORY_BUDGET_FRACTION
+    if out_of_core and importlib.util.find_spec('duckdb') is not None:
+        engine, reason = 'sql', "batch over the memory budget: DuckDB queries the cache out of core"
+    else:
+        engine, reason = 'pandas', "per-file partial aggregates"
+    return {'files': len(sources), 'working_set_bytes': working_set, 'available_bytes': memory,
+            'engine': engine, 'reasons': [reason]}
+
+def describe_plan(plan):
+    """One line for logs, e.g. "csv_chunked (200,000-row chunks), polars engine: ..." """
+    reader = plan['reader'] + (f" ({plan['chunk_rows']:,}-row chunks)" if plan.get('chunk_rows') else '')
+    return f"{reader}, {plan['engine']} engine: {'; '.join(plan['reasons'])}"
+
+# ----------------------
+# Readers
+# ----------------------
+def iter_csv_chunks(source, plan):
+    _rewind(source)
+    yield from pd.read_csv(source, chunksize=plan['chunk_rows'], encoding=plan['encoding'] or 'utf-8',
+                           dtype=plan['dtypes'] or None)
+
+def iter_excel_chunks(source, plan):
+    """DataFrames of chunk_rows rows from the first sheet, read in read-only mode
+
+    Blank rows are skipped and unnamed columns are named like read_excel does.
+    """
+    from openpyxl import load_workbook
+    _rewind(source)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        columns = [f'Unnamed: {i}' if col is None else str(col) for i, col in enumerate(header)]
+        while True:
+            block = [row[:len(columns)] for row in itertools.islice(rows, plan['chunk_rows'])]
+            if not block:
+                break
+            block = [row for row in block if any(value is not None for value in row)]
+            if block:
+                yield pd.DataFrame(block, columns=columns).astype(plan['dtypes'] or {})
+    finally:
+        workbook.close()
+
+def read_whole(source, plan):
+    """The whole file in one read, with the plan's dtypes and encoding"""
+    _rewind(source)
+    if plan['format'] == 'csv':
+        try:
+            return pd.read_csv(source, encoding=plan['encoding'] or 'utf-8', dtype=plan['dtypes'] or None)
+        except UnicodeDecodeError:
+            _rewind(source)
+            return pd.read_csv(source, encoding='latin-1', dtype=plan['dtypes'] or None)
+    return pd.read_excel(source, engine='openpyxl', dtype=plan['dtypes'] or None)
+
+def _load_chunks(source, plan, clean, timings):
+    chunks = iter_csv_chunks(source, plan) if plan['reader'] == 'csv_chunked' else iter_excel_chunks(source, plan)
+    cleaned, failures, weight_unit = [], {}, None
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        timings['read'] += time.perf_counter() - start
+        if chunk is None:
+            break
+
+        start = time.perf_counter()
+        # The first chunk's weight unit holds for the whole file
+        chunk = clean(chunk, weight_unit=weight_unit['unit'] if weight_unit else None)
+        weight_unit = weight_unit or chunk.attrs.get('weight_unit')
+        for col, count in chunk.attrs.get('parse_failures', {}).items():
+            failures[col] = failures.get(col, 0) + count
+        cleaned.append(chunk)
+        timings['clean'] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = pd.concat(cleaned, ignore_index=True) if cleaned else pd.DataFrame()
+    df.attrs['parse_failures'] = failures
+    if weight_unit:
+        df.attrs['weight_unit'] = weight_unit
+    timings['clean'] += time.perf_counter() - start
+    return df
+
+def load_shipments(source, plan=None, clean=clean_and_rename_columns_enhanced, timings=None):
+    """Read and clean one export the way plan says (planned here when not given)
+
+    clean(df, weight_unit=None) maps one frame or chunk. Seconds spent
+    reading and cleaning are added to timings['read'] and timings['clean'].
+    Returns (cleaned_df, plan).
+    """
+    plan = plan or plan_ingestion(source)
+    timings = {} if timings is None else timings
+    timings.setdefault('read', 0.0)
+    timings.setdefault('clean', 0.0)
+
+    if plan['reader'] in ('csv', 'xlsx'):
+        start = time.perf_counter()
+        raw_df = read_whole(source, plan)
+        timings['read'] += time.perf_counter() - start
+        start = time.perf_counter()
+        df = clean(raw_df)
+        timings['clean'] += time.perf_counter() - start
+        return df, plan
+
+    try:
+        return _load_chunks(source, plan, clean, timings), plan
+    except UnicodeDecodeError:
+        # Non-UTF-8 bytes past the sample: read the stream again as latin-1
+        plan = {**plan, 'encoding': 'latin-1'}
+        return _load_chunks(source, plan, clean, timings), plan
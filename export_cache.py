@@ -0,0 +1,110 @@
+# export_cache.py - Deferred, on-disk cached report exports
+# Export artifacts are built by a background worker, keyed by a fingerprint
+# of the analysis, and kept on disk until their TTL expires. Repeated
+# downloads of the same analysis are served from disk without a rebuild.
+
+import hashlib
+import os
+import time
+
+import pandas as pd
+
+from background_jobs import forget_job, job_error, job_status, submit_job
+from batch_analysis import BATCH_CACHE_DIR
+from report_exports import build_summary_csv, write_columnar_archive, write_excel_report
+from shipment_dataset import ShipmentDataset
+
+EXPORT_CACHE_DIR = os.environ.get('TRANSITIQ_EXPORT_DIR', os.path.join(BATCH_CACHE_DIR, 'exports'))
+EXPORT_TTL_SECONDS = 24 * 60 * 60
+
+EXPORT_SUFFIXES = {
+    'xlsx': '_report.xlsx',
+    'csv': '_summary.csv',
+    'parquet': '_parquet.zip',
+    'arrow': '_arrow.zip'
+}
+
+def _result_bytes(value):
+    if isinstance(value, pd.DataFrame):
+        try:
+            return pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes()
+        except TypeError:
+            # Unhashable cells (lists, dicts) are hashed as text
+            return pd.util.hash_pandas_object(value.astype(str), index=False).to_numpy().tobytes()
+    return repr(value).encode('utf-8')
+
+def analysis_fingerprint(df, results, data_fingerprint=None):
+    """Stable hash of the raw data and every section result
+
+    data_fingerprint is the frame's content hash when the caller already
+    has it (see ShipmentDataset.fingerprint); otherwise it is computed here.
+    """
+    digest = hashlib.sha1()
+    if data_fingerprint is None and df is not None:
+        data_fingerprint = ShipmentDataset.wrap(df).fingerprint
+    if data_fingerprint is not None:
+        digest.update(data_fingerprint.encode('utf-8'))
+    for key in sorted(results):
+        digest.update(key.encode('utf-8'))
+        digest.update(_result_bytes(results[key]))
+    return digest.hexdigest()
+
+def export_path(fingerprint, kind, cache_dir=EXPORT_CACHE_DIR):
+    return os.path.join(cache_dir, f'{fingerprint}{EXPORT_SUFFIXES[kind]}')
+
+def evict_expired_exports(ttl_seconds=EXPORT_TTL_SECONDS, cache_dir=EXPORT_CACHE_DIR):
+    """Delete cached exports older than the TTL; returns how many were removed"""
+    if not os.path.isdir(cache_dir):
+        return 0
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass  # Another session may have removed it first
+    return removed
+
+def _build_export(df, results, kind, path):
+    """Write to a temp name and rename, so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    root, extension = os.path.splitext(path)
+    partial_path = f'{root}.partial{extension}'
+    if kind == 'xlsx':
+        write_excel_report(df, results, partial_path)
+    elif kind in ('parquet', 'arrow'):
+        write_columnar_archive(df, results, partial_path, fmt=kind)
+    else:
+        with open(partial_path, 'w', encoding='utf-8', newline='') as handle:
+            handle.write(build_summary_csv(results))
+    os.replace(partial_path, path)
+    return path
+
+def export_status(fingerprint, kind, cache_dir=EXPORT_CACHE_DIR):
+    """'ready', 'running', 'failed' or 'missing' for one export artifact"""
+    if os.path.exists(export_path(fingerprint, kind, cache_dir)):
+        return 'ready'
+    status = job_status(f'{fingerprint}:{kind}')
+    return 'missing' if status == 'done' else status
+
+def export_error(fingerprint, kind):
+    return job_error(f'{fingerprint}:{kind}')
+
+def request_export(fingerprint, kind, df, results, cache_dir=EXPORT_CACHE_DIR):
+    """Queue an export build unless it is cached or already being built
+
+    Returns the export status after the request.
+    """
+    evict_expired_exports(cache_dir=cache_dir)
+    path = export_path(fingerprint, kind, cache_dir)
+    job_key = f'{fingerprint}:{kind}'
+    if os.path.exists(path):
+        forget_job(job_key)
+        return 'ready'
+    if job_status(job_key) == 'done':
+        forget_job(job_key)  # Built earlier but evicted since
+    submit_job(job_key, _build_export, df, results, kind, path)
+    return export_status(fingerprint, kind, cache_dir)
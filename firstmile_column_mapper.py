@@ -1,6 +1,10 @@
 # FirstMile Column Mapping Utility
 # Maps various FirstMile export column names to dashboard expected names
 
+from business_days import classify_sla, tier_sla_days, transit_days
+from typed_parsing import describe_parse_failures, parse_numeric_columns
+from weight_units import normalize_weight
+
 FIRSTMILE_COLUMN_MAPPINGS = {
     # Days In Transit variations
     'days in transit': 'Days In Transit',
@@ -128,8 +132,12 @@ FIRSTMILE_COLUMN_MAPPINGS = {
 }
 
 
-def clean_and_rename_columns_enhanced(df):
-    """Enhanced column cleaning that maps FirstMile columns to dashboard expectations"""
+def clean_and_rename_columns_enhanced(df, weight_unit=None):
+    """Enhanced column cleaning that maps FirstMile columns to dashboard expectations
+
+    weight_unit skips weight-unit detection (e.g. the first chunk's unit for
+    the rest of a chunked read); None detects it from this frame.
+    """
     import pandas as pd
     
     # First, clean invisible characters
@@ -169,16 +177,24 @@ def clean_and_rename_columns_enhanced(df):
     
     # Calculate missing fields if we have the data
     
-    # Calculate Days In Transit if not present but we have dates
-    if 'Days In Transit' not in df.columns:
-        if 'Request Date' in df.columns and 'Delivery Date' in df.columns:
-            try:
-                df['Request Date'] = pd.to_datetime(df['Request Date'], errors='coerce')
-                df['Delivery Date'] = pd.to_datetime(df['Delivery Date'], errors='coerce')
-                df['Days In Transit'] = (df['Delivery Date'] - df['Request Date']).dt.days
+    # Business days (carrier holidays skipped), the unit the SLAs are measured
+    # in, whenever we have dates; Days In Transit too if not present
+    if 'Request Date' in df.columns and 'Delivery Date' in df.columns:
+        try:
+            df['Request Date'] = pd.to_datetime(df['Request Date'], errors='coerce')
+            df['Delivery Date'] = pd.to_datetime(df['Delivery Date'], errors='coerce')
+            calendar_days, df['Business Days In Transit'] = transit_days(
+                df['Request Date'], df['Delivery Date'], carriers=df.get('Carrier'))
+            if 'Days In Transit' not in df.columns:
+                df['Days In Transit'] = calendar_days
                 print("Calculated 'Days In Transit' from date fields")
-            except:
-                pass
+        except:
+            pass
+    
+    # Parse numeric columns ("$12.50", "1,234") into compact dtypes
+    parse_failures = parse_numeric_columns(df)
+    if parse_failures:
+        print(f"Unparseable numeric values set to NaN: {describe_parse_failures(parse_failures)}")
     
     # Infer Xparcel Type from other fields if missing
     if 'Xparcel Type' not in df.columns:
@@ -242,40 +258,20 @@ def clean_and_rename_columns_enhanced(df):
     
     # Calculate SLA Status if we have the data
     if 'SLA Status' not in df.columns and 'Days In Transit' in df.columns and 'Xparcel Type' in df.columns:
-        def calculate_sla_status(row):
-            try:
-                days = row['Days In Transit']
-                service = row['Xparcel Type']
-                
-                sla_days = {
-                    'Priority': 3,
-                    'Expedited': 5,
-                    'Ground': 8
-                }.get(service, 8)
-                
-                if pd.isna(days):
-                    return 'Unknown'
-                elif days <= sla_days:
-                    return 'On-Time'
-                else:
-                    return 'SLA Miss'
-            except:
-                return 'Unknown'
-        
-        df['SLA Status'] = df.apply(calculate_sla_status, axis=1)
+        sla_days = {
+            'Priority': 3,
+            'Expedited': 5,
+            'Ground': 8
+        }
+        days = df['Business Days In Transit'] if 'Business Days In Transit' in df.columns else df['Days In Transit']
+        df['SLA Status'] = classify_sla(days, tier_sla_days(df['Xparcel Type'], lambda service: sla_days.get(service, 8)))
         print("Calculated 'SLA Status' from transit times")
     
-    # Ensure numeric columns are numeric
-    numeric_columns = ['Days In Transit', 'Cost', 'Weight', 'Calculated Zone']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Convert Weight to ounces if it appears to be in pounds
-    if 'Weight' in df.columns:
-        if df['Weight'].max() < 50:  # Likely in pounds
-            df['Weight'] = df['Weight'] * 16  # Convert to ounces
-            print("Converted Weight from pounds to ounces")
+    # Normalize Weight to pounds, the unit the weight buckets use
+    weight_header = next((old for old, new in column_mapping.items() if new == 'Weight'), None)
+    decision = normalize_weight(df, header=weight_header, unit=weight_unit)
+    if decision and decision['unit'] != 'lb':
+        print(f"Converted Weight from {decision['unit']} to lb ({decision['reason']})")
     
     return df
 
@@ -0,0 +1,396 @@
+# olap_cube.py - Precomputed aggregate cube for instant cross-filtering
+# Shipments are reduced once to cells over (week, weekday, Xparcel tier,
+# zone, state, carrier, weight bucket). Each cell holds additive measures
+# (rows, on-time and miss counts, transit sum / sum of squares, cost sum,
+# zone cross-check counts) plus a sparse histogram of exact transit values
+# and sparse per-ZIP measures for the ZIP sections. Any filter on the
+# dimensions is a boolean mask over the cells, and every dashboard section
+# is rolled up from the masked cells through the batch finalizer
+# (results_from_aggregates) in milliseconds, without touching the rows.
+#
+# Only occupied cells are stored, as flat NumPy arrays: a dense cube over
+# these dimensions would have millions of mostly empty cells.
+
+import numpy as np
+import pandas as pd
+
+from batch_analysis import results_from_aggregates
+from dashboard_imports import ensure_required_columns, generate_empty_analysis_results
+from shipment_dataset import DAY_ORDER, ShipmentDataset
+from trend_engine import TREND_KEYS, TREND_MEASURES, UNKNOWN_TIER, empty_trend_state
+from weight_units import WEIGHT_LABELS
+from zip_geo import zone_check_rows
+from zip_index import (
+    ZIP5_SLOTS,
+    ZIP_INDEX_MEASURES,
+    empty_zip_index,
+    find_zip_column,
+    zip_index_frame,
+    zip_row_measures
+)
+
+CUBE_DIMENSIONS = ['week', 'weekday', 'tier', 'zone', 'state', 'carrier', 'weight_bucket']
+CUBE_MEASURES = ['rows', 'transit_n', 'transit_sum', 'transit_sumsq', 'sla_n', 'on_time',
+                 'misses', 'delay_n', 'delay_sum', 'cost_n', 'cost_sum', 'zone_checked', 'zone_mismatches']
+# Measures read by the batch finalizer's per-group tables
+GROUP_MEASURES = ['rows', 'transit_n', 'transit_sum', 'cost_n', 'cost_sum', 'sla_n', 'on_time']
+# Dimension -> the key column name results_from_aggregates expects
+DIMENSION_COLUMNS = {
+    'tier': 'Xparcel Type',
+    'zone': 'Zone',
+    'state': 'State',
+    'carrier': 'Carrier',
+    'weekday': 'Day_of_Week',
+    'weight_bucket': 'Weight_Bucket'
+}
+OVERSERVICE_ZONES = ['1', '2', '3']
+PREMIUM_TIERS = ['Expedited', 'Priority']
+FRIDAY = DAY_ORDER.index('Friday')
+# Roll-ups over at most this many group slots use a dense bincount, larger ones a sort
+DENSE_GROUP_LIMIT = 1 << 22
+
+# ----------------------
+# Build
+# ----------------------
+def _factorize(values):
+    """(codes, labels) with -1 for missing values"""
+    if values is None:
+        return None, np.array([], dtype=object)
+    codes, labels = pd.factorize(values, use_na_sentinel=True)
+    return codes, np.asarray(labels, dtype=object)
+
+def build_cube(raw_df):
+    """Reduce a cleaned shipment frame to the cube
+
+    Returns a dict with per-dimension 'labels', per-cell dimension 'codes'
+    (-1 where the value is unknown), per-cell 'measures', the transit
+    'histogram' as (cell, value, count) triples over 'transit_values', the
+    per-ZIP measures as 'zips' (cell, ZIP5 code, measures...) rows, and
+    'extras' recording which columns the upload had.
+    """
+    df = raw_df.copy(deep=False)
+    extras = {
+        'has_request_dates': 'Request Date' in df.columns,
+        'has_carrier': 'Carrier' in df.columns,
+        'has_transit': 'Days In Transit' in df.columns,
+        'has_cost': 'Cost' in df.columns
+    }
+    has_zone_column = 'Calculated Zone' in df.columns
+    ensure_required_columns(df)
+
+    data = ShipmentDataset(df)
+    transit = pd.to_numeric(df['Days In Transit'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    cost = pd.to_numeric(df['Cost'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+    # Week (its Monday) and weekday from one parse of the request dates
+    days = data.dates('request_date').to_numpy(dtype='datetime64[D]')
+    known = ~np.isnat(days)
+    day_numbers = days.astype(np.int64)
+    # 1970-01-01 was a Thursday
+    weekday = np.where(known, (day_numbers + 3) % 7, -1)
+    week_codes, week_labels = _factorize(pd.Series(np.where(known, day_numbers - weekday, np.nan)))
+
+    dimensions = {
+        'week': (week_codes, np.asarray(week_labels, dtype=np.int64).astype('datetime64[D]')),
+        'weekday': (weekday, np.array(DAY_ORDER, dtype=object)),
+        'tier': _factorize(data.column('tier')),
+        'zone': _factorize(data.column('zone')),
+        'state': _factorize(data.column('state')),
+        'carrier': _factorize(data.column('carrier')),
+        'weight_bucket': (data.weight_bucket_codes, np.array(WEIGHT_LABELS, dtype=object))
+    }
+    labels = {name: dimension[1] for name, dimension in dimensions.items()}
+
+    # One mixed-radix key per row (codes shifted so unknown is 0), then the occupied cells
+    key = np.zeros(len(df), dtype=np.int64)
+    for name in CUBE_DIMENSIONS:
+        codes = dimensions[name][0]
+        # A dimension the upload lacks is unknown (-1) everywhere
+        codes = np.full(len(df), -1, dtype=np.int64) if codes is None else codes.astype(np.int64)
+        key = key * (len(labels[name]) + 1) + codes + 1
+    cells, row_cell = np.unique(key, return_inverse=True)
+    codes = {}
+    for name in reversed(CUBE_DIMENSIONS):
+        radix = len(labels[name]) + 1
+        codes[name] = (cells % radix - 1).astype(np.min_scalar_type(-radix))
+        cells = cells // radix
+    size = len(codes['week'])
+
+    def count(mask):
+        return np.bincount(row_cell, weights=mask, minlength=size).astype(np.int32)
+
+    def total(values):
+        return np.bincount(row_cell, weights=np.nan_to_num(values), minlength=size)
+
+    delay = data.delay
+    positive_delay = data.is_miss & (delay > 0)
+    # Zone cross-check (see zip_geo) only for zones the upload reported
+    zone_rows = zone_check_rows(df) if has_zone_column else None
+    if zone_rows is None:
+        zone_rows = (np.zeros(len(df), dtype=bool),) * 2
+    measures = {
+        'rows': np.bincount(row_cell, minlength=size).astype(np.int32),
+        'transit_n': count(~np.isnan(transit)),
+        'transit_sum': total(transit),
+        'transit_sumsq': total(transit ** 2),
+        'sla_n': count(df['SLA Status'].notna().to_numpy()),
+        'on_time': count(data.is_on_time),
+        'misses': count(data.is_miss),
+        'delay_n': count(positive_delay),
+        'delay_sum': total(np.where(positive_delay, delay, 0)),
+        'cost_n': count(~np.isnan(cost)),
+        'cost_sum': total(cost),
+        'zone_checked': count(zone_rows[0]),
+        'zone_mismatches': count(zone_rows[1])
+    }
+
+    # Sparse transit histogram: one triple per (cell, distinct transit value)
+    value_codes, transit_values = pd.factorize(transit, use_na_sentinel=True)
+    valid = value_codes >= 0
+    pairs, counts = np.unique(row_cell[valid].astype(np.int64) * len(transit_values) + value_codes[valid],
+                              return_counts=True)
+    histogram = {
+        'cell': (pairs // max(len(transit_values), 1)).astype(np.int32),
+        'value': (pairs % max(len(transit_values), 1)).astype(np.int32),
+        'count': counts.astype(np.int32)
+    }
+
+    return {
+        'labels': labels,
+        'codes': codes,
+        'measures': measures,
+        'transit_values': np.asarray(transit_values, dtype=float),
+        'histogram': histogram,
+        'zips': _zip_cells(df, row_cell),
+        'extras': extras
+    }
+
+def _zip_cells(df, row_cell):
+    """Sparse ZIP index measures: one row per (cell, ZIP5) pair"""
+    zips = {'cell': np.array([], dtype=np.int32), 'zip': np.array([], dtype=np.int32)}
+    zip_col = find_zip_column(df)
+    if zip_col is None:
+        zips.update({name: np.array([]) for name in ZIP_INDEX_MEASURES})
+        return zips
+    zip_codes, contributions = zip_row_measures(df, zip_col)
+    valid = zip_codes >= 0
+    pairs, inverse = np.unique(row_cell[valid].astype(np.int64) * ZIP5_SLOTS + zip_codes[valid], return_inverse=True)
+    zips['cell'] = (pairs // ZIP5_SLOTS).astype(np.int32)
+    zips['zip'] = (pairs % ZIP5_SLOTS).astype(np.int32)
+    for name, values in contributions.items():
+        zips[name] = np.bincount(inverse, weights=values[valid], minlength=len(pairs))
+    return zips
+
+# ----------------------
+# Roll-ups
+# ----------------------
+def cube_mask(cube, filters=None):
+    """Boolean mask of the cells passing filters
+
+    filters maps a dimension to the labels to keep, e.g.
+    {'carrier': ['UPS'], 'state': ['CA', 'TX']}. 'week' also takes a
+    (first, last) pair of dates, kept inclusive by week start.
+    """
+    mask = np.ones(len(cube['codes']['week']), dtype=bool)
+    for name, wanted in (filters or {}).items():
+        labels = cube['labels'][name]
+        if name == 'week' and isinstance(wanted, tuple):
+            first, last = (np.datetime64(pd.Timestamp(bound), 'D') for bound in wanted)
+            allowed = (labels >= first - 6) & (labels <= last)
+        else:
+            allowed = np.isin(labels, list(wanted))
+        codes = cube['codes'][name]
+        mask &= (codes >= 0) & np.append(allowed, False)[codes]
+    return mask
+
+def _selected_cells(cube, filters):
+    """Indices of the cells passing filters, or None for every cell"""
+    return np.flatnonzero(cube_mask(cube, filters)) if filters else None
+
+def _take(values, cells):
+    return values if cells is None else values[cells]
+
+def _roll_up(cube, dimensions, cells, measures, unknown=None):
+    """roll_up over already selected cells
+
+    unknown maps a dimension to a label for its unknown values, which are
+    then kept as a group of their own instead of being left out.
+    """
+    unknown = unknown or {}
+    codes, labels = [], []
+    for name in dimensions:
+        dimension_codes = _take(cube['codes'][name], cells)
+        dimension_labels = cube['labels'][name]
+        if name in unknown:
+            dimension_codes = np.where(dimension_codes < 0, len(dimension_labels), dimension_codes)
+            dimension_labels = np.append(dimension_labels, unknown[name])
+        codes.append(dimension_codes)
+        labels.append(dimension_labels)
+    known = np.logical_and.reduce([dimension_codes >= 0 for dimension_codes in codes])
+    if not known.all():
+        codes = [dimension_codes[known] for dimension_codes in codes]
+        cells = np.flatnonzero(known) if cells is None else cells[known]
+
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    space = 1
+    for dimension_codes, dimension_labels in zip(codes, labels):
+        key = key * len(dimension_labels) + dimension_codes
+        space *= len(dimension_labels)
+    if space <= DENSE_GROUP_LIMIT:
+        # Group slots are few: one bincount per measure, no sort
+        groups = np.flatnonzero(np.bincount(key, minlength=space))
+        def group_sum(weights):
+            return np.bincount(key, weights=weights, minlength=space)[groups]
+    else:
+        groups, inverse = np.unique(key, return_inverse=True)
+        def group_sum(weights):
+            return np.bincount(inverse, weights=weights, minlength=len(groups))
+
+    frame = {}
+    remaining = groups
+    for name, dimension_labels in reversed(list(zip(dimensions, labels))):
+        frame[name] = dimension_labels[remaining % len(dimension_labels)]
+        remaining = remaining // len(dimension_labels)
+    frame = pd.DataFrame({name: frame[name] for name in dimensions})
+    for measure in measures:
+        values = cube['measures'][measure]
+        sums = group_sum(_take(values, cells))
+        frame[measure] = sums.astype(np.int64) if values.dtype.kind in 'iu' else sums
+    return frame
+
+def roll_up(cube, dimensions, filters=None, measures=CUBE_MEASURES):
+    """Measures summed over the filtered cells per combination of dimensions
+
+    Cells whose value is unknown on any grouping dimension are left out,
+    like groupby drops missing keys. Returns one row per occupied group.
+    """
+    return _roll_up(cube, list(dimensions), _selected_cells(cube, filters), measures)
+
+def _totals(cube, cells):
+    return {measure: _take(values, cells).sum() for measure, values in cube['measures'].items()}
+
+def cube_totals(cube, filters=None):
+    """Every measure summed over the filtered cells"""
+    return _totals(cube, _selected_cells(cube, filters))
+
+def _in_cells(cube, cells, cell_ids):
+    """Which entries of a sparse table (by cell id) belong to the selected cells"""
+    if cells is None:
+        return np.ones(len(cell_ids), dtype=bool)
+    selected = np.zeros(len(cube['codes']['week']), dtype=bool)
+    selected[cells] = True
+    return selected[cell_ids]
+
+def _transit_counts(cube, dimension, cells):
+    histogram = cube['histogram']
+    kept = _in_cells(cube, cells, histogram['cell'])
+    codes = cube['codes'][dimension][histogram['cell']]
+    kept &= codes >= 0
+    value_count = max(len(cube['transit_values']), 1)
+    key = codes[kept].astype(np.int64) * value_count + histogram['value'][kept]
+    counts = np.bincount(key, weights=histogram['count'][kept],
+                         minlength=len(cube['labels'][dimension]) * value_count)
+    occupied = np.flatnonzero(counts)
+    return pd.DataFrame({
+        dimension: cube['labels'][dimension][occupied // value_count],
+        'value': cube['transit_values'][occupied % value_count],
+        'count': counts[occupied].astype(np.int64)
+    })
+
+def transit_counts(cube, dimension, filters=None):
+    """(dimension label, transit value, count) rows from the sparse histogram"""
+    return _transit_counts(cube, dimension, _selected_cells(cube, filters))
+
+def transit_std(cube, dimensions, filters=None):
+    """Sample standard deviation of transit days per group, from sum and sum of squares"""
+    frame = roll_up(cube, dimensions, filters, ['transit_n', 'transit_sum', 'transit_sumsq'])
+    n = frame['transit_n'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (frame['transit_sumsq'] - frame['transit_sum'] ** 2 / n) / (n - 1)
+    frame['Transit Std'] = np.sqrt(np.clip(variance, 0, None))
+    return frame
+
+def _zip_index(cube, cells):
+    """ZIP index (see zip_index) of the selected cells, from the sparse ZIP measures"""
+    zips = cube['zips']
+    kept = _in_cells(cube, cells, zips['cell'])
+    index = empty_zip_index()
+    for name, dtype in ZIP_INDEX_MEASURES.items():
+        sums = np.bincount(zips['zip'][kept], weights=zips[name][kept], minlength=ZIP5_SLOTS)
+        # Counts come back from bincount as floats
+        index[name] = (np.rint(sums) if np.dtype(dtype).kind == 'u' else sums).astype(dtype)
+    return index
+
+def _group_table(cube, dimension, cells):
+    frame = _roll_up(cube, [dimension], cells, GROUP_MEASURES)
+    return frame.rename(columns={dimension: DIMENSION_COLUMNS[dimension]})
+
+def _daily_trend(cube, cells):
+    """Trend state (see trend_engine) from the week, weekday and tier dimensions"""
+    if not cube['extras']['has_request_dates']:
+        return empty_trend_state()
+    frame = _roll_up(cube, ['week', 'weekday', 'tier'], cells, TREND_MEASURES,
+                     unknown={'tier': UNKNOWN_TIER})
+    if frame.empty:
+        return empty_trend_state()
+    offsets = pd.Index(DAY_ORDER).get_indexer(frame['weekday'])
+    state = pd.DataFrame({
+        'Date': (frame['week'].to_numpy(dtype='datetime64[D]') + offsets).astype('datetime64[ns]'),
+        'Xparcel Type': frame['tier'].to_numpy(dtype=object)
+    })
+    for measure in TREND_MEASURES:
+        state[measure] = frame[measure].to_numpy()
+    return state.sort_values(TREND_KEYS, kind='stable').reset_index(drop=True)
+
+def aggregates_from_cube(cube, filters=None):
+    """The batch-mode aggregate tables (see batch_analysis) for the filtered cells"""
+    cells = _selected_cells(cube, filters)
+    totals = _totals(cube, cells)
+    extras = cube['extras']
+
+    overservice = _roll_up(cube, ['zone', 'tier'], cells, ['rows'])
+    overservice = overservice[overservice['zone'].isin(OVERSERVICE_ZONES) &
+                              overservice['tier'].isin(PREMIUM_TIERS)]['rows'].sum()
+    weekday = _group_table(cube, 'weekday', cells)
+    friday = weekday.loc[weekday['Day_of_Week'] == DAY_ORDER[FRIDAY], 'rows'].sum()
+
+    tier_transit = _transit_counts(cube, 'tier', cells).rename(
+        columns={'tier': 'Xparcel Type', 'value': 'Days In Transit', 'count': 'n'})
+    state = _group_table(cube, 'state', cells)
+    zone = _group_table(cube, 'zone', cells)
+    return {
+        'totals': pd.DataFrame([{
+            'rows': totals['rows'],
+            'transit_n': totals['transit_n'],
+            'transit_sum': totals['transit_sum'],
+            'cost_n': totals['cost_n'],
+            'cost_sum': totals['cost_sum'],
+            'misses': totals['misses'],
+            'delay_n': totals['delay_n'],
+            'delay_sum': totals['delay_sum'],
+            'overservice': int(overservice),
+            'friday': int(friday),
+            'has_carrier': int(extras['has_carrier']),
+            'has_transit': int(extras['has_transit']),
+            'has_cost': int(extras['has_cost']),
+            'zone_checked': totals['zone_checked'],
+            'zone_mismatches': totals['zone_mismatches']
+        }]),
+        'tier': _group_table(cube, 'tier', cells),
+        'tier_transit': tier_transit,
+        'zone': zone,
+        'zone_cost': zone.rename(columns={'Zone': 'Calculated Zone'}),
+        'state': state,
+        'routing_state': state.rename(columns={'State': 'Destination State'}),
+        'weekday': weekday,
+        'weight': _group_table(cube, 'weight_bucket', cells),
+        'carrier': _group_table(cube, 'carrier', cells),
+        'daily': _daily_trend(cube, cells),
+        'zip_index': zip_index_frame(_zip_index(cube, cells))
+    }
+
+def results_from_cube(cube, filters=None):
+    """All dashboard sections for the shipments passing filters, from cube roll-ups"""
+    if cube is None or not cube_mask(cube, filters).any():
+        return generate_empty_analysis_results()
+    return results_from_aggregates(aggregates_from_cube(cube, filters))
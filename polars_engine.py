@@ -0,0 +1,358 @@
+# polars_engine.py - Polars implementation of the analysis sections
+# The shipments are handed to Polars once, as a lazy frame of the resolved
+# columns, and every analyzer is a lazy group-by over it. The section
+# queries are collected together (pl.collect_all), so Polars plans them as
+# one job and runs the group-bys in parallel across cores. Only the small
+# per-group tables come back to pandas, where the helpers the pandas
+# analyzers use (safe_percentage, rounding, service order) finish them, so
+# both engines give the same sections.
+#
+# Row preparation (default columns, inferred zones, ZIP backfill, number and
+# date parsing) is shared with the pandas engine through ShipmentDataset.
+
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+from dashboard_imports import (XPARCEL_LOGIC, analyze_carrier_performance, ensure_required_columns,
+                               exception_summary_from_counts, generate_empty_analysis_results,
+                               potential_savings, routing_from_counts, safe_percentage, sort_by_service,
+                               tier_weighted_on_time)
+from section_planner import SECTION_ORDER, plan_sections
+from shipment_dataset import DAY_ORDER, DEFAULT_SLA_DAYS, ShipmentDataset
+from trend_engine import TREND_KEYS, TREND_MEASURES, UNKNOWN_TIER, empty_trend_state
+from weight_units import WEIGHT_BINS, WEIGHT_LABELS
+from zip_geo import empty_zone_check, zone_check
+from zip_index import top_zips, zip_index_frame, zip_index_from_groups
+
+# Lazy-frame column -> ShipmentDataset role
+TEXT_ROLES = {
+    'tier': 'tier',
+    'sla': 'sla',
+    'zone': 'zone',
+    'calculated_zone': 'calculated_zone',
+    'state': 'state',
+    'destination_state': 'destination_state',
+    'carrier': 'carrier',
+    'zip': 'zip'
+}
+NUMERIC_ROLES = ['transit', 'cost', 'weight']
+DATE_ROLES = ['request_date', 'weekday_date']
+
+# ----------------------
+# Lazy frame
+# ----------------------
+def shipments_frame(data):
+    """Lazy frame with one column per role; roles the data lacks are all null"""
+    rows = len(data)
+    columns = []
+    for name, role in TEXT_ROLES.items():
+        values = data.column(role)
+        if values is None:
+            columns.append(pl.Series(name, [None] * rows, dtype=pl.String))
+        else:
+            columns.append(pl.from_pandas(values, nan_to_null=True).alias(name))
+    for role in NUMERIC_ROLES:
+        columns.append(pl.Series(role, data.numeric(role), nan_to_null=True).cast(pl.Float64))
+    # Business days when the mappers derived them: what the SLA delay is measured in
+    columns.append(pl.Series('sla_transit', data.sla_transit, nan_to_null=True).cast(pl.Float64))
+    for role in DATE_ROLES:
+        columns.append(pl.from_pandas(data.dates(role)).alias(role))
+    return pl.DataFrame(columns).lazy()
+
+def _on_time():
+    return (pl.col('sla') == 'On-Time').sum().alias('on_time')
+
+def _stats(key):
+    """Transit count/mean and SLA counts per non-null key, sorted like a pandas groupby"""
+    def query(lf):
+        return lf.filter(pl.col(key).is_not_null()).group_by(key).agg(
+            pl.col('transit').count().alias('n'),
+            pl.col('transit').mean().alias('mean'),
+            pl.col('sla').count().alias('sla_n'),
+            _on_time()
+        ).sort(key)
+    return query
+
+def _weight_bucket():
+    """Index into WEIGHT_LABELS, right-closed like pd.cut (null outside the bins)"""
+    weight = pl.col('weight')
+    bucket = pl.when(weight.is_null()).then(None)
+    for code, (low, high) in enumerate(zip(WEIGHT_BINS[:-1], WEIGHT_BINS[1:])):
+        bucket = bucket.when((weight > low) & (weight <= high)).then(code)
+    return bucket.otherwise(None).alias('bucket')
+
+def _with_derived(lf):
+    sla_days = {tier: float(logic.get('sla_days', DEFAULT_SLA_DAYS)) for tier, logic in XPARCEL_LOGIC.items()}
+    # Zones are compared as text, like the pandas isin(['1', '2', '3']): numeric zones never match
+    if lf.collect_schema()['calculated_zone'] == pl.String:
+        short_zone = pl.col('calculated_zone').is_in(['1', '2', '3'])
+    else:
+        short_zone = pl.lit(False)
+    return lf.with_columns(
+        (short_zone & pl.col('tier').is_in(['Expedited', 'Priority'])).alias('overservice'),
+        (pl.col('sla_transit') - pl.col('tier').replace_strict(
+            sla_days, default=float(DEFAULT_SLA_DAYS), return_dtype=pl.Float64).fill_null(float(DEFAULT_SLA_DAYS))
+         ).alias('delay'),
+        (pl.col('sla') == 'SLA Miss').fill_null(False).alias('miss'),
+        (pl.col('weekday_date').dt.weekday() - 1).alias('weekday'),
+        pl.col('request_date').dt.date().alias('day'),
+        _weight_bucket()
+    )
+
+# Section -> lazy query over the frame with derived columns
+QUERIES = {
+    'executive_summary': lambda lf: lf.filter(pl.col('tier').is_not_null()).group_by('tier', maintain_order=True).agg(
+        pl.col('transit').count().alias('n'), pl.col('sla').count().alias('sla_n'), _on_time()),
+    'totals': lambda lf: lf.select(
+        pl.len().alias('rows'), pl.col('transit').mean().alias('transit_mean'),
+        pl.col('cost').mean().alias('cost_mean'), pl.col('cost').sum().alias('cost_sum'),
+        pl.col('miss').sum().alias('misses'),
+        pl.col('delay').filter(pl.col('miss') & (pl.col('delay') > 0)).mean().alias('avg_delay'),
+        pl.col('request_date').dt.weekday().eq(5).sum().alias('fridays'),
+        pl.col('overservice').sum()),
+    'tier_performance': lambda lf: lf.filter(pl.col('tier').is_not_null()).group_by('tier').agg(
+        pl.col('transit').count().alias('n'),
+        pl.col('transit').mean().alias('mean'),
+        pl.col('transit').median().alias('median'),
+        pl.col('transit').quantile(0.95, interpolation='linear').alias('p95'),
+        pl.col('sla').count().alias('sla_n'),
+        _on_time()
+    ).sort('tier'),
+    'service_mix': lambda lf: lf.filter(pl.col('tier').is_not_null()).group_by('tier', maintain_order=True).agg(
+        pl.len().alias('n')).sort('n', descending=True, maintain_order=True),
+    'zone_distribution': lambda lf: lf.filter(pl.col('zone').is_not_null()).group_by('zone').agg(
+        pl.len().alias('n')).sort('zone'),
+    'zone_transit': _stats('zone'),
+    'zip_index': lambda lf: lf.group_by('zip').agg(
+        pl.len().alias('rows'), pl.col('sla').count().alias('sla_n'), pl.col('miss').sum().alias('misses'),
+        pl.col('transit').count().alias('transit_n'), pl.col('transit').sum().alias('transit_sum'),
+        pl.col('cost').count().alias('cost_n'), pl.col('cost').sum().alias('cost_sum')),
+    'regional_performance': _stats('state'),
+    'day_of_week': _stats('weekday'),
+    'daily_trend': lambda lf: lf.filter(pl.col('day').is_not_null()).group_by(
+        'day', pl.col('tier').fill_null(UNKNOWN_TIER)).agg(
+        pl.len().alias('rows'), pl.col('sla').count().alias('sla_n'), _on_time(),
+        pl.col('transit').count().alias('transit_n'), pl.col('transit').sum().alias('transit_sum'),
+        pl.col('cost').count().alias('cost_n'), pl.col('cost').sum().alias('cost_sum')).sort('day', 'tier'),
+    'weight_impact': _stats('bucket'),
+    'carrier_performance': lambda lf: lf.filter(pl.col('carrier').is_not_null()).group_by('carrier').agg(
+        pl.col('transit').count().alias('n'), pl.col('cost').mean().alias('cost'),
+        pl.col('sla').count().alias('sla_n'), _on_time()).sort('carrier'),
+    'cost_by_service': lambda lf: lf.filter(pl.col('tier').is_not_null()).group_by('tier').agg(
+        pl.col('cost').mean()).sort('tier'),
+    'cost_by_zone': lambda lf: lf.filter(pl.col('calculated_zone').is_not_null()).group_by('calculated_zone').agg(
+        pl.col('cost').mean()).sort('calculated_zone'),
+    'state_counts': lambda lf: lf.filter(pl.col('destination_state').is_in(['CA', 'TX', 'NY', 'FL'])).group_by(
+        'destination_state').agg(pl.len().alias('n'))
+}
+
+# Section -> the queries its result is built from
+SECTION_QUERIES = {
+    'executive_summary': ['executive_summary', 'totals'],
+    'exception_hotspots': ['totals'],
+    'exception_summary': ['totals'],
+    'cost_analysis': ['cost_by_service', 'cost_by_zone', 'totals'],
+    'routing_optimization': ['totals', 'state_counts']
+}
+
+# ----------------------
+# Finishing (small per-group tables)
+# ----------------------
+def _on_time_pct(frame, has_sla):
+    """On-Time % per group, as safe_aggregate_percentage gives it"""
+    if not has_sla:
+        return 95.0
+    return [safe_percentage(hits, n) for hits, n in zip(frame['on_time'].to_numpy(np.int64),
+                                                        frame['sla_n'].to_numpy(np.int64))]
+
+def _executive_summary(tiers, totals, raw_df, has):
+    on_time_pct = 91.0
+    if has['tier'] and has['sla'] and len(tiers):
+        on_time_pct = tier_weighted_on_time(tiers['n'].to_numpy(np.float64), tiers['on_time'].to_numpy(np.float64),
+                                            tiers['sla_n'].to_numpy(np.float64))
+    return {
+        'total_shipments': len(raw_df),
+        'avg_transit': float(totals['transit_mean']) if 'Days In Transit' in raw_df.columns else 0.0,
+        'on_time_pct': on_time_pct,
+        'avg_cost': float(totals['cost_mean']) if 'Cost' in raw_df.columns else 0.0
+    }
+
+def _tier_performance(frame, has):
+    n = frame['n'].to_numpy(np.int64)
+    result = pd.DataFrame({
+        'Xparcel Type': frame['tier'],
+        'Shipments': n,
+        'Avg Days': np.round(frame['mean'].to_numpy(np.float64), 2),
+        'Median': np.round(frame['median'].to_numpy(np.float64), 2),
+        '95th Pctl': np.round(np.where(n > 0, frame['p95'].to_numpy(np.float64), 0), 2),
+        'On-Time %': _on_time_pct(frame, has['sla'])
+    })
+    return sort_by_service(result, 'Xparcel Type')
+
+def _service_mix(frame):
+    counts = frame['n'].to_numpy(np.int64)
+    total = counts.sum()
+    result = pd.DataFrame({
+        'Service': frame['tier'],
+        'Shipments': counts,
+        'Percentage': [safe_percentage(x, total) for x in counts]
+    })
+    return sort_by_service(result, 'Service')
+
+def _zone_distribution(frame):
+    counts = frame['n'].to_numpy(np.int64)
+    total = counts.sum()
+    return pd.DataFrame({
+        'Zone': frame['zone'],
+        'Shipments': counts,
+        'Percentage': [safe_percentage(x, total) for x in counts]
+    })
+
+def _group_table(frame, key, name, has):
+    return pd.DataFrame({
+        name: frame[key],
+        'Volume': frame['n'].to_numpy(np.int64),
+        'Avg Transit': frame['mean'].to_numpy(np.float64),
+        'On-Time %': _on_time_pct(frame, has['sla'])
+    })
+
+def _day_of_week(frame, has):
+    table = _group_table(frame, 'weekday', 'Day_of_Week', has)
+    table['Day_of_Week'] = [DAY_ORDER[day] for day in frame['weekday']]
+    table = table.set_index('Day_of_Week')
+    total_volume = table['Volume'].sum()
+    table['Volume %'] = [safe_percentage(x, total_volume) for x in table['Volume']]
+    return table.reindex(DAY_ORDER, fill_value=0).rename_axis('Day_of_Week').reset_index()
+
+def _weight_impact(frame, has):
+    table = _group_table(frame, 'bucket', 'Weight_Bucket', has).set_index(frame['bucket'].to_numpy(np.int64))
+    table = table.reindex(range(len(WEIGHT_LABELS)))
+    table['Volume'] = table['Volume'].fillna(0).astype(np.int64)
+    table['On-Time %'] = table['On-Time %'].fillna(0.0) if has['sla'] else 95.0
+    table['Weight_Bucket'] = pd.Categorical.from_codes(range(len(WEIGHT_LABELS)), WEIGHT_LABELS, ordered=True)
+    return table.reset_index(drop=True)
+
+def _exception_hotspots(totals, index, has):
+    if not has['sla']:
+        return generate_empty_analysis_results()['exception_hotspots']
+    if not totals['misses']:
+        return pd.DataFrame({'ZIP': ['No Exceptions'], 'SLA Misses': [0]})
+    if not has['zip']:
+        return generate_empty_analysis_results()['exception_hotspots']
+    problem_zips = top_zips(index, 10, by='misses')
+    if problem_zips.empty:
+        return generate_empty_analysis_results()['exception_hotspots']
+    return problem_zips[['ZIP', 'SLA Misses']]
+
+def _exception_summary(totals, has):
+    if not has['sla']:
+        return generate_empty_analysis_results()['exception_summary']
+    return exception_summary_from_counts(totals['misses'], int(totals['rows']), totals['avg_delay'])
+
+def _carrier_performance(frame, data, has):
+    if not has['carrier']:
+        return analyze_carrier_performance(data)
+    return pd.DataFrame({
+        'Carrier': frame['carrier'],
+        'Volume': frame['n'].to_numpy(np.int64),
+        'Avg Cost': frame['cost'].to_numpy(np.float64),
+        'On-Time %': _on_time_pct(frame, has['sla'])
+    })
+
+def _means(frame, key):
+    return dict(zip(frame[key].tolist(), frame['cost'].to_numpy(np.float64)))
+
+def _cost_analysis(by_service, by_zone, totals):
+    # cost and tier/zone are always present once ensure_required_columns has run
+    return {
+        'avg_cost_by_service': _means(by_service, 'tier'),
+        'cost_per_zone': _means(by_zone, 'calculated_zone'),
+        'potential_savings': potential_savings(totals['cost_sum'])
+    }
+
+def _routing_optimization(totals, state_counts, has):
+    counts = dict(zip(state_counts['destination_state'], state_counts['n']))
+    fridays = int(totals['fridays']) if has['request_date'] else None
+    return routing_from_counts(int(totals['rows']), totals['overservice'], counts, fridays)
+
+def _daily_trend(frame):
+    if frame.empty:
+        return empty_trend_state()
+    state = pd.DataFrame({
+        'Date': pd.to_datetime(frame['day']).astype('datetime64[ns]'),
+        'Xparcel Type': frame['tier'].astype(object)
+    })
+    for measure in TREND_MEASURES:
+        state[measure] = frame[measure].to_numpy(np.float64 if measure.endswith('_sum') else np.int64)
+    return state.sort_values(TREND_KEYS, kind='stable').reset_index(drop=True)
+
+# ----------------------
+# Engine
+# ----------------------
+def iter_polars_sections(raw_df, sections=None):
+    """Yield (section, result) pairs computed with Polars, in SECTION_ORDER
+
+    The executive summary is collected on its own first so it can be shown
+    early; the other planned sections are collected together.
+    """
+    if not POLARS_AVAILABLE:
+        raise ImportError("The polars engine needs polars (pip install polars)")
+
+    planned = plan_sections(sections)['sections']
+    df = raw_df.copy(deep=False)
+    has_request_dates = 'Request Date' in df.columns
+    has_zone_column = 'Calculated Zone' in df.columns
+    ensure_required_columns(df)
+    data = ShipmentDataset(df)
+    has = {role: data.has(role) for role in list(TEXT_ROLES.values()) + ['request_date']}
+    lf = _with_derived(shipments_frame(data))
+
+    frames = {}
+
+    def collect(names):
+        needed = []
+        for section in names:
+            for name in SECTION_QUERIES.get(section, [section]):
+                if name in QUERIES and name not in needed and name not in frames:
+                    needed.append(name)
+        for name, frame in zip(needed, pl.collect_all([QUERIES[name](lf) for name in needed])):
+            frames[name] = frame.to_pandas()
+
+    if 'executive_summary' in planned:
+        collect(['executive_summary'])
+        yield 'executive_summary', _executive_summary(frames['executive_summary'], frames['totals'].iloc[0], raw_df, has)
+    collect(planned)
+    totals = frames['totals'].iloc[0] if 'totals' in frames else None
+    if 'zip_index' in frames:
+        index = zip_index_from_groups(frames['zip_index']['zip'], frames['zip_index'].fillna(0))
+
+    finishers = {
+        'tier_performance': lambda: _tier_performance(frames['tier_performance'], has),
+        'service_mix': lambda: _service_mix(frames['service_mix']),
+        'zone_distribution': lambda: _zone_distribution(frames['zone_distribution']),
+        'zone_transit': lambda: pd.DataFrame({
+            'Zone': frames['zone_transit']['zone'],
+            'Avg Transit Days': np.round(frames['zone_transit']['mean'].to_numpy(np.float64), 2)
+        }),
+        'zone_check': lambda: zone_check(df) if has_zone_column else empty_zone_check(),
+        'zip_index': lambda: zip_index_frame(index),
+        'exception_hotspots': lambda: _exception_hotspots(totals, index, has),
+        'exception_summary': lambda: _exception_summary(totals, has),
+        'regional_performance': lambda: _group_table(
+            frames['regional_performance'], 'state', 'State', has).head(10),
+        'day_of_week': lambda: _day_of_week(frames['day_of_week'], has),
+        'daily_trend': lambda: _daily_trend(frames['daily_trend']) if has_request_dates else empty_trend_state(),
+        'weight_impact': lambda: _weight_impact(frames['weight_impact'], has),
+        'carrier_performance': lambda: _carrier_performance(frames['carrier_performance'], data, has),
+        'cost_analysis': lambda: _cost_analysis(frames['cost_by_service'], frames['cost_by_zone'], totals),
+        'routing_optimization': lambda: _routing_optimization(totals, frames['state_counts'], has)
+    }
+    for section in SECTION_ORDER:
+        if section in planned and section != 'executive_summary':
+            yield section, finishers[section]()
@@ -0,0 +1,83 @@
+# render_cache.py - Memoized chart and table rendering
+# Figures and table CSS are cached per (section, section content hash,
+# theme), so reruns that don't change the data (expanding a recommendation,
+# clicking an export button) reuse them instead of rebuilding them. Tables
+# cache their CSS rather than a Styler: st.dataframe re-renders a Styler on
+# every rerun and mutates it while doing so, so each rerun styles a fresh
+# one from the cached CSS. The performance colors live here too, so they
+# can be tested without running the Streamlit script.
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+RENDER_CACHE_SIZE = 128
+DEFAULT_THEME = 'light'
+
+# Performance table colors: >= 95 good, >= 90 warning, else poor
+PERFORMANCE_CSS = {
+    'good': 'background-color: #D4EDDA; color: #155724; font-weight: 600;',
+    'warning': 'background-color: #FFF3CD; color: #856404; font-weight: 600;',
+    'poor': 'background-color: #F8D7DA; color: #721C24; font-weight: 600;'
+}
+PERFORMANCE_THRESHOLDS = {'good': 95, 'warning': 90}
+
+_css_cache = OrderedDict()
+
+def section_hash(value):
+    """Content hash of one section result (DataFrame, dict or scalar)"""
+    digest = hashlib.sha1()
+    if value is None:
+        digest.update(b'none')
+    elif isinstance(value, pd.DataFrame):
+        digest.update(str(list(value.columns)).encode('utf-8'))
+        digest.update(str(list(value.dtypes)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value.astype(str), index=False).to_numpy().tobytes())
+    else:
+        digest.update(repr(value).encode('utf-8'))
+    return digest.hexdigest()
+
+def render_key(name, section, theme=DEFAULT_THEME):
+    """Cache key for one rendered section"""
+    return (name, section_hash(section), theme or DEFAULT_THEME)
+
+def cached_css(key, builder):
+    """CSS strings for a table column, built once with builder() and reused on later reruns
+
+    The array is read-only, so every session can share it.
+    """
+    css = _css_cache.get(key)
+    if css is None:
+        css = np.array(builder(), dtype=object)
+        css.setflags(write=False)
+        _css_cache[key] = css
+        while len(_css_cache) > RENDER_CACHE_SIZE:
+            _css_cache.popitem(last=False)
+    else:
+        _css_cache.move_to_end(key)
+    return css
+
+def performance_css(values):
+    """CSS for a whole performance column at once (see PERFORMANCE_THRESHOLDS)"""
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        numeric = values.to_numpy(dtype=float, na_value=np.nan)
+        valid = np.ones(len(values), dtype=bool)  # NaN scores count as poor
+    else:
+        # '96.5%' style strings; unparseable cells stay unstyled
+        cleaned = values.astype(str).str.replace('%', '', regex=False).str.strip()
+        numeric = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(numeric)
+    return np.select(
+        [~valid, numeric >= PERFORMANCE_THRESHOLDS['good'], numeric >= PERFORMANCE_THRESHOLDS['warning']],
+        ['', PERFORMANCE_CSS['good'], PERFORMANCE_CSS['warning']],
+        default=PERFORMANCE_CSS['poor']
+    )
+
+def style_column(df, column, css):
+    """A new Styler applying precomputed CSS to one column"""
+    return df.style.apply(lambda values: css, subset=[column])
+
+def clear_render_cache():
+    _css_cache.clear()
@@ -0,0 +1,279 @@
+# report_exports.py - Streamlit-free report builders
+# Shared by the dashboard download buttons and the headless CLI
+
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# Columnar exports need pyarrow; Excel/CSV keep working without it
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Excel's hard per-sheet limit, header row included
+EXCEL_MAX_ROWS = 1048576
+# Raw-data sizes above this use the constant-memory streaming writer
+STREAMING_EXPORT_THRESHOLD = 200000
+STREAMING_CHUNK_ROWS = 50000
+
+# Columnar export tuning
+COLUMNAR_CHUNK_ROWS = 250000
+DICTIONARY_MAX_RATIO = 0.5   # Dictionary-encode text columns with fewer distinct values than this share of rows
+DICTIONARY_SAMPLE_ROWS = 100000
+COLUMNAR_FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrows'
+}
+
+HEADER_FORMAT = {
+    'bold': True,
+    'bg_color': '#5CB85C',
+    'font_color': 'white',
+    'border': 1
+}
+
+# Section tables written to the Excel report, in sheet order
+EXCEL_SECTION_SHEETS = {
+    'tier_performance': 'Tier Performance',
+    'service_mix': 'Service Mix',
+    'zone_distribution': 'Zone Distribution',
+    'regional_performance': 'Regional Performance',
+    'carrier_performance': 'Carrier Performance'
+}
+
+def write_excel_report(df, results, output, streaming=None):
+    """Write the multi-sheet Excel report to a path or binary buffer
+
+    Large raw data switches to write_excel_report_streaming automatically;
+    pass streaming=True/False to force either writer.
+    """
+    if streaming is None:
+        streaming = df is not None and len(df) > STREAMING_EXPORT_THRESHOLD
+    if streaming:
+        write_excel_report_streaming(df, results, output)
+        return
+
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # Raw data (not available for batch results)
+        if df is not None:
+            df.to_excel(writer, sheet_name='Raw Data', index=False)
+
+        # Analysis results
+        for section, sheet_name in EXCEL_SECTION_SHEETS.items():
+            if section in results and not results[section].empty:
+                results[section].to_excel(writer, sheet_name=sheet_name, index=False)
+
+        # Format
+        workbook = writer.book
+        header_format = workbook.add_format(HEADER_FORMAT)
+
+        for sheet in writer.sheets.values():
+            sheet.set_row(0, 20, header_format)
+            sheet.set_column(0, 20, 15)
+
+def _write_sheet_rows(sheet, df, first_row, last_row, chunk_rows):
+    """Write df rows [first_row, last_row) below the header, one chunk at a time"""
+    excel_row = 1
+    for start in range(first_row, last_row, chunk_rows):
+        chunk = df.iloc[start:min(start + chunk_rows, last_row)]
+        # Only the chunk is converted; NaN/NaT become blank cells
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.write_row(excel_row, 0, row)
+            excel_row += 1
+
+def _add_streamed_sheet(workbook, name, df, header_format, first_row=0, last_row=None, chunk_rows=STREAMING_CHUNK_ROWS):
+    sheet = workbook.add_worksheet(name)
+    sheet.set_column(0, 20, 15)
+    sheet.set_row(0, 20, header_format)
+    sheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+    _write_sheet_rows(sheet, df, first_row, len(df) if last_row is None else last_row, chunk_rows)
+
+def write_excel_report_streaming(df, results, output, chunk_rows=STREAMING_CHUNK_ROWS):
+    """Write the Excel report with bounded memory
+
+    Uses xlsxwriter's constant_memory mode, which flushes each finished row
+    to a temp file, converts the raw data one chunk at a time and splits it
+    across 'Raw Data', 'Raw Data 2', ... sheets at Excel's row limit.
+    """
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'tmpdir': tempfile.gettempdir(),
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+    })
+    try:
+        header_format = workbook.add_format(HEADER_FORMAT)
+
+        if df is not None:
+            rows_per_sheet = EXCEL_MAX_ROWS - 1
+            for sheet_number, first_row in enumerate(range(0, max(len(df), 1), rows_per_sheet), start=1):
+                name = 'Raw Data' if sheet_number == 1 else f'Raw Data {sheet_number}'
+                _add_streamed_sheet(workbook, name, df, header_format,
+                                    first_row, min(first_row + rows_per_sheet, len(df)), chunk_rows)
+
+        for section, sheet_name in EXCEL_SECTION_SHEETS.items():
+            if section in results and not results[section].empty:
+                _add_streamed_sheet(workbook, sheet_name, results[section], header_format, chunk_rows=chunk_rows)
+    finally:
+        workbook.close()
+
+def build_summary_frame(results):
+    """Headline metrics table used by the summary CSV"""
+    return pd.DataFrame({
+        'Metric': ['Total Shipments', 'On-Time %', 'Exception Rate', 'Avg Transit Days'],
+        'Value': [
+            len(results.get('tier_performance', pd.DataFrame())),
+            100 - results.get('exception_summary', {}).get('exception_rate', 0),
+            results.get('exception_summary', {}).get('exception_rate', 0),
+            results.get('tier_performance', pd.DataFrame()).get('Avg Days', pd.Series()).mean() if 'tier_performance' in results else 0
+        ]
+    })
+
+def build_summary_csv(results):
+    """Summary CSV text"""
+    return build_summary_frame(results).to_csv(index=False)
+
+# ----------------------
+# Columnar (Parquet / Arrow IPC) exports
+# ----------------------
+def section_tables(results):
+    """Every section in analysis_results as a flat table, keyed by file-safe name"""
+    tables = {}
+    for key, value in results.items():
+        if isinstance(value, pd.DataFrame):
+            tables[key] = value
+        elif key == 'cost_analysis':
+            tables['cost_by_service'] = pd.DataFrame(
+                list(value.get('avg_cost_by_service', {}).items()), columns=['Service', 'Avg Cost']
+            )
+            tables['cost_by_zone'] = pd.DataFrame(
+                [(str(zone), cost) for zone, cost in value.get('cost_per_zone', {}).items()],
+                columns=['Zone', 'Avg Cost']
+            )
+            tables['cost_summary'] = pd.DataFrame([{'potential_savings': value.get('potential_savings', 0)}])
+        elif key == 'routing_optimization':
+            tables['routing_recommendations'] = pd.DataFrame(
+                value.get('recommendations', []),
+                columns=['issue', 'impact', 'recommendation', 'savings']
+            )
+            tables['routing_summary'] = pd.DataFrame([{'potential_improvement': value.get('potential_improvement', 0)}])
+        elif isinstance(value, dict):
+            tables[key] = pd.DataFrame([value])
+    return tables
+
+def _is_text(series):
+    return (
+        series.dtype == object or
+        pd.api.types.is_string_dtype(series.dtype) or
+        isinstance(series.dtype, pd.CategoricalDtype)
+    )
+
+def columnar_schema(df):
+    """Arrow schema for df with low-cardinality text columns dictionary-encoded
+
+    Types come from the pandas dtypes (text is always written as strings),
+    so every chunk converts to the same schema.
+    """
+    sample = df.head(DICTIONARY_SAMPLE_ROWS)
+    fields = []
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or (
+            _is_text(series) and sample[col].nunique() <= max(1, DICTIONARY_MAX_RATIO * len(sample))
+        ):
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif _is_text(series):
+            arrow_type = pa.string()
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            arrow_type = pa.bool_()
+        elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+            unit = getattr(series.dtype, 'unit', None) or np.datetime_data(series.dtype)[0]
+            arrow_type = pa.timestamp(unit, tz=getattr(series.dtype, 'tz', None))
+        else:
+            try:
+                arrow_type = pa.from_numpy_dtype(np.dtype(series.dtype))
+            except TypeError:
+                # Nullable extension dtypes (Int64, Float64, ...)
+                arrow_type = pa.array(sample[col], from_pandas=True).type
+        fields.append(pa.field(str(col), arrow_type))
+    return pa.schema(fields)
+
+def _chunk_to_arrow(chunk, schema):
+    """Convert one chunk; text columns are stringified so mixed objects survive"""
+    arrays = []
+    for col, field in zip(chunk.columns, schema):
+        series = chunk[col]
+        if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+            values = series.astype(object)
+            values = values.where(values.isna(), values.astype(str)).where(values.notna(), None)
+            array = pa.array(values.tolist(), type=pa.string())
+            if pa.types.is_dictionary(field.type):
+                array = array.dictionary_encode().cast(field.type)
+        else:
+            array = pa.Array.from_pandas(series, type=field.type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def iter_arrow_batches(df, schema=None, chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """Yield df as Arrow record batches, converting one chunk at a time"""
+    schema = schema or columnar_schema(df)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield _chunk_to_arrow(df.iloc[start:start + chunk_rows], schema)
+
+def write_parquet(df, path, compression_level=None, chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """Write df to Parquet one row group per chunk (zstd when a level is given)"""
+    schema = columnar_schema(df)
+    compression = 'zstd' if compression_level is not None else 'snappy'
+    with pq.ParquetWriter(path, schema, compression=compression,
+                          compression_level=compression_level, use_dictionary=True) as writer:
+        for batch in iter_arrow_batches(df, schema, chunk_rows):
+            writer.write_batch(batch)
+
+def write_arrow_stream(df, path, compression_level=None, chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """Write df as an Arrow IPC stream, one record batch per chunk"""
+    schema = columnar_schema(df)
+    options = pa_ipc.IpcWriteOptions(
+        compression=pa.Codec('zstd', compression_level) if compression_level is not None else None
+    )
+    with pa.OSFile(path, 'wb') as sink, pa_ipc.new_stream(sink, schema, options=options) as writer:
+        for batch in iter_arrow_batches(df, schema, chunk_rows):
+            writer.write_batch(batch)
+
+def write_columnar_exports(df, results, output_dir, stem, fmt='parquet', compression_level=None,
+                           chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """Write the cleaned raw data and every section table as Parquet or Arrow IPC files
+
+    Returns the written paths: <stem>_raw.<ext> plus <stem>_<section>.<ext>.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Parquet/Arrow exports (pip install pyarrow)")
+
+    writer = write_parquet if fmt == 'parquet' else write_arrow_stream
+    extension = COLUMNAR_FORMATS[fmt]
+    tables = {}
+    if df is not None:
+        tables['raw'] = df
+    tables.update(section_tables(results))
+
+    written = []
+    for name, table in tables.items():
+        path = os.path.join(output_dir, f'{stem}_{name}{extension}')
+        writer(table, path, compression_level=compression_level, chunk_rows=chunk_rows)
+        written.append(path)
+    return written
+
+def write_columnar_archive(df, results, output, fmt='parquet', compression_level=None):
+    """Bundle the columnar exports into one zip (stored, the files are already compressed)"""
+    with tempfile.TemporaryDirectory(prefix='transitiq_') as tmp:
+        paths = write_columnar_exports(df, results, tmp, 'transitiq', fmt, compression_level)
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for path in paths:
+                archive.write(path, arcname=os.path.basename(path))
@@ -0,0 +1,182 @@
+# sampling.py - Instant preview of large uploads from a stratified sample
+# Multi-million-row uploads take a while to analyze exactly. The dashboard
+# first analyzes a sample stratified by Xparcel Type and Calculated Zone
+# (each tier/zone cell keeps its share of the rows, and no cell is left out)
+# and shows 95% confidence intervals for the on-time rates. Rare cells are
+# oversampled by that minimum of one row, so every sampled row is weighted
+# by its cell's rows in the upload over its rows in the sample, and the
+# sample is reduced to batch aggregates (see batch_analysis) once, with
+# those weights. Its cost follows the sample size, not the number of cells.
+# The exact results replace the preview once the background job has finished.
+
+import numpy as np
+import pandas as pd
+
+from batch_analysis import compute_partial_aggregates, results_from_aggregates
+from dashboard_imports import ensure_required_columns, summarize_shipments
+from section_planner import plan_sections
+from shipment_dataset import ShipmentDataset
+
+# Uploads larger than this get the sample preview first
+SAMPLE_THRESHOLD_ROWS = 1_000_000
+SAMPLE_ROWS = 100_000
+SAMPLE_STRATA = ['Xparcel Type', 'Calculated Zone']
+# Two-sided 95% normal quantile
+CONFIDENCE_Z = 1.96
+
+# Tables that get an 'On-Time % ±' column, with the role their rows are grouped by
+ON_TIME_TABLES = {
+    'tier_performance': 'tier',
+    'regional_performance': 'state',
+    'day_of_week': 'weekday_date',
+    'weight_impact': 'weight',
+    'carrier_performance': 'carrier'
+}
+
+def wants_preview(df, threshold=SAMPLE_THRESHOLD_ROWS):
+    """True when the frame is large enough to preview from a sample first"""
+    return df is not None and len(df) > threshold
+
+def _sample_rows(df, size, strata, seed):
+    """(sorted row positions drawn, cell code per drawn row, rows per cell in df)"""
+    codes = np.zeros(len(df), dtype=np.int64)
+    for col in strata:
+        if col in df.columns:
+            # Missing values are a cell of their own
+            col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            codes = codes * len(uniques) + col_codes
+    # Number the occupied cells 0..k-1
+    occupied = np.bincount(codes) > 0
+    codes = (np.cumsum(occupied) - 1)[codes]
+
+    counts = np.bincount(codes)
+    quotas = counts * size / len(df)
+    taken = np.floor(quotas).astype(np.int64)
+    # Largest remainders make up the rounding shortfall
+    shortfall = size - taken.sum()
+    if shortfall > 0:
+        taken[np.argsort(taken - quotas, kind='stable')[:shortfall]] += 1
+    taken = np.minimum(np.maximum(taken, counts > 0), counts)
+
+    # Shuffle, then a stable (radix) sort on the small cell codes groups the
+    # rows by cell in random order; keep the first quota of each
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permutation(len(df))
+    small_codes = codes.astype(np.int16 if len(counts) <= np.iinfo(np.int16).max else np.int32)
+    order = shuffled[np.argsort(small_codes[shuffled], kind='stable')]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    cell = codes[order]
+    keep = np.arange(len(df)) - starts[cell] < taken[cell]
+    positions = np.sort(order[keep])
+    return positions, codes[positions], counts
+
+def stratified_sample(df, size=SAMPLE_ROWS, strata=SAMPLE_STRATA, seed=0):
+    """Rows drawn from each strata cell in proportion to its size
+
+    Every non-empty cell keeps at least one row, so rare tier/zone
+    combinations still appear. Rows come back in their original order.
+    """
+    if len(df) <= size:
+        return df
+    positions, _, _ = _sample_rows(df, size, strata, seed)
+    return df.take(positions)
+
+def wilson_interval(successes, n, z=CONFIDENCE_Z):
+    """(low, high) Wilson score interval for a proportion (NaN when n is 0)"""
+    successes = np.asarray(successes, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = successes / n
+        denominator = 1 + z ** 2 / n
+        center = (p + z ** 2 / (2 * n)) / denominator
+        half = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return np.clip(center - half, 0, 1), np.clip(center + half, 0, 1)
+
+def on_time_margin(on_time_pct, n, z=CONFIDENCE_Z):
+    """Half-width in percentage points of the interval around on-time percentages"""
+    n = np.asarray(n, dtype=float)
+    low, high = wilson_interval(np.asarray(on_time_pct, dtype=float) / 100 * n, n, z)
+    return np.round(100 * (high - low) / 2, 1)
+
+def effective_rows(weights):
+    """Kish effective sample size of weighted rows: (sum w)^2 / sum w^2"""
+    weights = np.asarray(weights, dtype=float)
+    return weights.sum() ** 2 / (weights ** 2).sum() if len(weights) else 0.0
+
+def _group_keys(data, role):
+    if role == 'weekday_date':
+        return data.weekday
+    if role == 'weight':
+        return data.weight_buckets
+    return data.column(role)
+
+def _table_sizes(data, role, weights, counted, keys):
+    """Effective sample size behind each row of a grouped table, in the order of keys"""
+    if not data.has(role):
+        # The carrier table is a placeholder; other roles got one default value
+        size = np.nan if role == 'carrier' else effective_rows(weights[counted])
+        return np.full(len(keys), size)
+    frame = pd.DataFrame({'weight': weights, 'squared': weights ** 2})[counted]
+    group_keys = np.asarray(_group_keys(data, role), dtype=object)[counted]
+    sums = frame.groupby(group_keys, sort=False).sum()
+    sizes = sums['weight'] ** 2 / sums['squared']
+    return sizes.reindex(list(keys)).to_numpy(dtype=float)
+
+def preview_summary(data, sample, weights, population):
+    """Executive summary of the weighted sample with 95% intervals and the sample size
+
+    data is the prepared sample (required columns added) and sample the
+    uploaded rows, as for summarize_shipments.
+    """
+    summary = summarize_shipments(data, sample, weights)
+    sla_known = data.column('sla').notna().to_numpy() if data.has('sla') else np.ones(len(data), dtype=bool)
+    summary.update({
+        'total_shipments': population,
+        'sample_rows': len(sample),
+        'population': population,
+        'on_time_ci': on_time_margin(summary['on_time_pct'], effective_rows(weights[sla_known])).item()
+    })
+    if 'Days In Transit' in sample.columns:
+        transit = pd.to_numeric(sample['Days In Transit'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        known = ~np.isnan(transit)
+        n = effective_rows(weights[known])
+        if n > 1:
+            spread = np.average((transit[known] - summary['avg_transit']) ** 2, weights=weights[known]) * n / (n - 1)
+            summary['avg_transit_ci'] = round(CONFIDENCE_Z * float(np.sqrt(spread / n)), 2)
+    return summary
+
+def iter_preview_sections(raw_df, sections=None, size=SAMPLE_ROWS, strata=SAMPLE_STRATA, seed=0):
+    """Like iter_analysis_sections, but computed on a stratified sample
+
+    Each sampled row is weighted by its strata cell's rows in raw_df over
+    its rows in the sample, so counts add up to the full frame and rates
+    are not skewed by rare cells. The executive summary comes first, with
+    the sample size and its intervals; on-time tables gain an
+    'On-Time % ±' column from the effective sample size of each row.
+    """
+    if len(raw_df) <= size:
+        positions, weights = np.arange(len(raw_df)), np.ones(len(raw_df))
+    else:
+        positions, cells, counts = _sample_rows(raw_df, size, strata, seed)
+        weights = (counts / np.bincount(cells, minlength=len(counts)))[cells]
+    sample = raw_df.take(positions)
+    prepared = sample.copy(deep=False)
+    ensure_required_columns(prepared)
+    data = ShipmentDataset(prepared)
+
+    planned = plan_sections(sections)['sections']
+    if 'executive_summary' in planned:
+        yield 'executive_summary', preview_summary(data, sample, weights, len(raw_df))
+
+    results = results_from_aggregates(compute_partial_aggregates(sample, weights))
+    counted = data.column('sla').notna().to_numpy() if data.has('sla') else np.ones(len(data), dtype=bool)
+    for section in planned:
+        if section == 'executive_summary':
+            continue
+        result = results.get(section)
+        role = ON_TIME_TABLES.get(section)
+        if role and isinstance(result, pd.DataFrame) and 'On-Time %' in result.columns:
+            n = _table_sizes(data, role, weights, counted, result[result.columns[0]])
+            result = result.copy()
+            result.insert(result.columns.get_loc('On-Time %') + 1, 'On-Time % ±', on_time_margin(result['On-Time %'], n))
+        yield section, result
@@ -0,0 +1,77 @@
+# section_planner.py - The minimal set of analyzers a dashboard run needs
+# The sidebar toolkits decide which sections are shown. plan_sections turns
+# the visible sections into the analyzers that must run (dependencies
+# included, e.g. the exception hotspots read the ZIP index), so a run with
+# three sections only pays for three. ShipmentDataset derives its fields
+# on first use, so sections that are skipped never derive theirs.
+
+# Result keys in the order iter_analysis_sections yields them
+SECTION_ORDER = [
+    'executive_summary',
+    'tier_performance',
+    'service_mix',
+    'zone_distribution',
+    'zone_transit',
+    'zone_check',
+    'zip_index',
+    'exception_hotspots',
+    'exception_summary',
+    'regional_performance',
+    'day_of_week',
+    'daily_trend',
+    'weight_impact',
+    'carrier_performance',
+    'cost_analysis',
+    'routing_optimization'
+]
+
+# Sections a section reads (computed first, even when not shown)
+SECTION_DEPENDENCIES = {
+    'exception_hotspots': ['zip_index']
+}
+
+# Shown whatever the toolkit toggles say
+CORE_SECTIONS = ['executive_summary', 'tier_performance', 'service_mix',
+                 'exception_summary', 'exception_hotspots', 'zip_index']
+
+# Sidebar toolkit toggle -> the sections it adds
+TOOLKIT_SECTIONS = {
+    'national_select': ['regional_performance'],
+    'zone_toolkit': ['zone_distribution', 'zone_transit', 'zone_check'],
+    'xparcel_logic': ['routing_optimization'],
+    'tet': ['day_of_week', 'daily_trend', 'weight_impact'],
+    'cost_optimizer': ['cost_analysis'],
+    'carrier_scoring': ['carrier_performance']
+}
+
+def sections_for_toolkits(toolkits=None):
+    """Visible sections for the toolkit toggles (a toggle left out counts as on)"""
+    toolkits = toolkits or {}
+    visible = list(CORE_SECTIONS)
+    for toolkit, sections in TOOLKIT_SECTIONS.items():
+        if toolkits.get(toolkit, True):
+            visible.extend(section for section in sections if section not in visible)
+    return visible
+
+def plan_sections(sections=None):
+    """Analyzers needed to show sections (None means all)
+
+    Returns a dict with 'sections' (result keys to compute, in analysis
+    order) and 'skipped'.
+    """
+    if sections is None:
+        wanted = set(SECTION_ORDER)
+    else:
+        wanted = set()
+        pending = list(sections)
+        while pending:
+            section = pending.pop()
+            if section in wanted:
+                continue
+            wanted.add(section)
+            pending.extend(SECTION_DEPENDENCIES.get(section, []))
+
+    return {
+        'sections': [section for section in SECTION_ORDER if section in wanted],
+        'skipped': [section for section in SECTION_ORDER if section not in wanted]
+    }
@@ -0,0 +1,257 @@
+# shipment_dataset.py - Cleaned shipments with a resolved schema and cached derivations
+# Every analyzer used to rediscover its columns ("first column containing
+# 'zone'") and re-derive weekday, weight bucket, SLA days and delay from the
+# frame. A ShipmentDataset resolves the columns once and computes each
+# derived field on first use, so a full 11-section run derives each of them
+# exactly once. Derived fields are kept on the dataset, never written into
+# the frame.
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from weight_units import WEIGHT_BINS, WEIGHT_LABELS
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DEFAULT_SLA_DAYS = 8
+
+# Roles with a fixed canonical column (set by the mappers / ensure_required_columns)
+CANONICAL_COLUMNS = {
+    'tier': 'Xparcel Type',
+    'transit': 'Days In Transit',
+    'business_transit': 'Business Days In Transit',
+    'sla': 'SLA Status',
+    'cost': 'Cost',
+    'carrier': 'Carrier',
+    'calculated_zone': 'Calculated Zone',
+    'destination_state': 'Destination State',
+    'destination_zip': 'Destination ZIP',
+    'request_date': 'Request Date',
+    'delivery_date': 'Delivery Date'
+}
+# Roles found by keyword, the way the analyzers always matched them: the first
+# column whose lowercase name contains every word of any alternative
+KEYWORD_COLUMNS = {
+    'zone': [('zone',)],
+    'state': [('state',)],
+    'weight': [('weight',)],
+    'weekday_date': [('date', 'request')],
+    'zip': [('zip',), ('postal',)]
+}
+
+def resolve_schema(df):
+    """Role -> column name (None when the frame has no such column)"""
+    schema = {role: col if col in df.columns else None for role, col in CANONICAL_COLUMNS.items()}
+    for role, alternatives in KEYWORD_COLUMNS.items():
+        schema[role] = next(
+            (col for col in df.columns
+             if any(all(word in str(col).lower() for word in words) for words in alternatives)),
+            None
+        )
+    return schema
+
+# Derived field -> the roles it is computed from ('numeric:<role>', 'sla:<status>'
+# and 'dates:<column>' read the role / column in their name)
+DERIVED_ROLES = {
+    'weekday_codes': ['weekday_date'],
+    'weekday': ['weekday_date'],
+    'weight_bucket_codes': ['weight'],
+    'weight_buckets': ['weight'],
+    'sla_days': ['tier'],
+    'sla_transit': ['business_transit', 'transit'],
+    'delay': ['business_transit', 'transit', 'tier']
+}
+
+class ShipmentDataset:
+    """A cleaned shipment frame plus its resolved schema and derived-column cache"""
+
+    def __init__(self, df):
+        self.df = df
+        self.schema = resolve_schema(df)
+        self._derived = {}
+
+    @classmethod
+    def wrap(cls, data):
+        """Return data unchanged if it is already a dataset, else wrap the frame"""
+        return data if isinstance(data, cls) else cls(data)
+
+    def __len__(self):
+        return len(self.df)
+
+    def has(self, *roles):
+        return all(self.schema.get(role) is not None for role in roles)
+
+    def column(self, role):
+        """The column playing role, or None"""
+        name = self.schema.get(role)
+        return self.df[name] if name is not None else None
+
+    def _cached(self, name, compute):
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+
+    # ----------------------
+    # Derived fields
+    # ----------------------
+    def numeric(self, role):
+        """Numeric values of a column as an array (NaN where not numeric)
+
+        Columns already parsed to a NumPy numeric dtype are returned as is,
+        without a float64 copy.
+        """
+        def compute():
+            values = self.column(role)
+            if values is None:
+                return np.full(len(self.df), np.nan)
+            if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iuf':
+                return values.to_numpy()
+            return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        return self._cached(f'numeric:{role}', compute)
+
+    def dates(self, role):
+        """Parsed datetimes of a date column (NaT where unreadable)
+
+        Cached per column, so roles that share a column parse it once.
+        """
+        def compute():
+            values = self.column(role)
+            if values is None:
+                return pd.Series(pd.NaT, index=self.df.index, dtype='datetime64[ns]')
+            if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                return values
+            return pd.to_datetime(values, errors='coerce')
+        return self._cached(f'dates:{self.schema.get(role)}', compute)
+
+    @property
+    def weekday_codes(self):
+        """0 (Monday) - 6 (Sunday) per row from the request date column, -1 when unknown"""
+        def compute():
+            days = self.dates('weekday_date').dt.dayofweek
+            return days.fillna(-1).to_numpy(dtype=np.int8)
+        return self._cached('weekday_codes', compute)
+
+    @property
+    def weekday(self):
+        """Day names as a categorical Series named Day_of_Week (NaN when unknown)"""
+        def compute():
+            days = pd.Categorical.from_codes(self.weekday_codes, DAY_ORDER)
+            return pd.Series(days, index=self.df.index, name='Day_of_Week')
+        return self._cached('weekday', compute)
+
+    @property
+    def weight_bucket_codes(self):
+        """Index into WEIGHT_LABELS per row (-1 for missing or non-positive weight)"""
+        def compute():
+            return pd.cut(self.numeric('weight'), bins=WEIGHT_BINS).codes.astype(np.int8)
+        return self._cached('weight_bucket_codes', compute)
+
+    @property
+    def weight_buckets(self):
+        """Ordered weight-bucket categories as a Series named Weight_Bucket"""
+        def compute():
+            buckets = pd.Categorical.from_codes(self.weight_bucket_codes, WEIGHT_LABELS, ordered=True)
+            return pd.Series(buckets, index=self.df.index, name='Weight_Bucket')
+        return self._cached('weight_buckets', compute)
+
+    @property
+    def sla_days(self):
+        """Xparcel SLA commitment in days per row (DEFAULT_SLA_DAYS for unknown tiers)"""
+        def compute():
+            from dashboard_imports import XPARCEL_LOGIC
+            tiers = self.column('tier')
+            if tiers is None:
+                return np.full(len(self.df), DEFAULT_SLA_DAYS, dtype=np.float32)
+            # Look up each distinct tier once, then spread to the rows
+            codes, uniques = pd.factorize(tiers, use_na_sentinel=True)
+            lookup = np.array([XPARCEL_LOGIC.get(tier, {}).get('sla_days', DEFAULT_SLA_DAYS)
+                               for tier in uniques] + [DEFAULT_SLA_DAYS], dtype=np.float32)
+            return lookup[codes]
+        return self._cached('sla_days', compute)
+
+    @property
+    def sla_transit(self):
+        """Transit days the SLAs are measured in: business days when the mappers
+        derived them from the dates, else Days In Transit"""
+        role = 'business_transit' if self.has('business_transit') else 'transit'
+        return self._cached('sla_transit', lambda: self.numeric(role))
+
+    @property
+    def delay(self):
+        """Transit days beyond the SLA (negative when early, NaN when unknown)"""
+        return self._cached('delay', lambda: self.sla_transit.astype(float) - self.sla_days)
+
+    def sla_is(self, status):
+        """Boolean array of rows whose SLA Status equals status"""
+        def compute():
+            values = self.column('sla')
+            if values is None:
+                return np.zeros(len(self.df), dtype=bool)
+            return (values == status).to_numpy(dtype=bool, na_value=False)
+        return self._cached(f'sla:{status}', compute)
+
+    @property
+    def is_miss(self):
+        return self.sla_is('SLA Miss')
+
+    @property
+    def is_on_time(self):
+        return self.sla_is('On-Time')
+
+    @property
+    def bitmaps(self):
+        """Per-value bitmap index on carrier, tier, state, zone and SLA (see bitmap_index)"""
+        def compute():
+            from bitmap_index import build_bitmap_index
+            return build_bitmap_index(self)
+        return self._cached('bitmaps', compute)
+
+    def select(self, filters):
+        """Dataset over the rows passing filters, picked with the bitmap index
+
+        The frame is taken once for the selected rows (no per-value masked
+        copies); derived fields already computed here are gathered for those
+        rows instead of being derived again.
+        """
+        from bitmap_index import bitmap_rows, select_bitmap
+        rows = bitmap_rows(self.bitmaps, select_bitmap(self.bitmaps, filters))
+        subset = ShipmentDataset(self.df.take(rows))
+        for name, values in self._derived.items():
+            if isinstance(values, (np.ndarray, pd.Series)) and len(values) == len(self.df):
+                subset._derived[name] = values[rows] if isinstance(values, np.ndarray) else values.take(rows)
+        return subset
+
+    def reuse_derived(self, other, changed=()):
+        """Take other's derived fields for the same rows, where the columns they read are unchanged
+
+        other is a dataset over the same rows before columns were added or
+        rewritten (changed lists those, e.g. by ensure_required_columns).
+        """
+        changed = set(changed)
+        def unchanged(role):
+            column = self.schema.get(role)
+            return column == other.schema.get(role) and column not in changed
+        for name, values in other._derived.items():
+            if name in self._derived or not isinstance(values, (np.ndarray, pd.Series)):
+                continue
+            kind, _, key = name.partition(':')
+            if kind == 'dates':
+                reusable = key in self.df.columns and key in other.df.columns and key not in changed
+            elif kind in ('numeric', 'sla'):
+                reusable = unchanged(key if kind == 'numeric' else 'sla')
+            else:
+                reusable = name in DERIVED_ROLES and all(unchanged(role) for role in DERIVED_ROLES[name])
+            if reusable:
+                self._derived[name] = values
+        return self
+
+    @property
+    def fingerprint(self):
+        """Content hash of the frame (columns and values), computed once"""
+        def compute():
+            digest = hashlib.sha1()
+            digest.update(str(list(self.df.columns)).encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(self.df, index=False).to_numpy().tobytes())
+            return digest.hexdigest()
+        return self._cached('fingerprint', compute)
@@ -0,0 +1,440 @@
+# sql_engine.py - SQL analysis backend over the columnar cache
+# Runs the section aggregations as SQL in an embedded, in-process engine and
+# feeds them to the same finalizer batch mode uses (results_from_aggregates).
+# DuckDB, when installed, scans the cached Parquet files directly: every
+# query is multi-threaded and spills to disk, so files larger than RAM can
+# be analyzed. Without DuckDB the standard-library sqlite3 runs the same
+# queries over an in-memory table.
+#
+# Lookups that need the bundled ZIP tables or pandas parsing (inferred
+# zones, backfilled destination states, string dates, ZIP5 codes, the zone
+# cross-check) are computed once per distinct value in Python and joined
+# back in SQL, never per row.
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+from batch_analysis import combine_partial_aggregates, results_from_aggregates
+from dashboard_imports import XPARCEL_LOGIC
+from section_planner import plan_sections
+from shipment_dataset import DAY_ORDER, DEFAULT_SLA_DAYS, resolve_schema
+from trend_engine import empty_trend_state
+from weight_units import WEIGHT_BINS, WEIGHT_LABELS
+from zip_geo import empty_zone_check, zip_geo_lookup, zone_check
+from zip_index import find_zip_column, zip_index_frame, zip_index_from_groups
+from zone_inference import find_origin_zip_column, infer_zone_column
+
+SQL_BACKENDS = ['duckdb', 'sqlite']
+# Same defaults as ensure_required_columns, in the order it adds them
+REQUIRED_DEFAULTS = {
+    'Xparcel Type': 'Ground',
+    'Days In Transit': 5,
+    'Calculated Zone': '4',
+    'Destination State': 'CA',
+    'Destination ZIP': '90210',
+    'Weight': 1.0,
+    'Cost': 10.0,
+    'SLA Status': 'On-Time',
+    'Request Date': None,       # Today, like datetime.now()
+    'Delivery Date': None
+}
+DIALECTS = {
+    'duckdb': {
+        'number': 'TRY_CAST({} AS DOUBLE)',
+        'day': 'CAST({} AS DATE)',
+        'weekday': '(isodow({}) - 1)'
+    },
+    'sqlite': {
+        'number': '{}',           # Numeric columns are coerced while loading
+        'day': 'date({})',
+        'weekday': "((CAST(strftime('%w', {}) AS INTEGER) + 6) % 7)"
+    }
+}
+GROUP_MEASURES = ['rows', 'transit_n', 'transit_sum', 'cost_n', 'cost_sum', 'sla_n', 'on_time']
+
+def available_backends():
+    return [backend for backend in SQL_BACKENDS if backend != 'duckdb' or DUCKDB_AVAILABLE]
+
+def default_backend():
+    return available_backends()[0]
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+# ----------------------
+# Connections
+# ----------------------
+def connect(backend=None, temp_directory=None):
+    """{'backend', 'conn'} for an in-memory database
+
+    temp_directory is where DuckDB spills when a query outgrows memory.
+    """
+    backend = backend or default_backend()
+    if backend not in available_backends():
+        raise ValueError(f"SQL backend '{backend}' is not available (use one of {', '.join(available_backends())})")
+    if backend == 'duckdb':
+        conn = duckdb.connect()
+        if temp_directory:
+            conn.execute(f"SET temp_directory = {_literal(str(temp_directory))}")
+    else:
+        import sqlite3
+        conn = sqlite3.connect(':memory:')
+    return {'backend': backend, 'conn': conn}
+
+def query(engine, sql):
+    """Run a query and return a DataFrame"""
+    if engine['backend'] == 'duckdb':
+        return engine['conn'].execute(sql).df()
+    return pd.read_sql_query(sql, engine['conn'])
+
+def register(engine, name, frame):
+    """Expose a DataFrame to SQL under name"""
+    if engine['backend'] == 'duckdb':
+        engine['conn'].register(name, frame)
+    else:
+        frame.to_sql(name, engine['conn'], index=False, if_exists='replace')
+
+def _used_columns(columns):
+    """Source columns the section queries read, in source order"""
+    empty = pd.DataFrame(columns=columns)
+    schema = resolve_schema(empty)
+    used = (set(REQUIRED_DEFAULTS) - {'Delivery Date'}) | {'Carrier', 'Distance Miles', find_zip_column(empty),
+                                                         find_origin_zip_column(empty)}
+    used |= {schema[role] for role in ('zone', 'state', 'weight', 'weekday_date')}
+    return [col for col in columns if col in used]
+
+def _sqlite_frame(df):
+    """The used columns, numeric ones coerced like pd.to_numeric in the analyzers"""
+    df = df[_used_columns(list(df.columns))].copy(deep=False)
+    schema = resolve_schema(df)
+    for col in ('Days In Transit', 'Cost', schema['weight']):
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col].dtype):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def _read_source(source):
+    return source if isinstance(source, pd.DataFrame) else pd.read_parquet(source)
+
+def open_sources(engine, sources, name='source'):
+    """Register cleaned frames or cached Parquet paths (one schema) as a relation
+
+    Returns the relation's column dtypes. DuckDB reads Parquet paths in
+    place; sqlite loads them.
+    """
+    paths = [source for source in sources if not isinstance(source, pd.DataFrame)]
+    frames = [source for source in sources if isinstance(source, pd.DataFrame)]
+    if engine['backend'] == 'duckdb':
+        parts = []
+        if paths:
+            parts.append(f"SELECT * FROM read_parquet([{', '.join(_literal(str(path)) for path in paths)}])")
+        for i, frame in enumerate(frames):
+            register(engine, f'{name}_frame_{i}', frame)
+            parts.append(f'SELECT * FROM {name}_frame_{i}')
+        engine['conn'].execute(f"CREATE OR REPLACE TEMP VIEW {name} AS {' UNION ALL BY NAME '.join(parts)}")
+        return query(engine, f'SELECT * FROM {name} LIMIT 0').dtypes
+
+    dtypes = None
+    for i, source in enumerate(sources):
+        df = _sqlite_frame(_read_source(source))
+        dtypes = df.dtypes if dtypes is None else dtypes
+        df.to_sql(name, engine['conn'], index=False, if_exists='replace' if i == 0 else 'append')
+    return dtypes
+
+def source_signature(source):
+    """(column, type) pairs; sources with equal signatures are queried together"""
+    if isinstance(source, pd.DataFrame):
+        return tuple((str(col), str(dtype)) for col, dtype in source.dtypes.items())
+    import pyarrow.parquet as pq
+    return tuple((field.name, str(field.type)) for field in pq.read_schema(source))
+
+def source_rows(source):
+    if isinstance(source, pd.DataFrame):
+        return len(source)
+    import pyarrow.parquet as pq
+    return pq.read_metadata(source).num_rows
+
+# ----------------------
+# Prepared shipments
+# ----------------------
+def _lookup(engine, name, keys, frame):
+    """Register a lookup frame and return its LEFT JOIN clause on the source's key columns"""
+    register(engine, name, frame)
+    condition = ' AND '.join(f's.{_quote(key)} = {name}.{_quote(key)}' for key in keys)
+    return f'LEFT JOIN {name} ON {condition}'
+
+def _distinct(engine, relation, columns):
+    return query(engine, f"SELECT DISTINCT {', '.join(_quote(col) for col in columns)} FROM {relation}")
+
+def prepare_shipments(engine, relation, dtypes):
+    """Create the 'shipments' relation: one typed column per measure and grouping key
+
+    Mirrors ensure_required_columns and ShipmentDataset: zones are inferred
+    and destination states backfilled from the ZIP tables, missing columns
+    take their defaults, and roles are resolved on the resulting columns.
+    Returns facts the aggregates need ({'columns', 'schema', ...}).
+    """
+    dialect = DIALECTS[engine['backend']]
+    source_columns = list(dtypes.index)
+    expressions = {col: f's.{_quote(col)}' for col in source_columns}
+    columns = list(source_columns)
+    joins = []
+    text_columns = {col for col in source_columns if not pd.api.types.is_numeric_dtype(dtypes[col])
+                    and not pd.api.types.is_datetime64_any_dtype(dtypes[col])}
+
+    # Missing zones from origin/destination ZIP3, per distinct ZIP pair
+    if 'Calculated Zone' not in columns and 'Destination ZIP' in columns:
+        keys = [col for col in (find_origin_zip_column(pd.DataFrame(columns=columns)), 'Destination ZIP') if col]
+        pairs = _distinct(engine, relation, keys)
+        zones = infer_zone_column(pairs)
+        if zones is not None:
+            joins.append(_lookup(engine, 'zone_lookup', keys, pairs.assign(_zone=zones)))
+            expressions['Calculated Zone'] = f"COALESCE(zone_lookup._zone, {_literal(REQUIRED_DEFAULTS['Calculated Zone'])})"
+            columns.append('Calculated Zone')
+            text_columns.add('Calculated Zone')
+
+    # Blank destination states from the ZIP table, per distinct ZIP
+    if 'Destination ZIP' in columns:
+        zips = _distinct(engine, relation, ['Destination ZIP'])
+        zips['_state'] = zip_geo_lookup(zips['Destination ZIP'])['state']
+        zips = zips[zips['_state'].notna()].reset_index(drop=True)
+        if 'Destination State' in columns:
+            state = expressions['Destination State']
+            blank = f"({state} IS NULL OR trim(CAST({state} AS TEXT)) IN ('', 'Unknown', 'nan', 'None'))"
+            joins.append(_lookup(engine, 'state_lookup', ['Destination ZIP'], zips))
+            expressions['Destination State'] = (
+                f'CASE WHEN {blank} AND state_lookup._state IS NOT NULL THEN state_lookup._state ELSE {state} END'
+            )
+        elif len(zips):
+            joins.append(_lookup(engine, 'state_lookup', ['Destination ZIP'], zips))
+            expressions['Destination State'] = 'state_lookup._state'
+            columns.append('Destination State')
+            text_columns.add('Destination State')
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    for col, default in REQUIRED_DEFAULTS.items():
+        if col not in columns:
+            expressions[col] = _literal(today if default is None else default)
+            columns.append(col)
+            if isinstance(default, str):
+                text_columns.add(col)
+    schema = resolve_schema(pd.DataFrame(columns=columns))
+
+    def number(col):
+        if col is None:
+            return 'NULL'
+        if col in source_columns and not pd.api.types.is_numeric_dtype(dtypes[col]):
+            return dialect['number'].format(expressions[col])
+        return expressions[col]
+
+    date_lookups = {}
+    def day(col):
+        if col not in source_columns or pd.api.types.is_datetime64_any_dtype(dtypes[col]):
+            return dialect['day'].format(expressions[col])
+        # String dates are parsed by pandas, once per distinct value
+        if col not in date_lookups:
+            name = f'date_lookup_{len(date_lookups)}'
+            values = _distinct(engine, relation, [col])
+            values['_date'] = pd.to_datetime(values[col], errors='coerce')
+            joins.append(_lookup(engine, name, [col], values))
+            date_lookups[col] = dialect['day'].format(f'{name}._date')
+        return date_lookups[col]
+
+    tier = expressions['Xparcel Type']
+    transit = number('Days In Transit')
+    # The SLA delay is measured in business days when the mappers derived them
+    sla_transit = number('Business Days In Transit') if 'Business Days In Transit' in columns else transit
+    sla_days = ' '.join(f"WHEN {_literal(name)} THEN {float(logic.get('sla_days', DEFAULT_SLA_DAYS))}"
+                        for name, logic in XPARCEL_LOGIC.items())
+    weight = number(schema['weight'])
+    weight_buckets = ' '.join(
+        f'WHEN {weight} > {low}' + (f' AND {weight} <= {high}' if np.isfinite(high) else '') + f' THEN {code}'
+        for code, (low, high) in enumerate(zip(WEIGHT_BINS, WEIGHT_BINS[1:]))
+    )
+    calculated_zone = expressions['Calculated Zone']
+    # isin(['1', '2', '3']) never matches a numeric zone column
+    short_zone = (f"{calculated_zone} IN ('1', '2', '3')" if 'Calculated Zone' in text_columns else '1 = 0')
+    request_day = day('Request Date')
+    weekday_day = day(schema['weekday_date'])
+    sla = expressions['SLA Status']
+
+    view = f"""
+        SELECT
+            {tier} AS tier,
+            {transit} AS transit,
+            {number('Cost')} AS cost,
+            {sla} AS sla,
+            CASE WHEN {sla} = 'On-Time' THEN 1 ELSE 0 END AS on_time,
+            CASE WHEN {sla} = 'SLA Miss' THEN 1 ELSE 0 END AS miss,
+            {sla_transit} - CASE {tier} {sla_days} ELSE {float(DEFAULT_SLA_DAYS)} END AS delay,
+            CASE WHEN {short_zone} AND {tier} IN ('Expedited', 'Priority') THEN 1 ELSE 0 END AS overservice,
+            {expressions[schema['carrier']] if schema['carrier'] else 'NULL'} AS carrier,
+            {calculated_zone} AS calculated_zone,
+            {expressions[schema['zone']]} AS zone,
+            {expressions['Destination State']} AS destination_state,
+            {expressions[schema['state']]} AS state,
+            {request_day} AS request_day,
+            CASE WHEN {dialect['weekday'].format(request_day)} = 4 THEN 1 ELSE 0 END AS friday,
+            {dialect['weekday'].format(weekday_day)} AS weekday,
+            CASE {weight_buckets} END AS weight_bucket,
+            {expressions[find_zip_column(pd.DataFrame(columns=columns))]} AS zip
+        FROM {relation} AS s
+        {' '.join(joins)}
+    """
+    # DuckDB streams each query from the source; sqlite evaluates the joins once
+    kind = 'VIEW' if engine['backend'] == 'duckdb' else 'TABLE'
+    engine['conn'].execute(f'CREATE TEMP {kind} shipments AS {view}')
+    return {
+        'columns': columns,
+        'schema': schema,
+        'has_request_dates': 'Request Date' in source_columns,
+        'has_zone_column': 'Calculated Zone' in source_columns
+    }
+
+# ----------------------
+# Section queries
+# ----------------------
+MEASURES_SQL = """
+    COUNT(*) AS "rows",
+    COUNT(transit) AS transit_n,
+    CAST(COALESCE(SUM(transit), 0) AS DOUBLE) AS transit_sum,
+    COUNT(cost) AS cost_n,
+    CAST(COALESCE(SUM(cost), 0) AS DOUBLE) AS cost_sum,
+    COUNT(sla) AS sla_n,
+    CAST(SUM(on_time) AS BIGINT) AS on_time
+"""
+
+def _group_stats(engine, key, key_name):
+    """Same frame as batch_analysis._group_stats; NULL keys are dropped like groupby"""
+    return query(engine, f"""
+        SELECT {key} AS {_quote(key_name)}, {MEASURES_SQL}
+        FROM shipments WHERE {key} IS NOT NULL GROUP BY {key}
+    """)
+
+def _coded(frame, column, labels):
+    """Replace integer codes with their labels"""
+    frame[column] = np.asarray(labels, dtype=object)[frame[column].astype(np.int64)]
+    return frame
+
+def _daily_state(engine):
+    state = query(engine, f"""
+        SELECT request_day AS "Date", COALESCE(tier, 'Unknown') AS "Xparcel Type", {MEASURES_SQL}
+        FROM shipments WHERE request_day IS NOT NULL GROUP BY 1, 2
+    """)
+    if state.empty:
+        return empty_trend_state()
+    state['Date'] = pd.to_datetime(state['Date']).astype('datetime64[ns]')
+    state = state[['Date', 'Xparcel Type', 'rows', 'sla_n', 'on_time', 'transit_n', 'transit_sum', 'cost_n', 'cost_sum']]
+    return state.sort_values(['Date', 'Xparcel Type'], kind='stable').reset_index(drop=True)
+
+def _zip_index(engine):
+    """ZIP5 index from per-value sums; ZIP values are parsed once each"""
+    groups = query(engine, """
+        SELECT zip, COUNT(*) AS "rows", COUNT(sla) AS sla_n, CAST(SUM(miss) AS BIGINT) AS misses,
+               COUNT(transit) AS transit_n, CAST(COALESCE(SUM(transit), 0) AS DOUBLE) AS transit_sum,
+               COUNT(cost) AS cost_n, CAST(COALESCE(SUM(cost), 0) AS DOUBLE) AS cost_sum
+        FROM shipments GROUP BY zip
+    """)
+    return zip_index_frame(zip_index_from_groups(groups['zip'], groups))
+
+def _zone_check(engine, relation, columns):
+    """zone_check over the distinct zone/ZIP/distance combinations, weighted by rows"""
+    keys = [col for col in ('Calculated Zone', 'Distance Miles', 'Destination ZIP',
+                            find_origin_zip_column(pd.DataFrame(columns=columns))) if col in columns]
+    groups = query(engine, f"""
+        SELECT {', '.join(_quote(col) for col in keys)}, COUNT(*) AS _rows
+        FROM {relation} GROUP BY {', '.join(_quote(col) for col in keys)}
+    """)
+    return zone_check(groups[keys], weights=groups['_rows'].to_numpy())
+
+def sql_aggregates(engine, relation, dtypes):
+    """The batch partial aggregates (see compute_partial_aggregates), computed in SQL"""
+    facts = prepare_shipments(engine, relation, dtypes)
+    zones = _zone_check(engine, relation, list(dtypes.index)) if facts['has_zone_column'] else empty_zone_check()
+
+    totals = query(engine, """
+        SELECT COUNT(*) AS "rows",
+               COUNT(transit) AS transit_n, CAST(COALESCE(SUM(transit), 0) AS DOUBLE) AS transit_sum,
+               COUNT(cost) AS cost_n, CAST(COALESCE(SUM(cost), 0) AS DOUBLE) AS cost_sum,
+               CAST(COALESCE(SUM(miss), 0) AS BIGINT) AS misses,
+               CAST(COALESCE(SUM(CASE WHEN miss = 1 AND delay > 0 THEN 1 ELSE 0 END), 0) AS BIGINT) AS delay_n,
+               CAST(COALESCE(SUM(CASE WHEN miss = 1 AND delay > 0 THEN delay END), 0) AS DOUBLE) AS delay_sum,
+               CAST(COALESCE(SUM(overservice), 0) AS BIGINT) AS overservice,
+               CAST(COALESCE(SUM(friday), 0) AS BIGINT) AS friday
+        FROM shipments
+    """)
+    totals['has_carrier'] = int(facts['schema']['carrier'] is not None)
+    totals['has_transit'] = int('Days In Transit' in dtypes.index)
+    totals['has_cost'] = int('Cost' in dtypes.index)
+    totals['zone_checked'] = zones['checked']
+    totals['zone_mismatches'] = zones['mismatches']
+
+    weekday = _group_stats(engine, 'weekday', 'Day_of_Week')
+    weight = _group_stats(engine, 'weight_bucket', 'Weight_Bucket')
+    return {
+        'totals': totals,
+        'tier': _group_stats(engine, 'tier', 'Xparcel Type'),
+        'tier_transit': query(engine, """
+            SELECT tier AS "Xparcel Type", transit AS "Days In Transit", COUNT(*) AS n
+            FROM shipments WHERE tier IS NOT NULL AND transit IS NOT NULL GROUP BY 1, 2
+        """),
+        'zone': _group_stats(engine, 'zone', 'Zone'),
+        'zone_cost': _group_stats(engine, 'calculated_zone', 'Calculated Zone'),
+        'state': _group_stats(engine, 'state', 'State'),
+        'routing_state': _group_stats(engine, 'destination_state', 'Destination State'),
+        'weekday': _coded(weekday, 'Day_of_Week', DAY_ORDER),
+        'weight': _coded(weight, 'Weight_Bucket', WEIGHT_LABELS),
+        'carrier': (
+            _group_stats(engine, 'carrier', 'Carrier') if facts['schema']['carrier']
+            else pd.DataFrame(columns=['Carrier'] + GROUP_MEASURES)
+        ),
+        'daily': _daily_state(engine) if facts['has_request_dates'] else empty_trend_state(),
+        'zip_index': _zip_index(engine)
+    }
+
+def sql_partial_aggregates(sources, backend=None, temp_directory=None):
+    """Merged aggregates for cleaned frames and/or cached Parquet paths
+
+    Sources sharing a schema are queried together in one connection (DuckDB
+    scans them in parallel); differently shaped sources are queried apart
+    and merged, like batch partials.
+    """
+    groups = {}
+    for source in sources:
+        groups.setdefault(source_signature(source), []).append(source)
+
+    partials = []
+    for group in groups.values():
+        engine = connect(backend, temp_directory)
+        try:
+            dtypes = open_sources(engine, group)
+            partials.append(sql_aggregates(engine, 'source', dtypes))
+        finally:
+            engine['conn'].close()
+    if len(partials) == 1:
+        return partials[0]
+    return combine_partial_aggregates(partials)
+
+def sql_analysis(sources, backend=None, temp_directory=None):
+    """All dashboard sections for the given sources, computed by the SQL backend"""
+    return results_from_aggregates(sql_partial_aggregates(sources, backend, temp_directory))
+
+def iter_sql_sections(raw_df, sections=None):
+    """The 'sql' analysis engine: sql_analysis over one frame, yielded in SECTION_ORDER"""
+    results = sql_analysis([raw_df])
+    for section in plan_sections(sections)['sections']:
+        yield section, results[section]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the bitmap filter index
+Checks AND/OR selections and counts against pandas masks, filtered analysis and zone metrics
+"""
+
+import sys
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from bitmap_index import bitmap_count, bitmap_rows, build_bitmap_index, select_bitmap, value_counts
+from dashboard_imports import analyze_comprehensive_performance_enhanced, calculate_zone_metrics, generate_demo_data
+from shipment_dataset import ShipmentDataset
+
+def sample_shipments():
+    return pd.DataFrame({
+        'Carrier': ['UPS', 'FedEx', 'UPS', 'USPS', 'FedEx', 'UPS', None, 'UPS', 'USPS'],
+        'Xparcel Type': ['Ground', 'Expedited', 'Ground', 'Priority', 'Ground', 'Expedited', 'Ground', 'Ground', 'Ground'],
+        'Destination State': ['CA', 'TX', 'TX', 'CA', 'NY', 'CA', 'CA', 'FL', 'TX'],
+        'Calculated Zone': ['2', '5', '8', '2', '5', '8', '3', '2', '5'],
+        'SLA Status': ['On-Time', 'SLA Miss', 'On-Time', 'On-Time', 'SLA Miss', 'On-Time', 'On-Time', 'SLA Miss', 'On-Time'],
+        'Days In Transit': [3, 7, 4, 2, 9, 3, 5, 10, np.nan]
+    })
+
+def test_selections_match_masks():
+    """Values of one dimension are ORed, dimensions are ANDed"""
+    df = sample_shipments()
+    index = build_bitmap_index(df)
+    cases = [
+        ({'carrier': 'UPS'}, df['Carrier'] == 'UPS'),
+        ({'carrier': ['UPS', 'FedEx'], 'state': 'CA'}, df['Carrier'].isin(['UPS', 'FedEx']) & (df['Destination State'] == 'CA')),
+        ({'tier': 'Ground', 'zone': ['2', '5'], 'sla': 'On-Time'},
+         (df['Xparcel Type'] == 'Ground') & df['Calculated Zone'].isin(['2', '5']) & (df['SLA Status'] == 'On-Time')),
+        ({'carrier': 'DHL'}, pd.Series(False, index=df.index)),
+        ({}, pd.Series(True, index=df.index))
+    ]
+    for filters, mask in cases:
+        bitmap = select_bitmap(index, filters)
+        assert bitmap_count(bitmap) == mask.sum()
+        assert bitmap_rows(index, bitmap).tolist() == np.flatnonzero(mask).tolist()
+
+    # Missing carriers get no bit; counts within a selection
+    assert value_counts(index, 'carrier') == {'UPS': 4, 'FedEx': 2, 'USPS': 2}
+    assert value_counts(index, 'carrier', select_bitmap(index, {'state': 'TX'})) == {'UPS': 1, 'FedEx': 1, 'USPS': 1}
+    try:
+        select_bitmap(index, {'weight': '>32 oz'})
+        assert False, "unknown dimension should raise"
+    except ValueError:
+        pass
+
+def test_select_reuses_derived_fields():
+    data = ShipmentDataset(sample_shipments())
+    delay = data.delay
+    subset = data.select({'carrier': 'UPS', 'tier': 'Ground'})
+    assert subset.df.index.tolist() == [0, 2, 7]
+    assert subset._derived['delay'].tolist() == delay[[0, 2, 7]].tolist()
+    assert subset.is_miss.tolist() == [False, False, True]
+
+    # The filtered analysis runs on the selected dataset: weight buckets are not derived again
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    data = ShipmentDataset(raw_df)
+    data.weight_buckets
+    expected = analyze_comprehensive_performance_enhanced(raw_df[raw_df['Carrier'] == 'UPS'])
+    with mock.patch.object(ShipmentDataset, 'numeric', side_effect=AssertionError("derived again")) as numeric:
+        results = analyze_comprehensive_performance_enhanced(data, sections=['weight_impact'], filters={'carrier': 'UPS'})
+    assert not numeric.called
+    assert results['weight_impact'].equals(expected['weight_impact'])
+
+def test_filtered_analysis_matches_masked_rows():
+    """Filtering through the index gives the same results as analysing the masked frame"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    data = ShipmentDataset(raw_df)
+    for filters, mask in [
+        ({'carrier': ['UPS']}, raw_df['Carrier'] == 'UPS'),
+        ({'state': ['CA', 'TX'], 'tier': 'Ground'}, raw_df['Destination State'].isin(['CA', 'TX']) & (raw_df['Xparcel Type'] == 'Ground'))
+    ]:
+        expected = analyze_comprehensive_performance_enhanced(raw_df[mask])
+        results = analyze_comprehensive_performance_enhanced(data, filters=filters)
+        assert list(results) == list(expected)
+        assert results['executive_summary'] == expected['executive_summary']
+        for section in ['tier_performance', 'regional_performance', 'carrier_performance', 'day_of_week']:
+            assert results[section].equals(expected[section]), section
+
+    empty = analyze_comprehensive_performance_enhanced(raw_df, filters={'carrier': 'Nobody'})
+    assert empty['exception_summary']['total_exceptions'] == 0
+    assert empty['tier_performance']['Shipments'].sum() == 0
+
+def test_zone_metrics_from_bitmaps():
+    df = sample_shipments()
+    metrics = calculate_zone_metrics(df)
+    assert sorted(metrics) == ['2', '3', '5', '8']
+    for zone, entry in metrics.items():
+        rows = df[df['Calculated Zone'] == zone]
+        assert entry['volume'] == len(rows)
+        assert np.isclose(entry['avg_transit'], rows['Days In Transit'].mean())
+    assert calculate_zone_metrics(df.drop(columns='Calculated Zone')) == {}
+
+if __name__ == "__main__":
+    print("🧪 Testing bitmap filter index...")
+    failed = False
+    for test in (test_selections_match_masks, test_select_reuses_derived_fields,
+                 test_filtered_analysis_matches_masked_rows, test_zone_metrics_from_bitmaps):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for business-day transit times
+Checks the holiday rules, calendar and business day counts per carrier, and the vectorized SLA classification in both mappers
+"""
+
+import contextlib
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+from business_days import classify_sla, holiday_dates, tier_sla_days, transit_days
+from enhanced_column_mapper import enhanced_clean_and_rename_columns
+from firstmile_column_mapper import clean_and_rename_columns_enhanced as clean_firstmile
+
+def test_holiday_rules():
+    """Nth/last-weekday rules, weekend-observed shifts and the carrier calendars"""
+    federal = set(holiday_dates('federal', 2021, 2022).astype(str))
+    assert {'2021-01-18', '2021-05-31', '2021-11-25', '2022-09-05'} <= federal
+    # July 4 2021 was a Sunday, Christmas 2021 and New Year's Day 2022 Saturdays
+    assert {'2021-07-05', '2021-12-24', '2021-12-31'} <= federal and '2021-07-04' not in federal
+    assert '2021-06-18' in federal and '2020-06-19' not in set(holiday_dates('federal', 2020, 2020).astype(str))
+    parcel = holiday_dates('parcel', 2024, 2024).astype(str)
+    assert list(parcel) == ['2024-01-01', '2024-05-27', '2024-07-04', '2024-09-02', '2024-11-28', '2024-12-25']
+    try:
+        holiday_dates('lunar')
+        assert False, "unknown calendar accepted"
+    except ValueError as e:
+        assert 'lunar' in str(e)
+
+def test_transit_days():
+    """Weekends, carrier holidays and weekmasks; compact dtypes and NaN for missing dates"""
+    request = pd.Series(['2024-11-27', '2024-10-11', '2024-10-11', '2024-03-01', None])
+    delivery = pd.Series(['2024-12-02', '2024-10-15', '2024-10-15', '2024-03-04', '2024-03-05'])
+    carriers = ['UPS Ground', 'USPS', 'FedEx', None, 'UPS']
+    calendar_days, business_days = transit_days(request, delivery, carriers=carriers)
+    assert calendar_days.dtype == business_days.dtype == np.float32
+    # Wed before Thanksgiving -> Monday: Wed and Fri count. Columbus Day only closes USPS
+    np.testing.assert_array_equal(calendar_days, [5, 4, 4, 3, np.nan])
+    np.testing.assert_array_equal(business_days, [2, 1, 2, 1, np.nan])
+
+    calendar_days, business_days = transit_days(request[:4], delivery[:4], weekmask='saturday')
+    assert business_days.dtype == np.int16
+    np.testing.assert_array_equal(business_days, [3, 2, 2, 2])
+
+    # Millions of rows in one call, per-carrier calendars included
+    n = 2_000_000
+    rng = np.random.default_rng(3)
+    request = pd.Series(pd.Timestamp('2023-01-02') + pd.to_timedelta(rng.integers(0, 700, n), unit='D'))
+    delivery = request + pd.to_timedelta(rng.integers(0, 10, n), unit='D')
+    carriers = pd.Series(rng.choice(['UPS', 'USPS', 'OnTrac'], n))
+    calendar_days, business_days = transit_days(request, delivery, carriers=carriers)
+    assert calendar_days.dtype == np.int16 and (business_days <= calendar_days).all()
+    sample = rng.choice(n, 200, replace=False)
+    for row in sample:
+        calendar = 'federal' if carriers[row] == 'USPS' else 'parcel'
+        expected = np.busday_count(request[row].date(), delivery[row].date(), holidays=holiday_dates(calendar, 2023, 2025))
+        assert business_days[row] == expected
+
+def test_sla_classification():
+    """classify_sla, and both mappers classify on business days whenever both dates are present"""
+    sla_days = tier_sla_days(pd.Series(['Priority', None, 'Ground']), lambda tier: {'Priority': 3}.get(tier, 8))
+    np.testing.assert_array_equal(sla_days, [3, 8, 8])
+    assert list(classify_sla([3, np.nan, 9], sla_days)) == ['On-Time', 'Unknown', 'SLA Miss']
+
+    # Friday -> Thursday over Labor Day: 6 calendar days, 3 business days
+    raw_df = pd.DataFrame({
+        'Tracking Number': ['A', 'B', 'C', 'D'],
+        'Xparcel Type': ['Priority', 'Priority', None, 'Other'],
+        'Request Date': ['2024-08-30', '2024-08-26', '2024-08-30', '2024-08-26'],
+        'Delivery Date': ['2024-09-05', '2024-09-05', '2024-09-05', '2024-09-30'],
+        'Carrier': ['UPS', 'UPS', 'UPS', 'UPS']
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        firstmile = clean_firstmile(raw_df.copy())
+        enhanced = enhanced_clean_and_rename_columns(raw_df.copy())
+    assert list(firstmile['Days In Transit']) == [6, 10, 6, 35]
+    assert list(firstmile['Business Days In Transit']) == [3, 7, 3, 24]
+    assert list(firstmile['SLA Status']) == ['On-Time', 'SLA Miss', 'On-Time', 'SLA Miss']
+    assert list(enhanced['Business Days In Transit']) == [3, 7, 3, 24]
+    assert list(enhanced['SLA Status']) == ['On-Time', 'SLA Miss', 'Unknown', 'On-Time']
+
+    # An export with its own (calendar) Days In Transit keeps it, but is still classified on business days
+    with contextlib.redirect_stdout(io.StringIO()):
+        firstmile = clean_firstmile(raw_df.assign(**{'Days In Transit': [6, 10, 6, 35]}))
+    assert list(firstmile['Days In Transit']) == [6, 10, 6, 35]
+    assert list(firstmile['Business Days In Transit']) == [3, 7, 3, 24]
+    assert list(firstmile['SLA Status']) == ['On-Time', 'SLA Miss', 'On-Time', 'SLA Miss']
+
+def test_delay_in_business_days():
+    """Every engine measures the exception delay in business days when the mappers derived them"""
+    from analysis_engines import available_engines, get_engine
+    from shipment_dataset import ShipmentDataset
+
+    raw_df = pd.DataFrame({
+        'Tracking Number': ['A', 'B', 'C'],
+        'Xparcel Type': ['Priority', 'Priority', 'Ground'],
+        'Request Date': ['2024-08-26', '2024-08-30', '2024-08-26'],
+        'Delivery Date': ['2024-09-05', '2024-09-05', '2024-09-30'],
+        'Carrier': ['UPS', 'UPS', 'UPS'],
+        'Days In Transit': [10, 6, 35]
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = clean_firstmile(raw_df)
+    # Business days 7 and 24 against SLAs of 3 and 8: delays of 4 and 16 (not 7 and 27)
+    np.testing.assert_array_equal(ShipmentDataset(df).delay, [4, 0, 16])
+    for engine in available_engines():
+        results = dict(get_engine(engine)(df, ['exception_summary']))
+        assert results['exception_summary']['avg_delay'] == 10.0, engine
+
+if __name__ == "__main__":
+    print("🧪 Testing business-day transit times...")
+    failed = False
+    for test in (test_holiday_rules, test_transit_days, test_sla_classification, test_delay_in_business_days):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
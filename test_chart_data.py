@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for server-side chart data preparation
+Checks the point budget, LTTB endpoints and the figure cache
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+import chart_data
+from chart_data import OTHER_LABEL, cached_figure, lttb_indices, prepare_chart_frame
+
+def test_downsampling_respects_budget():
+    """Numeric, datetime and categorical axes all shrink to the point budget"""
+    x = np.arange(20000)
+    y = np.sin(x / 500.0)
+    idx = lttb_indices(x, y, 300)
+    assert len(idx) == 300 and idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+    daily = pd.DataFrame({'Date': pd.date_range('2024-01-01', periods=5000, freq='h'), 'Volume': x[:5000]})
+    assert len(prepare_chart_frame(daily, 'Date', 'Volume', max_points=200)) == 200
+    assert len(prepare_chart_frame(daily, 'Date', 'Volume', max_points=200, how='bucket')) == 200
+
+    zips = pd.DataFrame({'ZIP': [f'{i:05d}' for i in range(1000)], 'Shipments': np.ones(1000, dtype=int)})
+    top = prepare_chart_frame(zips, 'ZIP', 'Shipments', max_points=50)
+    assert len(top) == 50
+    assert top['ZIP'].iloc[-1] == OTHER_LABEL
+    assert top['Shipments'].sum() == 1000
+
+    small = pd.DataFrame({'Zone': [1, 2, 3], 'Shipments': [5, 6, 7]})
+    assert prepare_chart_frame(small, 'Zone', 'Shipments') is small
+
+def test_figure_cache():
+    """A figure is built once per key"""
+    chart_data._figure_cache.clear()
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {'data': [{'type': 'bar', 'x': [1, 2], 'y': [3, 4]}], 'layout': {}}
+
+    first = cached_figure(('test', 'abc'), build)
+    second = cached_figure(('test', 'abc'), build)
+    assert first == second
+    assert len(calls) == 1
+
+if __name__ == "__main__":
+    print("🧪 Testing chart data preparation...")
+    failed = False
+    for test in (test_downsampling_respects_budget, test_figure_cache):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the headless CLI runner
+Runs the full pipeline on demo exports and checks reports are written
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from dashboard_imports import generate_demo_data
+import transitiq_cli
+
+def test_cli_writes_reports():
+    """CLI exports every input and records per-file timings"""
+    raw_df, _ = generate_demo_data("Minimal Dataset")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(2):
+            raw_df.to_csv(os.path.join(tmp, f'customer_{i}.csv'), index=False)
+        output_dir = os.path.join(tmp, 'reports')
+
+        exit_code = transitiq_cli.main([tmp, '-o', output_dir, '-w', '2', '-f', 'xlsx', 'csv'])
+        assert exit_code == 0
+
+        for i in range(2):
+            assert os.path.exists(os.path.join(output_dir, f'customer_{i}_report.xlsx'))
+            assert os.path.exists(os.path.join(output_dir, f'customer_{i}_summary.csv'))
+
+        with open(os.path.join(output_dir, 'run_summary.json'), encoding='utf-8') as handle:
+            summary = json.load(handle)
+        assert summary['succeeded'] == 2
+        assert set(summary['records'][0]['timings']) == {'read', 'clean', 'analyze', 'export'}
+        # The execution plan is recorded with each file
+        assert summary['records'][0]['plan']['reader'] == 'csv'
+        assert summary['records'][0]['plan']['engine'] == 'pandas'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Same file name in two folders: both reports are kept
+        for month in ('jan', 'feb'):
+            os.makedirs(os.path.join(tmp, month))
+            raw_df.to_csv(os.path.join(tmp, month, 'report.csv'), index=False)
+        output_dir = os.path.join(tmp, 'reports')
+        inputs = [os.path.join(tmp, month, 'report.csv') for month in ('jan', 'feb')]
+        assert transitiq_cli.main(inputs + ['-o', output_dir, '-w', '1', '-f', 'csv']) == 0
+        assert sorted(os.listdir(output_dir)) == ['feb_report_summary.csv', 'jan_report_summary.csv', 'run_summary.json']
+
+        # A combined run whose inputs all fail is a failed run
+        broken = os.path.join(tmp, 'broken.xlsx')
+        with open(broken, 'w', encoding='utf-8') as handle:
+            handle.write('not a workbook')
+        assert transitiq_cli.main([broken, '-o', output_dir, '--combine', '-f', 'csv']) == 1
+        with open(os.path.join(output_dir, 'run_summary.json'), encoding='utf-8') as handle:
+            summary = json.load(handle)
+        assert summary['failed'] == 1 and summary['succeeded'] == 0
+
+    # Checked in a fresh interpreter since other test scripts import the dashboard
+    check = "import sys, transitiq_cli; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', check], cwd=os.path.dirname(os.path.abspath(__file__))).returncode == 0
+    print("✅ CLI wrote all reports without importing Streamlit")
+
+if __name__ == "__main__":
+    try:
+        test_cli_writes_reports()
+    except AssertionError as e:
+        print(f"❌ CLI test failed: {e}")
+        sys.exit(1)
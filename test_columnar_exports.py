@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for Parquet / Arrow IPC exports
+Round-trips the raw data and section tables through both formats
+"""
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from dashboard_imports import generate_demo_data
+from report_exports import PYARROW_AVAILABLE, write_columnar_exports
+
+def test_columnar_round_trip():
+    """Chunked Parquet and Arrow files read back to the same data"""
+    if not PYARROW_AVAILABLE:
+        print("⚠️  pyarrow not installed, skipping columnar export test")
+        return
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    raw_df, results = generate_demo_data("Complete Dataset")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_paths = write_columnar_exports(raw_df, results, tmp, 'demo', 'parquet',
+                                               compression_level=3, chunk_rows=300)
+        arrow_paths = write_columnar_exports(raw_df, results, tmp, 'demo', 'arrow', chunk_rows=300)
+        assert len(parquet_paths) == len(arrow_paths) > 12
+
+        raw_path = os.path.join(tmp, 'demo_raw.parquet')
+        metadata = pq.ParquetFile(raw_path).metadata
+        assert metadata.num_row_groups == 4
+        assert metadata.row_group(0).column(0).compression == 'ZSTD'
+
+        table = pq.read_table(raw_path)
+        assert str(table.schema.field('Xparcel Type').type).startswith('dictionary')
+
+        for restored in (table.to_pandas(),
+                         pa_ipc.open_stream(os.path.join(tmp, 'demo_raw.arrows')).read_all().to_pandas()):
+            assert len(restored) == len(raw_df)
+            assert list(restored['Xparcel Type'].astype(str)) == list(raw_df['Xparcel Type'])
+            assert (restored['Cost'] == raw_df['Cost']).all()
+
+        tier = pq.read_table(os.path.join(tmp, 'demo_tier_performance.parquet')).to_pandas()
+        pd.testing.assert_frame_equal(tier.astype({'Xparcel Type': str}),
+                                      results['tier_performance'].reset_index(drop=True), check_dtype=False)
+    print("✅ Parquet and Arrow exports round-trip")
+
+if __name__ == "__main__":
+    try:
+        test_columnar_round_trip()
+    except AssertionError as e:
+        print(f"❌ Columnar export test failed: {e}")
+        sys.exit(1)
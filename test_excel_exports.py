@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming Excel report
+Splits the raw data across sheets at the row limit and keeps every row
+"""
+
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import openpyxl
+import pandas as pd
+
+import report_exports
+from dashboard_imports import generate_demo_data
+from report_exports import write_excel_report
+
+def test_streaming_report_splits_raw_data():
+    """A small EXCEL_MAX_ROWS gives Raw Data, Raw Data 2, ... holding every row once"""
+    raw_df, results = generate_demo_data("Complete Dataset")
+    raw_df = raw_df.head(250)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'report.xlsx')
+        # 100 rows per sheet, header included: 99 data rows each
+        with mock.patch.object(report_exports, 'EXCEL_MAX_ROWS', 100):
+            write_excel_report(raw_df, results, path, streaming=True)
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            raw_sheets = ['Raw Data', 'Raw Data 2', 'Raw Data 3']
+            sections = [name for section, name in report_exports.EXCEL_SECTION_SHEETS.items()
+                        if section in results and not results[section].empty]
+            assert workbook.sheetnames == raw_sheets + sections
+
+            rows = {name: list(workbook[name].iter_rows(values_only=True)) for name in raw_sheets}
+            assert [len(rows[name]) - 1 for name in raw_sheets] == [99, 99, 52]
+            for name in raw_sheets:
+                assert list(rows[name][0]) == [str(col) for col in raw_df.columns]
+            tracking = [row[raw_df.columns.get_loc('Tracking Number')]
+                        for name in raw_sheets for row in rows[name][1:]]
+            assert tracking == list(raw_df['Tracking Number'])
+
+            tier = pd.DataFrame(list(workbook['Tier Performance'].iter_rows(values_only=True)))
+            assert len(tier) - 1 == len(results['tier_performance'])
+        finally:
+            workbook.close()
+    print("✅ Streaming Excel report splits raw data across sheets")
+
+if __name__ == "__main__":
+    try:
+        test_streaming_report_splits_raw_data()
+    except AssertionError as e:
+        print(f"❌ Excel export test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive execution planner
+Checks the plan decisions and that chunked/streamed reads clean to the same frame as a whole read
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmark_pipeline import synthetic_export
+from dashboard_imports import analyze_comprehensive_performance_enhanced
+from execution_planner import (MIN_CHUNK_ROWS, POLARS_MIN_ROWS, choose_engine, describe_plan, load_shipments,
+                               plan_batch, plan_ingestion)
+from polars_engine import POLARS_AVAILABLE
+from test_olap_cube import assert_same_results
+
+def quiet_load(source, plan):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return load_shipments(source, plan)
+
+def test_plan_decisions():
+    """Small files are read whole, tight memory streams them; engine follows the row count"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.csv')
+        synthetic_export(20000).to_csv(path, index=False)
+
+        plan = plan_ingestion(path, memory=8 * 2**30)
+        assert plan['reader'] == 'csv' and plan['chunk_rows'] is None
+        assert plan['columns'] == 12 and abs(plan['estimated_rows'] - 20000) < 1000
+        # ZIPs keep their leading zeros; numeric columns are left to the cleaner
+        assert plan['dtypes']['Dest ZIP'] == 'str' and 'Shipping Cost' not in plan['dtypes']
+
+        tight = plan_ingestion(path, memory=2**20)
+        assert tight['reader'] == 'csv_chunked' and tight['chunk_rows'] == MIN_CHUNK_ROWS
+        assert 'budget' in describe_plan(tight)
+
+        batch = plan_batch([path, path], memory=8 * 2**30)
+        assert batch['engine'] == 'pandas' and batch['files'] == 2
+
+    assert choose_engine(1000)[0] == 'pandas'
+    assert choose_engine(POLARS_MIN_ROWS)[0] == ('polars' if POLARS_AVAILABLE else 'pandas')
+
+def test_chunked_csv_matches_whole_read():
+    """Chunks cleaned one at a time give the whole-file frame, failures and weight unit"""
+    raw_df = synthetic_export(6000)
+    raw_df['Shipping Cost'] = raw_df['Shipping Cost'].map('${:,.2f}'.format)
+    raw_df.loc[::500, 'Shipping Cost'] = 'TBD'
+    raw_df = raw_df.rename(columns={'Package Weight': 'Weight (oz)'})
+    raw_df.loc[::7, 'Dest State'] = 'Québec'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.csv')
+        raw_df.to_csv(path, index=False, encoding='latin-1')
+        plan = plan_ingestion(path)
+        assert plan['encoding'] == 'latin-1'
+        whole, _ = quiet_load(path, plan)
+        chunked, _ = quiet_load(path, {**plan, 'reader': 'csv_chunked', 'chunk_rows': 1000})
+
+    pd.testing.assert_frame_equal(whole, chunked, check_dtype=False)
+    assert chunked.attrs['parse_failures'] == whole.attrs['parse_failures'] == {'Cost': 12}
+    assert chunked.attrs['weight_unit']['unit'] == 'oz'
+    assert_same_results(analyze_comprehensive_performance_enhanced(whole),
+                        analyze_comprehensive_performance_enhanced(chunked))
+
+def test_streamed_xlsx_matches_read_excel():
+    """Read-only XLSX streaming, also from an uploaded-file object"""
+    raw_df = synthetic_export(1500)
+    buffer = io.BytesIO()
+    raw_df.to_excel(buffer, index=False)
+    buffer.name = 'export.xlsx'
+
+    plan = plan_ingestion(buffer)
+    assert plan['format'] == 'xlsx' and plan['reader'] == 'xlsx' and plan['estimated_rows'] == 1500
+    whole, _ = quiet_load(buffer, plan)
+    streamed, _ = quiet_load(buffer, {**plan, 'reader': 'xlsx_streaming', 'chunk_rows': 400})
+    pd.testing.assert_frame_equal(whole, streamed, check_dtype=False)
+
+if __name__ == "__main__":
+    print("🧪 Testing execution planner...")
+    failed = False
+    for test in (test_plan_decisions, test_chunked_csv_matches_whole_read, test_streamed_xlsx_matches_read_excel):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
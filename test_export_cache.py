@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for deferred, cached exports
+Builds exports in the background and checks they are served from disk
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from dashboard_imports import generate_demo_data
+from export_cache import (
+    analysis_fingerprint,
+    evict_expired_exports,
+    export_path,
+    export_status,
+    request_export
+)
+from shipment_dataset import ShipmentDataset
+
+def wait_for_export(fingerprint, kind, cache_dir, timeout=60):
+    deadline = time.time() + timeout
+    while export_status(fingerprint, kind, cache_dir) == 'running' and time.time() < deadline:
+        time.sleep(0.1)
+    return export_status(fingerprint, kind, cache_dir)
+
+def test_exports_are_cached_and_evicted():
+    """Second request reuses the cached file; TTL eviction removes it"""
+    raw_df, results = generate_demo_data("Minimal Dataset")
+    fingerprint = analysis_fingerprint(raw_df, results)
+    assert fingerprint == analysis_fingerprint(raw_df.copy(), results)
+    # A frame hashed once up front (as the dashboard does per upload) gives the same key
+    assert fingerprint == analysis_fingerprint(raw_df, results, ShipmentDataset(raw_df).fingerprint)
+    changed = dict(results, tier_performance=results['tier_performance'].assign(Shipments=0))
+    assert analysis_fingerprint(raw_df, changed) != fingerprint
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for kind in ('xlsx', 'csv'):
+            request_export(fingerprint, kind, raw_df, results, cache_dir=cache_dir)
+            assert wait_for_export(fingerprint, kind, cache_dir) == 'ready'
+
+        path = export_path(fingerprint, 'xlsx', cache_dir)
+        built_at = os.path.getmtime(path)
+        assert request_export(fingerprint, 'xlsx', raw_df, results, cache_dir=cache_dir) == 'ready'
+        assert os.path.getmtime(path) == built_at
+
+        assert evict_expired_exports(ttl_seconds=-1, cache_dir=cache_dir) == 2
+        assert export_status(fingerprint, 'xlsx', cache_dir) == 'missing'
+    print("✅ Exports built once, served from cache and evicted by TTL")
+
+if __name__ == "__main__":
+    try:
+        test_exports_are_cached_and_evicted()
+    except AssertionError as e:
+        print(f"❌ Export cache test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the OLAP cube
+Checks that every section rolled up from the cube matches a direct analysis,
+with and without filters
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import analyze_comprehensive_performance_enhanced, generate_demo_data
+from olap_cube import build_cube, results_from_cube, roll_up, transit_counts, transit_std
+from zip_index import zip_index_from_frame, zip_lookup
+
+def rounded(value):
+    """Dict results with floats rounded, for comparing sums taken in a different order"""
+    if isinstance(value, dict):
+        return {str(key): rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), 6)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+def assert_same_results(expected, actual, skip=()):
+    assert set(actual) == set(expected)
+    for section, value in expected.items():
+        if section in skip:
+            continue
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(
+                actual[section].reset_index(drop=True), value.reset_index(drop=True),
+                check_dtype=False, check_categorical=False
+            )
+        else:
+            assert rounded(actual[section]) == rounded(value), section
+
+def test_cube_reproduces_every_section():
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    cube = build_cube(raw_df)
+    assert len(cube['codes']['week']) < len(raw_df)
+    assert cube['measures']['rows'].sum() == len(raw_df)
+    assert_same_results(analyze_comprehensive_performance_enhanced(raw_df), results_from_cube(cube))
+
+def test_filtered_roll_ups_match_filtered_rows():
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    # An origin ZIP turns on the zone cross-check
+    raw_df['Origin ZIP'] = '10001'
+    cube = build_cube(raw_df)
+
+    ups = results_from_cube(cube, {'carrier': ['UPS']})
+    assert_same_results(analyze_comprehensive_performance_enhanced(raw_df[raw_df['Carrier'] == 'UPS']), ups)
+    # ZIP sections roll up from the sparse (cell, ZIP) measures
+    assert ups['zone_check']['checked'] > 0 and not ups['exception_hotspots'].empty
+    ups_rows = raw_df[raw_df['Carrier'] == 'UPS']
+    zip_code = ups_rows['Destination ZIP'].iloc[0]
+    stats = zip_lookup(zip_index_from_frame(ups['zip_index']), zip_code)
+    assert stats['Shipments'] == (ups_rows['Destination ZIP'] == zip_code).sum()
+
+    rows = raw_df['Destination State'].isin(['CA', 'TX']) & raw_df['Xparcel Type'].isin(['Ground', 'Priority'])
+    assert_same_results(analyze_comprehensive_performance_enhanced(raw_df[rows]),
+                        results_from_cube(cube, {'state': ['CA', 'TX'], 'tier': ['Ground', 'Priority']}))
+
+    # A date range keeps whole weeks (Monday to Sunday)
+    dates = pd.to_datetime(raw_df['Request Date']).dt.normalize()
+    first = dates.min() + pd.Timedelta(days=14)
+    first -= pd.Timedelta(days=first.dayofweek)
+    rows = (dates >= first) & (dates < first + pd.Timedelta(days=21))
+    assert_same_results(analyze_comprehensive_performance_enhanced(raw_df[rows]),
+                        results_from_cube(cube, {'week': (first, first + pd.Timedelta(days=20))}))
+
+    assert results_from_cube(cube, {'carrier': ['Nobody']})['exception_summary']['total_exceptions'] == 0
+
+def test_cube_on_odd_frames():
+    """Missing dimensions, blank values and text dates roll up like a direct analysis"""
+    from test_polars_engine import odd_frames
+    for name, frame in odd_frames().items():
+        cube = build_cube(frame)
+        try:
+            assert_same_results(analyze_comprehensive_performance_enhanced(frame), results_from_cube(cube))
+            if 'Xparcel Type' in frame.columns:
+                tiers = ['Ground', 'Priority']
+                rows = frame[frame['Xparcel Type'].isin(tiers)]
+                assert_same_results(analyze_comprehensive_performance_enhanced(rows),
+                                    results_from_cube(cube, {'tier': tiers}))
+        except AssertionError as e:
+            raise AssertionError(f"{name}: {e}")
+
+def test_roll_up_measures():
+    """Transit histogram and sum of squares give exact percentiles and spread"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    cube = build_cube(raw_df)
+    transit = pd.to_numeric(raw_df['Days In Transit'])
+
+    by_tier = roll_up(cube, ['tier']).set_index('tier')
+    assert by_tier['rows'].to_dict() == raw_df['Xparcel Type'].value_counts().to_dict()
+
+    counts = transit_counts(cube, 'carrier', {'carrier': ['FedEx']})
+    fedex = transit[raw_df['Carrier'] == 'FedEx']
+    assert dict(zip(counts['value'], counts['count'])) == fedex.value_counts().to_dict()
+
+    spread = transit_std(cube, ['carrier']).set_index('carrier')['Transit Std']
+    expected = transit.groupby(raw_df['Carrier']).std()
+    assert np.allclose(spread.sort_index(), expected.sort_index())
+
+if __name__ == "__main__":
+    print("🧪 Testing OLAP cube...")
+    failed = False
+    for test in (test_cube_reproduces_every_section, test_filtered_roll_ups_match_filtered_rows,
+                 test_cube_on_odd_frames, test_roll_up_measures):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the pluggable analysis engines
+Golden-output checks of the Polars engine against the pandas engine, plus engine selection and fallback
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from analysis_engines import available_engines, get_engine, register_engine
+from batch_analysis import load_cleaned_file
+from dashboard_imports import analyze_comprehensive_performance_enhanced, generate_demo_data, iter_analysis_sections
+from polars_engine import POLARS_AVAILABLE
+from test_olap_cube import assert_same_results
+
+def odd_frames():
+    """Blank states, missing tiers/SLAs/costs, text dates, inferred zones and fractional transit days"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    odd = raw_df.copy()
+    odd.loc[::7, 'Destination State'] = 'Unknown'
+    odd.loc[::5, 'Xparcel Type'] = None
+    odd.loc[::11, 'SLA Status'] = None
+    odd.loc[::3, 'Cost'] = np.nan
+    odd['Request Date'] = odd['Request Date'].dt.strftime('%Y-%m-%d')
+    odd.loc[::13, 'Request Date'] = 'not a date'
+    rng = np.random.default_rng(5)
+    return {
+        'odd': odd,
+        'no_zone': raw_df.drop(columns=['Calculated Zone', 'Destination State']).assign(**{'Origin ZIP': '10001'}),
+        'no_carrier': raw_df.drop(columns=['Carrier', 'Cost']),
+        'transit_only': raw_df[['Days In Transit']],
+        'fractional': raw_df.assign(**{'Days In Transit': np.round(rng.gamma(3, 1.4, len(raw_df)), 1)}),
+        'no_misses': raw_df.assign(**{'SLA Status': 'On-Time'})
+    }
+
+def test_polars_matches_pandas():
+    """Every section of the Polars engine equals the pandas engine's"""
+    if not POLARS_AVAILABLE:
+        print("⚠️  polars not installed, skipping Polars engine test")
+        return
+    # Called directly: through analyze_comprehensive_performance_enhanced a failure would fall back to pandas
+    polars_engine = get_engine('polars')
+    frames = {data_type: generate_demo_data(data_type)[0] for data_type in ("Complete Dataset", "Minimal Dataset")}
+    frames.update(odd_frames())
+    for name, frame in frames.items():
+        expected = analyze_comprehensive_performance_enhanced(frame)
+        actual = dict(polars_engine(frame))
+        try:
+            assert_same_results(expected, actual)
+        except AssertionError as e:
+            raise AssertionError(f"{name}: {e}")
+
+def test_polars_on_cleaned_files():
+    """Compact dtypes from the cleaner (integer zones, text dates), sections and filters"""
+    if not POLARS_AVAILABLE:
+        print("⚠️  polars not installed, skipping Polars engine test")
+        return
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        path = os.path.join(tmp, 'month.csv')
+        raw_df.to_csv(path, index=False)
+        cleaned, _ = load_cleaned_file(path, os.path.join(tmp, 'cache'))
+    assert_same_results(analyze_comprehensive_performance_enhanced(cleaned), dict(get_engine('polars')(cleaned)))
+
+    filters = {'carrier': ['UPS'], 'state': ['CA', 'TX']}
+    assert_same_results(analyze_comprehensive_performance_enhanced(raw_df, filters=filters),
+                        analyze_comprehensive_performance_enhanced(raw_df, filters=filters, engine='polars'))
+
+    sections = ['exception_hotspots', 'day_of_week']
+    streamed = list(iter_analysis_sections(raw_df, sections, engine='polars'))
+    expected = list(iter_analysis_sections(raw_df, sections))
+    assert [section for section, _ in streamed] == [section for section, _ in expected]
+    assert_same_results(dict(expected), dict(streamed))
+
+def test_engine_selection_and_fallback():
+    """Unknown names are rejected, custom engines plug in, and a failing engine falls back to pandas"""
+    assert available_engines()[:1] == ['pandas'] and 'sql' in available_engines()
+    try:
+        get_engine('spark')
+        assert False, "unknown engine accepted"
+    except ValueError as e:
+        assert 'spark' in str(e)
+
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    expected = analyze_comprehensive_performance_enhanced(raw_df)
+
+    def half_engine(df, sections=None):
+        yield 'executive_summary', {'total_shipments': -1}
+        raise RuntimeError("engine gave up")
+
+    register_engine('half', half_engine)
+    assert 'half' in available_engines()
+    results = analyze_comprehensive_performance_enhanced(raw_df, engine='half')
+    assert results['executive_summary'] == {'total_shipments': -1}
+    assert_same_results(expected, results, skip=['executive_summary'])
+
+    # The SQL backend behind the same interface
+    assert_same_results(expected, analyze_comprehensive_performance_enhanced(raw_df, engine='sql'))
+
+if __name__ == "__main__":
+    print("🧪 Testing analysis engines...")
+    failed = False
+    for test in (test_polars_matches_pandas, test_polars_on_cleaned_files, test_engine_selection_and_fallback):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
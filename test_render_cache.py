@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the render cache
+Unchanged sections must reuse their figure and table CSS across reruns
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+import chart_data
+import render_cache
+from chart_data import cached_figure
+from render_cache import PERFORMANCE_CSS, cached_css, performance_css, render_key, style_column
+
+def test_render_key_tracks_content_and_theme():
+    """Equal content gives equal keys; new data or another theme does not"""
+    tier = pd.DataFrame({'Service': ['Priority', 'Ground'], 'On-Time %': [96.0, 88.5]})
+    assert render_key('tier', tier) == render_key('tier', tier.copy())
+    assert render_key('tier', tier, 'light') != render_key('tier', tier, 'dark')
+
+    changed = tier.copy()
+    changed.loc[1, 'On-Time %'] = 91.0
+    assert render_key('tier', tier) != render_key('tier', changed)
+
+def test_unchanged_sections_skip_construction():
+    """A rerun with recomputed but identical results builds nothing"""
+    chart_data._figure_cache.clear()
+    render_cache.clear_render_cache()
+    builds = []
+
+    def build_figure():
+        builds.append('figure')
+        return {'data': [{'type': 'bar', 'x': [1, 2], 'y': [3, 4]}], 'layout': {}}
+
+    def build_css(df):
+        builds.append('css')
+        return ['color: red;'] * len(df)
+
+    for _ in range(3):
+        # Each rerun recomputes the analysis, so the frames are new objects
+        zone = pd.DataFrame({'Zone': [1, 2], 'Shipments': [3, 4]})
+        cached_figure(render_key('zone_distribution', zone), build_figure)
+        cached_css(render_key('tier_performance', zone), lambda: build_css(zone))
+
+    assert builds == ['figure', 'css']
+
+def test_each_rerun_gets_a_fresh_styler():
+    """Cached CSS is read-only and styles a new Styler every time"""
+    render_cache.clear_render_cache()
+    tier = pd.DataFrame({'Service': ['Priority', 'Ground'], 'On-Time %': [96.0, 88.5]})
+    key = render_key('tier', tier)
+    css = cached_css(key, lambda: ['color: green;', 'color: red;'])
+    assert not css.flags.writeable and cached_css(key, lambda: []) is css
+
+    first, second = style_column(tier, 'On-Time %', css), style_column(tier, 'On-Time %', css)
+    assert first is not second
+    first.set_uuid('rendered')
+    html = second.to_html()
+    assert 'rendered' not in html and 'color: green;' in html and 'color: red;' in html
+    # Only the styled column gets the CSS
+    first._compute()
+    assert sorted(first.ctx) == [(0, 1), (1, 1)]
+
+def test_performance_css_thresholds():
+    """>= 95 good, >= 90 warning, else poor; NaN scores are poor, unreadable text is unstyled"""
+    good, warning, poor = PERFORMANCE_CSS['good'], PERFORMANCE_CSS['warning'], PERFORMANCE_CSS['poor']
+    scores = pd.Series([95.0, 94.9, 90.0, 89.99, 0.0, np.nan])
+    assert list(performance_css(scores)) == [good, warning, warning, poor, poor, poor]
+    assert list(performance_css(pd.Series([100, 91, 12]))) == [good, warning, poor]
+    assert list(performance_css(pd.Series([96.0, None], dtype='Float64'))) == [good, poor]
+
+    text = pd.Series(['96.5%', ' 92 % ', '89', 'n/a', None, ''])
+    assert list(performance_css(text)) == [good, warning, poor, '', '', '']
+    assert list(performance_css(pd.Series([], dtype=float))) == []
+
+if __name__ == "__main__":
+    print("🧪 Testing render cache...")
+    failed = False
+    for test in (test_render_key_tracks_content_and_theme, test_unchanged_sections_skip_construction,
+                 test_each_rerun_gets_a_fresh_styler, test_performance_css_thresholds):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the stratified-sample preview
+Checks stratum proportions, the Wilson interval, stratum weights and how close the preview is to the exact results
+"""
+
+import sys
+import threading
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import batch_analysis
+import sampling
+from background_jobs import BACKGROUND_WORKERS, cancel_job, job_status, submit_job
+from dashboard_imports import analyze_comprehensive_performance_enhanced, generate_demo_data
+from sampling import iter_preview_sections, stratified_sample, wants_preview, wilson_interval
+
+def large_shipments(n=60000, seed=3):
+    """Demo rows resampled to n, with a 10% SLA miss rate"""
+    df, _ = generate_demo_data("Complete Dataset")
+    rng = np.random.default_rng(seed)
+    large = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    large['SLA Status'] = np.where(rng.random(n) < 0.1, 'SLA Miss', 'On-Time')
+    return large
+
+def test_stratified_sample_keeps_proportions():
+    """Each tier/zone cell keeps its share, and rare cells are not dropped"""
+    df = pd.DataFrame({
+        'Xparcel Type': ['Ground'] * 7000 + ['Expedited'] * 2990 + ['Priority'] * 10,
+        'Calculated Zone': (['2', '5'] * 5000)[:9990] + ['8'] * 10,
+        'Days In Transit': np.arange(10000)
+    })
+    sample = stratified_sample(df, size=1000)
+    assert len(sample) == 1000
+    assert sample.index.is_monotonic_increasing
+    assert sample['Days In Transit'].is_unique
+
+    population = df.groupby(['Xparcel Type', 'Calculated Zone']).size()
+    taken = sample.groupby(['Xparcel Type', 'Calculated Zone']).size()
+    assert set(taken.index) == set(population.index)
+    assert (abs(taken - population / 10) <= 1).all()
+
+    # Small frames are used whole
+    assert stratified_sample(df, size=20000) is df
+    assert not wants_preview(df) and wants_preview(df, threshold=9999)
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert np.isclose(low, 0.4038, atol=1e-4) and np.isclose(high, 0.5962, atol=1e-4)
+    # Stays inside [0, 1] at the edges, where a normal interval would not
+    low, high = wilson_interval([0, 10], [10, 10])
+    assert low[0] == 0 and 0 < high[0] < 0.35
+    assert 0.65 < low[1] and np.isclose(high[1], 1)
+    low, high = wilson_interval(0, 0)
+    assert np.isnan(low) and np.isnan(high)
+
+def test_preview_close_to_exact():
+    """Scaled counts match the full frame; exact on-time rates fall inside the intervals"""
+    df = large_shipments()
+    preview = dict(iter_preview_sections(df, size=10000))
+    exact = analyze_comprehensive_performance_enhanced(df)
+
+    summary = preview['executive_summary']
+    assert summary['total_shipments'] == len(df) and summary['sample_rows'] == 10000
+    assert abs(summary['on_time_pct'] - exact['executive_summary']['on_time_pct']) <= summary['on_time_ci']
+    assert abs(summary['avg_transit'] - exact['executive_summary']['avg_transit']) <= summary['avg_transit_ci']
+
+    tiers = preview['tier_performance'].set_index('Xparcel Type')
+    exact_tiers = exact['tier_performance'].set_index('Xparcel Type')
+    assert abs(tiers['Shipments'].sum() - len(df)) <= len(tiers)
+    assert ((tiers['On-Time %'] - exact_tiers['On-Time %']).abs() <= tiers['On-Time % ±'] + 0.1).all()
+
+    # Tier and zone are the strata, so their volumes are exact up to rounding
+    zones = preview['zone_distribution'].set_index('Zone')['Shipments']
+    assert (abs(zones - exact['zone_distribution'].set_index('Zone')['Shipments']) <= 6).all()
+    misses = exact['exception_summary']['total_exceptions']
+    assert abs(preview['exception_summary']['total_exceptions'] - misses) < 0.1 * misses
+    assert list(preview) == list(exact)
+
+def test_rare_cells_are_not_scaled_up():
+    """A cell sampled whole counts once, not once per global sampling factor"""
+    df = large_shipments(20000)
+    df['Xparcel Type'] = 'Ground'
+    df.loc[:9, 'Xparcel Type'] = 'Priority'
+    df.loc[:9, 'SLA Status'] = 'SLA Miss'
+    preview = dict(iter_preview_sections(df, size=1000))
+    exact = analyze_comprehensive_performance_enhanced(df)
+
+    tiers = preview['tier_performance'].set_index('Xparcel Type')
+    assert tiers.loc['Priority', 'Shipments'] == 10
+    assert tiers['Shipments'].sum() == len(df)
+    assert preview['service_mix'].set_index('Service')['Shipments'].to_dict() == {'Ground': 19990, 'Priority': 10}
+    # One sampled Priority miss stands for the ten, so misses are not over-counted on average
+    # (one draw of 1,000 rows varies by about 8%)
+    misses = exact['exception_summary']['total_exceptions']
+    draws = [dict(iter_preview_sections(df, ['exception_summary'], size=1000, seed=seed))
+             for seed in range(10)]
+    average = np.mean([draw['exception_summary']['total_exceptions'] for draw in draws])
+    assert abs(average - misses) < 0.05 * misses
+    assert abs(preview['executive_summary']['on_time_pct'] - exact['executive_summary']['on_time_pct']) < 1.5
+
+def test_preview_cost_follows_sample_size():
+    """One weighted aggregation over the sample, however many strata; the summary comes first"""
+    df = large_shipments(30000)
+    # 3 tiers x 200 zones: far more cells than the old one-aggregation-per-cell loop could afford
+    df['Calculated Zone'] = (np.arange(len(df)) % 200).astype(str)
+    calls = []
+    def aggregate(sample, weights=None):
+        calls.append(len(sample))
+        return batch_analysis.compute_partial_aggregates(sample, weights)
+
+    with mock.patch.object(sampling, 'compute_partial_aggregates', side_effect=aggregate):
+        sections = iter_preview_sections(df, size=2000)
+        first, summary = next(sections)
+        assert first == 'executive_summary' and calls == []
+        preview = dict(sections)
+    # Every cell keeps at least one row, so the sample may exceed size by up to one row per cell
+    assert calls == [summary['sample_rows']] and summary['sample_rows'] <= 2000 + 600
+    assert summary['total_shipments'] == len(df)
+    assert preview['tier_performance']['Shipments'].sum() == len(df)
+
+def test_cancel_job():
+    """Replaced jobs are dropped, and one that has not started never runs"""
+    release = threading.Event()
+    ran = []
+    # Keep every worker busy so the next job waits in the queue
+    blockers = [submit_job(f'test-block-{n}', release.wait) for n in range(BACKGROUND_WORKERS)]
+    submit_job('test-queued', lambda: ran.append(True))
+    assert job_status('test-queued') == 'running'
+    cancel_job('test-queued')
+    release.set()
+    for blocker in blockers:
+        blocker.result()
+    assert job_status('test-queued') == 'missing' and ran == []
+    for n in range(BACKGROUND_WORKERS):
+        cancel_job(f'test-block-{n}')
+    assert job_status('test-block-0') == 'missing'
+
+if __name__ == "__main__":
+    print("🧪 Testing sample preview...")
+    failed = False
+    for test in (test_stratified_sample_keeps_proportions, test_wilson_interval, test_preview_close_to_exact,
+                 test_rare_cells_are_not_scaled_up, test_preview_cost_follows_sample_size, test_cancel_job):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
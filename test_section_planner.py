@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the section planner and section-by-section analysis
+Checks toolkit mapping, dependency closure, skipped analyzers and the section stream
+"""
+
+import sys
+from unittest import mock
+
+import dashboard_imports
+from dashboard_imports import (
+    analyze_comprehensive_performance_enhanced,
+    generate_demo_data,
+    generate_empty_analysis_results,
+    iter_analysis_sections
+)
+from section_planner import SECTION_ORDER, plan_sections, sections_for_toolkits
+
+def test_toolkits_map_to_sections():
+    """Core sections are always visible; each toggle adds its own"""
+    everything = sections_for_toolkits()
+    assert set(everything) >= set(SECTION_ORDER)
+
+    core = sections_for_toolkits({toolkit: False for toolkit in
+                                  ['national_select', 'zone_toolkit', 'xparcel_logic',
+                                   'tet', 'cost_optimizer', 'carrier_scoring']})
+    assert 'tier_performance' in core and 'exception_summary' in core
+    assert 'zone_distribution' not in core and 'cost_analysis' not in core
+
+    zones = sections_for_toolkits({'cost_optimizer': False})
+    assert 'zone_check' in zones and 'cost_analysis' not in zones
+
+def test_plan_includes_dependencies():
+    plan = plan_sections(['exception_hotspots'])
+    assert plan['sections'] == ['zip_index', 'exception_hotspots']
+    assert 'day_of_week' in plan['skipped']
+
+    summary = plan_sections(['day_of_week', 'executive_summary', 'exception_summary'])
+    assert summary['sections'] == ['executive_summary', 'exception_summary', 'day_of_week']
+
+    assert plan_sections()['sections'] == SECTION_ORDER
+
+def test_analysis_runs_only_planned_sections():
+    raw_df, full = generate_demo_data("Minimal Dataset")
+    with mock.patch.object(dashboard_imports, 'analyze_day_of_week') as day_of_week, \
+         mock.patch.object(dashboard_imports, 'build_zip_index') as zip_index:
+        results = analyze_comprehensive_performance_enhanced(raw_df, ['tier_performance', 'cost_analysis'])
+    assert not day_of_week.called and not zip_index.called
+    assert sorted(results) == ['cost_analysis', 'tier_performance']
+    assert results['cost_analysis'] == full['cost_analysis']
+    assert results['tier_performance'].equals(full['tier_performance'])
+
+def test_sections_stream_summary_first():
+    """Sections arrive one by one, Executive Summary first, in planner order"""
+    raw_df, _ = generate_demo_data("Minimal Dataset")
+    streamed = list(iter_analysis_sections(raw_df))
+    assert [section for section, _ in streamed] == SECTION_ORDER
+
+    summary = streamed[0][1]
+    assert summary['total_shipments'] == len(raw_df)
+    assert abs(summary['avg_transit'] - raw_df['Days In Transit'].mean()) < 1e-9
+    tiers = dict(streamed)['tier_performance']
+    weighted = (tiers['On-Time %'] * tiers['Shipments']).sum() / tiers['Shipments'].sum()
+    assert abs(summary['on_time_pct'] - weighted) < 1e-9
+
+    results = analyze_comprehensive_performance_enhanced(raw_df)
+    assert list(results) == SECTION_ORDER
+    assert results['day_of_week'].equals(dict(streamed)['day_of_week'])
+
+def test_stream_falls_back_when_a_section_fails():
+    """A failing section is yielded empty on its own; the sections after it are intact"""
+    raw_df, expected = generate_demo_data("Minimal Dataset")
+    with mock.patch.object(dashboard_imports, 'build_zip_index', side_effect=RuntimeError("boom")):
+        streamed = dict(iter_analysis_sections(raw_df))
+    assert set(streamed) == set(expected)
+    assert streamed['zip_index'].empty
+    assert streamed['exception_hotspots'].equals(generate_empty_analysis_results()['exception_hotspots'])
+    for section in ['tier_performance', 'regional_performance', 'day_of_week', 'weight_impact', 'carrier_performance']:
+        assert streamed[section].equals(expected[section]), section
+    assert streamed['routing_optimization'] == expected['routing_optimization']
+
+if __name__ == "__main__":
+    print("🧪 Testing section planner...")
+    failed = False
+    for test in (test_toolkits_map_to_sections, test_plan_includes_dependencies,
+                 test_analysis_runs_only_planned_sections, test_sections_stream_summary_first,
+                 test_stream_falls_back_when_a_section_fails):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the ShipmentDataset abstraction
+Checks schema resolution, the derived-column cache, the fingerprint and the analyzers' inputs
+"""
+
+import sys
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import shipment_dataset
+from dashboard_imports import (
+    analyze_comprehensive_performance_enhanced,
+    analyze_day_of_week,
+    analyze_weight_impact,
+    generate_exception_summary
+)
+from shipment_dataset import ShipmentDataset, resolve_schema
+
+def sample_shipments():
+    return pd.DataFrame({
+        'Xparcel Type': ['Ground', 'Expedited', 'Priority', 'Ground', None],
+        'Days In Transit': [3, 7, 2, 10, 4],
+        'SLA Status': ['On-Time', 'SLA Miss', 'On-Time', 'SLA Miss', 'On-Time'],
+        'Request Date': ['2025-03-03', '2025-03-07', '2025-03-07', 'bad', '2025-03-09'],
+        'Package Weight': [0.2, 0.75, 1.5, 5.0, -1.0],
+        'Dest Zone': [2, 5, 8, 3, 4],
+        'Destination State': ['CA', 'TX', 'NY', 'CA', 'FL'],
+        'Destination ZIP': ['90001', '75001', '10001', '90002', '33101']
+    })
+
+def test_resolve_schema():
+    """Canonical columns by name, the rest by keyword like the analyzers always did"""
+    schema = resolve_schema(sample_shipments())
+    assert schema['tier'] == 'Xparcel Type' and schema['cost'] is None
+    assert schema['zone'] == 'Dest Zone'
+    assert schema['weight'] == 'Package Weight'
+    assert schema['weekday_date'] == 'Request Date'
+    assert schema['state'] == 'Destination State' and schema['zip'] == 'Destination ZIP'
+
+def test_derived_fields():
+    data = ShipmentDataset(sample_shipments())
+    assert data.weekday.tolist()[:3] == ['Monday', 'Friday', 'Friday']
+    assert pd.isna(data.weekday[3])
+    assert data.weekday_codes.tolist() == [0, 4, 4, -1, 6]
+    assert data.weight_buckets.tolist()[:4] == ['1-4 oz', '9-15 oz', '16-32 oz', '>32 oz']
+    assert data.weight_bucket_codes[4] == -1
+    # Unknown tier falls back to the default SLA
+    assert data.sla_days.tolist() == [8, 5, 3, 8, 8]
+    assert data.delay.tolist() == [-5, 2, -1, 2, -4]
+    assert data.is_miss.tolist() == [False, True, False, True, False]
+    # Nothing is written into the frame
+    assert list(data.df.columns) == list(sample_shipments().columns)
+
+def test_derivations_computed_once():
+    """Each derivation runs once per dataset, however many sections use it"""
+    data = ShipmentDataset(sample_shipments())
+    with mock.patch.object(shipment_dataset.pd, 'to_datetime', wraps=pd.to_datetime) as parse:
+        for _ in range(3):
+            data.weekday
+            data.weekday_codes
+            analyze_day_of_week(data)
+    assert parse.call_count == 1
+    assert data.weight_buckets is data.weight_buckets
+    assert data.delay is data.delay
+
+def test_fingerprint():
+    """Equal content gives equal fingerprints; any changed value changes it"""
+    first = ShipmentDataset(sample_shipments()).fingerprint
+    assert first == ShipmentDataset(sample_shipments()).fingerprint
+    changed = sample_shipments()
+    changed.loc[2, 'Days In Transit'] = 3
+    assert ShipmentDataset(changed).fingerprint != first
+
+def test_analyzers_accept_frame_or_dataset():
+    df = sample_shipments()
+    data = ShipmentDataset(df)
+    assert ShipmentDataset.wrap(data) is data
+    pd.testing.assert_frame_equal(analyze_weight_impact(df), analyze_weight_impact(data))
+    assert generate_exception_summary(df) == generate_exception_summary(data)
+    assert generate_exception_summary(data)['avg_delay'] == 2.0
+
+    results = analyze_comprehensive_performance_enhanced(df)
+    dow = results['day_of_week'].set_index('Day_of_Week')
+    assert dow.loc['Friday', 'Volume'] == 2 and dow.loc['Tuesday', 'Volume'] == 0
+    assert np.isclose(results['weight_impact']['Volume'].sum(), 4)
+
+if __name__ == "__main__":
+    print("🧪 Testing shipment dataset...")
+    failed = False
+    for test in (test_resolve_schema, test_derived_fields, test_derivations_computed_once,
+                 test_fingerprint, test_analyzers_accept_frame_or_dataset):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
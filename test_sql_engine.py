@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQL analysis backend
+Checks DuckDB/sqlite results against the pandas analyzers, over frames and the Parquet cache
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from batch_analysis import load_cleaned_file, run_batch_analysis
+from dashboard_imports import analyze_comprehensive_performance_enhanced, generate_demo_data
+from sql_engine import available_backends, sql_analysis
+from test_olap_cube import assert_same_results
+from test_polars_engine import odd_frames
+
+def test_sql_matches_analyzers():
+    """Every backend gives the analyzers' sections on demo data"""
+    assert 'sqlite' in available_backends()
+    for data_type in ("Complete Dataset", "Minimal Dataset"):
+        raw_df, _ = generate_demo_data(data_type)
+        expected = analyze_comprehensive_performance_enhanced(raw_df)
+        for backend in available_backends():
+            assert_same_results(expected, sql_analysis([raw_df], backend=backend))
+
+def test_sql_fills_like_the_analyzers():
+    """Blank states, missing tiers, unreadable dates, inferred zones and missing columns are handled the same way"""
+    for name, frame in odd_frames().items():
+        if name == 'fractional':
+            continue  # Summed in a different order; covered by the Polars parity test
+        expected = analyze_comprehensive_performance_enhanced(frame)
+        for backend in available_backends():
+            try:
+                assert_same_results(expected, sql_analysis([frame], backend=backend))
+            except AssertionError as e:
+                raise AssertionError(f"{name} ({backend}): {e}")
+
+    # Placeholder columns are not averaged into the KPIs
+    transit_only = odd_frames()['transit_only']
+    summary = sql_analysis([transit_only])['executive_summary']
+    assert summary['avg_cost'] == 0.0 and summary['avg_transit'] == transit_only['Days In Transit'].mean()
+
+def test_sql_over_parquet_cache():
+    """Cached cleaned files are queried in place and match the pandas batch engine"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        cache_dir = os.path.join(tmp, 'cache')
+        paths = []
+        parts = [raw_df.iloc[:400], raw_df.iloc[400:], raw_df.iloc[:200].drop(columns=['Carrier'])]
+        for i, part in enumerate(parts):
+            paths.append(os.path.join(tmp, f'month_{i}.csv'))
+            part.to_csv(paths[-1], index=False)
+
+        # Cleaning a CSV gives integer zones and string dates
+        cleaned, _ = load_cleaned_file(paths[0], cache_dir)
+        parquet = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.parquet')]
+        for backend in available_backends():
+            assert_same_results(analyze_comprehensive_performance_enhanced(cleaned),
+                                sql_analysis(parquet, backend=backend))
+
+        pandas_batch = run_batch_analysis(paths, cache_dir=cache_dir)
+        sql_batch = run_batch_analysis(paths, cache_dir=cache_dir, engine='sql')
+    assert not sql_batch['errors']
+    assert [info['rows'] for info in sql_batch['files']] == [400, 600, 200]
+    assert_same_results(pandas_batch['results'], sql_batch['results'])
+
+if __name__ == "__main__":
+    print("🧪 Testing SQL backend...")
+    failed = False
+    for test in (test_sql_matches_analyzers, test_sql_fills_like_the_analyzers, test_sql_over_parquet_cache):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the Request Date trend engine
+Checks bucket totals against a plain groupby and incremental updates
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import generate_demo_data
+from trend_engine import daily_trend_state, trend_table, update_trend_state
+
+def test_trend_buckets_match_groupby():
+    """Weekly volume and on-time % equal a direct groupby over the raw rows"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    state = daily_trend_state(raw_df)
+    weekly = trend_table(state, 'W').set_index('Period')
+
+    dates = pd.to_datetime(raw_df['Request Date'], errors='coerce').dt.normalize()
+    week_end = dates.dt.to_period('W-SUN').dt.end_time.dt.normalize()
+    expected = raw_df.groupby(week_end)
+    assert weekly['Shipments'].sum() == dates.notna().sum()
+    assert (weekly.loc[weekly['Shipments'] > 0, 'Shipments'].to_numpy() == expected.size().to_numpy()).all()
+
+    on_time = expected['SLA Status'].apply(lambda s: round((s == 'On-Time').sum() / s.notna().sum() * 100, 1))
+    assert np.allclose(weekly['On-Time %'].dropna().to_numpy(), on_time.to_numpy())
+
+    monthly_by_tier = trend_table(state, 'M', by_tier=True)
+    assert monthly_by_tier['Shipments'].sum() == weekly['Shipments'].sum()
+
+def test_incremental_update():
+    """Appending new days gives the same state as analyzing everything at once"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    ordered = raw_df.sort_values('Request Date')
+    half = len(ordered) // 2
+
+    state = update_trend_state(daily_trend_state(ordered.iloc[:half]), ordered.iloc[half:])
+    pd.testing.assert_frame_equal(state, daily_trend_state(raw_df))
+
+if __name__ == "__main__":
+    print("🧪 Testing trend engine...")
+    failed = False
+    for test in (test_trend_buckets_match_groupby, test_incremental_update):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for typed numeric parsing
+Checks currency/thousands cleanup, failure counts, compact dtypes and chunked use
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from firstmile_column_mapper import clean_and_rename_columns_enhanced
+from typed_parsing import iter_typed_chunks, parse_numeric, parse_numeric_columns
+
+def test_parse_numeric_text():
+    """Formatted text is parsed instead of becoming NaN; real junk is counted"""
+    values, failures = parse_numeric(pd.Series(['$12.50', '1,234', '(3.00)', ' 7 ', 'n/a', None, '']))
+    assert values.dtype == np.float64
+    assert values.iloc[:4].tolist() == [12.5, 1234.0, -3.0, 7.0]
+    assert values.iloc[4:].isna().all()
+    assert failures == 1
+
+def test_compact_dtypes():
+    """Whole-number fields get the smallest int dtype, or float32 when values are missing"""
+    df = pd.DataFrame({
+        'Days In Transit': [1, 2, 30],
+        'Calculated Zone': ['Zone 4', '5', 'bad'],
+        'Cost': ['$1,000.25', '2', '3'],
+        'Weight': [1.5, 2.0, 3.0]
+    })
+    report = parse_numeric_columns(df)
+    assert df['Days In Transit'].dtype == np.int8
+    assert df['Calculated Zone'].dtype == np.float32
+    assert df['Calculated Zone'].iloc[:2].tolist() == [4.0, 5.0]
+    assert df['Cost'].tolist() == [1000.25, 2.0, 3.0]
+    assert df['Weight'].dtype == np.float32
+    assert report == {'Calculated Zone': 1}
+    assert df.attrs['parse_failures'] == {'Calculated Zone': 1}
+
+def test_chunked_report():
+    """Failure counts accumulate across a stream of chunks"""
+    chunks = [pd.DataFrame({'Cost': ['$1', 'x']}), pd.DataFrame({'Cost': ['y', '2,000']})]
+    report = {}
+    typed = pd.concat(iter_typed_chunks(chunks, report=report), ignore_index=True)
+    assert typed['Cost'].tolist()[::3] == [1.0, 2000.0]
+    assert report == {'Cost': 2}
+
+def test_mapper_uses_typed_parsing():
+    """The column mapper keeps currency values and reports what it could not read"""
+    df = pd.DataFrame({
+        'Shipping Cost': ['$10.50', '$1,015.75', 'TBD'],
+        'Service Level': ['Ground', 'Expedited', 'Priority'],
+        'Transit Days': ['2', '4', '9']
+    })
+    mapped = clean_and_rename_columns_enhanced(df)
+    assert mapped['Cost'].iloc[:2].tolist() == [10.5, 1015.75]
+    assert mapped.attrs['parse_failures'] == {'Cost': 1}
+    # Transit days are numeric before SLA classification
+    assert mapped['SLA Status'].tolist() == ['On-Time', 'On-Time', 'SLA Miss']
+
+if __name__ == "__main__":
+    print("🧪 Testing typed parsing...")
+    failed = False
+    for test in (test_parse_numeric_text, test_compact_dtypes, test_chunked_report, test_mapper_uses_typed_parsing):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
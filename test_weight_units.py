@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for weight unit detection
+Checks header hints, the outlier-robust quantile test and both column mappers
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from enhanced_column_mapper import enhanced_clean_and_rename_columns
+from firstmile_column_mapper import clean_and_rename_columns_enhanced
+from weight_units import detect_weight_unit, normalize_weight, unit_from_header
+
+def test_header_hints():
+    assert unit_from_header('Weight (oz)') == 'oz'
+    assert unit_from_header('weight_lbs') == 'lb'
+    assert unit_from_header('Billed Weight KG') == 'kg'
+    assert unit_from_header('Package Weight') is None
+
+def test_quantile_detection_ignores_outliers():
+    """A pallet in a pound file or a 0.1 in an ounce file does not flip the unit"""
+    rng = np.random.default_rng(1)
+    pounds = np.append(rng.gamma(2, 1, 1000), 5000)
+    ounces = np.append(rng.integers(2, 40, 1000), 0.1)
+    assert detect_weight_unit(pounds)[0] == 'lb'
+    assert detect_weight_unit(ounces)[0] == 'oz'
+    # Header wins over the values
+    assert detect_weight_unit(pounds, header='Weight (oz)')[0] == 'oz'
+
+def test_normalize_weight():
+    """Ounces are converted to pounds in place and the decision recorded"""
+    df = pd.DataFrame({'Weight': np.array([4, 8, 16, 32], dtype=np.float32), 'Cost': [1.0] * 4})
+    decision = normalize_weight(df)
+    assert decision['unit'] == 'oz'
+    assert df['Weight'].tolist() == [0.25, 0.5, 1.0, 2.0]
+    assert df['Weight'].dtype == np.float32
+    assert df.attrs['weight_unit'] == decision
+
+def test_mappers_agree_on_pounds():
+    """Both mappers leave weight in pounds, the unit the weight buckets use"""
+    raw = pd.DataFrame({
+        'Weight (oz)': [4, 12, 24, 40],
+        'Service Level': ['Ground'] * 4,
+        'Transit Days': [2, 3, 4, 5]
+    })
+    firstmile = clean_and_rename_columns_enhanced(raw.copy())
+    enhanced = enhanced_clean_and_rename_columns(raw.copy())
+    assert firstmile['Weight'].tolist() == [0.25, 0.75, 1.5, 2.5]
+    assert enhanced['Weight'].tolist() == firstmile['Weight'].tolist()
+    assert firstmile.attrs['weight_unit']['unit'] == 'oz'
+
+if __name__ == "__main__":
+    print("🧪 Testing weight units...")
+    failed = False
+    for test in (test_header_hints, test_quantile_detection_ignores_outliers, test_normalize_weight,
+                 test_mappers_agree_on_pounds):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
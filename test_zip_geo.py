@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline ZIP5 geography table
+Checks lookups, distances, state/city backfill and the zone cross-check
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import analyze_comprehensive_performance_enhanced, ensure_required_columns
+from zip_geo import load_zip5_table, shipment_miles, zip_geo_lookup, zone_check
+
+def test_zip5_table():
+    """The table is memory-mapped and resolves ZIP5s to their ZIP3 centroid"""
+    table, states, cities = load_zip5_table()
+    assert len(table) == 100000
+    assert isinstance(table, np.memmap)
+
+    geo = zip_geo_lookup(['10001', 2134, '94103-1234', 'bad', '00099'])
+    assert geo['state'].tolist() == ['NY', 'MA', 'CA', None, None]
+    assert np.isnan(geo['lat'][3]) and np.isnan(geo['lat'][4])
+
+def test_shipment_miles():
+    """Distances come from the origin column, or a single origin ZIP"""
+    df = pd.DataFrame({'Origin ZIP': ['60601', '60601'], 'Destination ZIP': ['10001', 'bad']})
+    miles = shipment_miles(df)
+    assert 650 < miles[0] < 800  # Chicago -> New York
+    assert np.isnan(miles[1])
+
+    df = pd.DataFrame({'Destination ZIP': ['90001']})
+    assert shipment_miles(df) is None
+    assert 2300 < shipment_miles(df, origin_zip='10001')[0] < 2600
+
+def test_destination_geo_backfill():
+    """Blank destination states are filled from the ZIP; real values are kept, cities are not guessed"""
+    df = pd.DataFrame({
+        'Origin ZIP': ['10001'] * 3,
+        'Destination ZIP': ['60601', '90001', '02108'],
+        'Destination State': [None, 'Unknown', 'XX']
+    })
+    ensure_required_columns(df)
+    assert df['Destination State'].tolist() == ['IL', 'CA', 'XX']
+    # ZIP3 centroids carry no city: 90210 is not in Inglewood
+    assert 'Destination City' not in df.columns or df['Destination City'].isna().all()
+    assert zip_geo_lookup(['90210'])['city'].tolist() == [None]
+    assert df['Distance Miles'].notna().all()
+
+def test_zone_check():
+    """Zones more than one band away from the ZIP distance are counted"""
+    df = pd.DataFrame({
+        'Origin ZIP': ['10001'] * 4,
+        'Destination ZIP': ['10002', '90001', '90001', 'bad'],
+        'Calculated Zone': ['1', '8', '2', '5']
+    })
+    assert zone_check(df) == {'checked': 3, 'mismatches': 1, 'mismatch_rate': 33.3}
+
+    results = analyze_comprehensive_performance_enhanced(df)
+    assert results['zone_check']['mismatches'] == 1
+
+if __name__ == "__main__":
+    print("🧪 Testing ZIP geography...")
+    failed = False
+    for test in (test_zip5_table, test_shipment_miles, test_destination_geo_backfill, test_zone_check):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the ZIP5 performance index
+Checks top-N and ZIP3 queries against the raw rows and incremental updates
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import generate_demo_data
+from zip_index import (
+    build_zip_index,
+    empty_zip_index,
+    load_zip_index,
+    save_zip_index,
+    top_zips,
+    update_zip_index,
+    zip3_rollup,
+    zip5_codes,
+    zip_index_frame,
+    zip_lookup
+)
+
+def test_zip5_codes():
+    """Common ZIP spellings map to one integer code"""
+    codes = zip5_codes(['02134', 2134, '02134-1234', '021341234', '2134.0', 'K1A 0B1', None])
+    assert codes.tolist() == [2134, 2134, 2134, 2134, 2134, -1, -1]
+    # Integer columns take the fast path; ZIP+4 numbers keep their ZIP5
+    codes = zip5_codes(pd.Series([902101234, 21341234, 90210, 123456, -5], dtype=np.int64))
+    assert codes.tolist() == [90210, 2134, 90210, -1, -1]
+    # An index with no occupied ZIPs is an empty table, not an error
+    assert list(zip_index_frame(empty_zip_index())['ZIP']) == []
+
+def test_index_queries_match_raw_rows():
+    """Top misses, single-ZIP lookups and ZIP3 totals agree with the raw data"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    index = build_zip_index(raw_df)
+    zips = raw_df['Destination ZIP'].astype(str).str.zfill(5)
+
+    misses = zips[raw_df['SLA Status'] == 'SLA Miss'].value_counts()
+    top = top_zips(index, 10)
+    assert top['SLA Misses'].tolist() == misses.head(10).tolist()
+    assert all(misses[z] == m for z, m in zip(top['ZIP'], top['SLA Misses']))
+
+    zip_code = zips.iloc[0]
+    stats = zip_lookup(index, zip_code)
+    subset = raw_df[zips == zip_code]
+    assert stats['Shipments'] == len(subset)
+    assert np.isclose(stats['Avg Cost'], round(subset['Cost'].mean(), 2))
+
+    zip3 = zip3_rollup(index).set_index('ZIP3')['Shipments']
+    assert zip3.sum() == len(raw_df)
+    assert (zip3.sort_index().to_numpy() == zips.str[:3].value_counts().sort_index().to_numpy()).all()
+
+def test_incremental_update_and_persistence():
+    """Uploads are added once each and survive a save/load round trip"""
+    raw_df, _ = generate_demo_data("Complete Dataset")
+    index = empty_zip_index()
+    update_zip_index(index, raw_df.iloc[:500], source_id='part-1')
+    update_zip_index(index, raw_df.iloc[500:], source_id='part-2')
+    update_zip_index(index, raw_df.iloc[500:], source_id='part-2')  # Re-upload is ignored
+
+    full = build_zip_index(raw_df)
+    assert (index['rows'] == full['rows']).all()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'zip_index.npz')
+        save_zip_index(index, path)
+        restored = load_zip_index(path)
+    assert restored['sources'] == ['part-1', 'part-2']
+    assert np.allclose(restored['cost_sum'], full['cost_sum'])
+
+if __name__ == "__main__":
+    print("🧪 Testing ZIP index...")
+    failed = False
+    for test in (test_zip5_codes, test_index_queries_match_raw_rows, test_incremental_update_and_persistence):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
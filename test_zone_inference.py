@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script for ZIP3 zone inference
+Checks the bundled zone matrix and zone filling for reports without zones
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dashboard_imports import ensure_required_columns
+from zone_inference import infer_zones, load_zone_matrix
+
+def test_zone_matrix():
+    """The matrix is a memory-mapped 1000x1000 uint8 table with sensible zones"""
+    matrix = load_zone_matrix()
+    assert matrix.shape == (1000, 1000) and matrix.dtype == np.uint8
+    assert isinstance(matrix, np.memmap)
+
+    pairs = [
+        ('10001', '10002', 1),  # Same ZIP3
+        ('02108', '10001', 3),  # Boston -> New York, ~190 miles
+        ('90001', '94103', 4),  # Los Angeles -> San Francisco, ~350 miles
+        ('60601', '10001', 5),  # Chicago -> New York, ~710 miles
+        ('10001', '90001', 8)   # Coast to coast
+    ]
+    for origin, destination, zone in pairs:
+        assert infer_zones(origin, [destination])[0] == zone, (origin, destination)
+
+    # Unreadable or unassigned ZIPs stay unknown
+    assert infer_zones('10001', ['abc', '00099']).tolist() == [0, 0]
+
+def test_missing_zone_is_inferred():
+    """ensure_required_columns fills zones from ZIPs instead of a constant '4'"""
+    df = pd.DataFrame({
+        'Origin ZIP': ['10001'] * 3,
+        'Destination ZIP': ['10002', '90210', 'unknown']
+    })
+    ensure_required_columns(df)
+    assert df['Calculated Zone'].tolist() == ['1', '8', '4']
+
+    # Reports that already carry a zone keep it
+    df = pd.DataFrame({'Origin ZIP': ['10001'], 'Destination ZIP': ['90210'], 'Calculated Zone': ['2']})
+    ensure_required_columns(df)
+    assert df['Calculated Zone'].tolist() == ['2']
+
+if __name__ == "__main__":
+    print("🧪 Testing zone inference...")
+    failed = False
+    for test in (test_zone_matrix, test_missing_zone_is_inferred):
+        try:
+            test()
+            print(f"✅ {test.__name__} passed")
+        except Exception as e:
+            failed = True
+            print(f"❌ {test.__name__} failed: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# transitiq_cli.py - Headless batch runner for the TransitIQ analysis engine
+# Runs ingestion -> column mapping -> 11-section analysis -> export for many
+# files in parallel without importing Streamlit.
+#
+# Usage:
+#   python transitiq_cli.py exports/*.csv --output-dir reports --workers 8
+#   python transitiq_cli.py /data/customers --format xlsx csv
+#   python transitiq_cli.py /data/customers --format parquet arrow --zstd-level 9
+#   python transitiq_cli.py /data/acme/2025-*.csv --combine --output-dir reports
+#   python transitiq_cli.py /data/acme/2025-*.csv --combine --engine sql
+#   python transitiq_cli.py exports/*.csv --engine polars
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis_engines import available_engines
+from batch_analysis import BATCH_ENGINES, expand_batch_sources, run_batch_analysis
+from dashboard_imports import analyze_comprehensive_performance_enhanced
+from execution_planner import load_shipments, plan_batch, plan_ingestion
+from report_exports import build_summary_csv, write_columnar_exports, write_excel_report
+
+EXPORT_FORMATS = ['xlsx', 'csv', 'parquet', 'arrow']
+
+def collect_inputs(inputs):
+    """Expand files, directories and glob patterns into a de-duplicated file list"""
+    paths = []
+    for item in inputs:
+        if os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(expand_batch_sources(item))
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+def output_stems(paths):
+    """Report name per input path: its file name, plus its folders when names collide
+
+    jan/report.csv and feb/report.csv become jan_report and feb_report
+    instead of overwriting each other.
+    """
+    stems = {path: os.path.splitext(os.path.basename(path))[0] for path in paths}
+    by_stem = {}
+    for path, stem in stems.items():
+        by_stem.setdefault(stem, []).append(path)
+    for colliding in by_stem.values():
+        if len(colliding) < 2:
+            continue
+        root = os.path.commonpath([os.path.dirname(path) for path in colliding])
+        for path in colliding:
+            relative = os.path.splitext(os.path.relpath(path, root))[0]
+            stems[path] = relative.replace(os.sep, '_')
+    return stems
+
+def export_results(df, results, output_dir, stem, formats, compression_level=None):
+    """Write the requested report formats and return their paths"""
+    written = []
+    if 'xlsx' in formats:
+        path = os.path.join(output_dir, f'{stem}_report.xlsx')
+        write_excel_report(df, results, path)
+        written.append(path)
+    if 'csv' in formats:
+        path = os.path.join(output_dir, f'{stem}_summary.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            handle.write(build_summary_csv(results))
+        written.append(path)
+    for fmt in ('parquet', 'arrow'):
+        if fmt in formats:
+            written.extend(write_columnar_exports(df, results, output_dir, stem, fmt, compression_level))
+    return written
+
+def _chosen_engine(plan, engine):
+    """Use the plan's engine for 'auto'; otherwise record the override in the plan"""
+    if engine != 'auto':
+        plan['engine'] = engine
+        plan['reasons'].append(f"--engine {engine}")
+    return plan['engine']
+
+def process_file(path, output_dir, formats, verbose=False, compression_level=None, engine='auto', stem=None):
+    """Run the full pipeline for one file and return per-stage timings and the execution plan
+
+    Reports are named after stem (default: the file name without its extension).
+    """
+    timings = {}
+    # The column mapper narrates every rename; keep worker output quiet by default
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with quiet:
+        # Reader (whole or chunked), dtypes and engine, decided before the file is read
+        df, plan = load_shipments(path, plan_ingestion(path), timings=timings)
+        engine = _chosen_engine(plan, engine)
+
+        start = time.perf_counter()
+        results = analyze_comprehensive_performance_enhanced(df, engine=engine)
+        timings['analyze'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stem = stem or os.path.splitext(os.path.basename(path))[0]
+        outputs = export_results(df, results, output_dir, stem, formats, compression_level)
+        timings['export'] = time.perf_counter() - start
+
+    return {
+        'file': path,
+        'rows': len(df),
+        'parse_failures': df.attrs.get('parse_failures', {}),
+        'weight_unit': df.attrs.get('weight_unit'),
+        'outputs': outputs,
+        'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        'total_seconds': round(sum(timings.values()), 3),
+        'plan': plan
+    }
+
+def format_progress(done, total, record):
+    """One progress line per finished file"""
+    name = os.path.basename(record['file'])
+    if 'error' in record:
+        return f"[{done}/{total}] FAILED {name}: {record['error']}"
+    stages = ' '.join(f'{stage} {seconds:.2f}s' for stage, seconds in record['timings'].items())
+    return f"[{done}/{total}] {name}  {record['rows']:,} rows  {stages}  total {record['total_seconds']:.2f}s"
+
+def run_files(paths, output_dir, formats, workers, verbose=False, compression_level=None, engine='auto'):
+    """Process files in parallel worker processes, printing progress as they finish"""
+    records = []
+    total = len(paths)
+    stems = output_stems(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_file, path, output_dir, formats, verbose, compression_level, engine,
+                            stems[path]): path
+            for path in paths
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {'file': futures[future], 'error': str(e)}
+            records.append(record)
+            print(format_progress(done, total, record), flush=True)
+    return records
+
+def run_combined(paths, output_dir, formats, workers, name, compression_level=None, engine='auto'):
+    """Analyze all inputs as one period (see batch_analysis) and export a single report"""
+    plan = plan_batch(paths)
+    engine = _chosen_engine(plan, engine)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = run_batch_analysis(paths, max_workers=workers, engine=engine)
+    analyze_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    outputs = export_results(None, batch['results'], output_dir, name, formats, compression_level)
+    export_seconds = time.perf_counter() - start
+
+    for failure in batch['errors']:
+        print(f"FAILED {failure['name']}: {failure['error']}")
+    for info in batch['files']:
+        print(f"  {info['name']}  {info['rows']:,} rows{'  (cached)' if info['cached'] else ''}")
+
+    return [{
+        'file': name,
+        'rows': sum(info['rows'] for info in batch['files']),
+        'inputs': batch['files'],
+        'errors': batch['errors'],
+        'outputs': outputs,
+        'timings': {'analyze': round(analyze_seconds, 3), 'export': round(export_seconds, 3)},
+        'total_seconds': round(analyze_seconds + export_seconds, 3),
+        'plan': plan
+    }]
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Run TransitIQ analysis and exports for many tracking reports without the dashboard"
+    )
+    parser.add_argument('inputs', nargs='+', help="Files, directories or glob patterns (CSV/XLSX)")
+    parser.add_argument('-o', '--output-dir', default='reports', help="Directory for generated reports")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Parallel worker processes")
+    parser.add_argument('-f', '--format', nargs='+', choices=EXPORT_FORMATS, default=['xlsx'],
+                        dest='formats', help="Export formats to write")
+    parser.add_argument('--zstd-level', type=int, default=None, dest='compression_level',
+                        help="Compress Parquet/Arrow output with zstd at this level (default: snappy/uncompressed)")
+    parser.add_argument('--combine', action='store_true',
+                        help="Analyze all inputs together as one period and write a single report")
+    parser.add_argument('--name', default='combined',
+                        help="Report name used with --combine")
+    parser.add_argument('--engine', choices=['auto'] + available_engines(), default='auto',
+                        help="Analysis engine: auto (chosen from file size and memory, see execution_planner), "
+                             "pandas, polars, or SQL (DuckDB, else SQLite; over the cleaned-file cache with --combine)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Show column mapping output")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.combine and args.engine not in ['auto'] + BATCH_ENGINES:
+        parser.error(f"--combine runs on {' or '.join(BATCH_ENGINES)}, not {args.engine}")
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("No CSV/XLSX files found for the given inputs", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = max(1, min(args.workers, len(paths)))
+    print(f"Processing {len(paths)} file(s) with {workers} worker(s) -> {args.output_dir}", flush=True)
+
+    start = time.perf_counter()
+    if args.combine:
+        records = run_combined(paths, args.output_dir, args.formats, workers, args.name,
+                               args.compression_level, args.engine)
+    else:
+        records = run_files(paths, args.output_dir, args.formats, workers, args.verbose,
+                            args.compression_level, args.engine)
+    elapsed = time.perf_counter() - start
+
+    # A combined record lists the inputs that failed under 'errors'
+    failures = sum(len(record.get('errors', [])) + ('error' in record) for record in records)
+    summary = {
+        'files': len(paths),
+        'succeeded': len(paths) - failures,
+        'failed': failures,
+        'wall_seconds': round(elapsed, 3),
+        'records': records
+    }
+    with open(os.path.join(args.output_dir, 'run_summary.json'), 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle, indent=2, default=str)
+
+    print(f"Done: {summary['succeeded']} succeeded, {summary['failed']} failed in {elapsed:.2f}s")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# trend_engine.py - Time-series trends over Request Date
+# Shipments are reduced once to additive per-day, per-Xparcel-tier measures
+# (the trend state). Daily, weekly and monthly views are resampled from that
+# state, and new uploads are merged into it without touching earlier rows.
+
+import numpy as np
+import pandas as pd
+
+TREND_MEASURES = ['rows', 'sla_n', 'on_time', 'transit_n', 'transit_sum', 'cost_n', 'cost_sum']
+TREND_KEYS = ['Date', 'Xparcel Type']
+TREND_RULES = {
+    'D': 'D',       # Daily
+    'W': 'W-SUN',   # Weeks ending Sunday
+    'M': 'MS'       # Calendar months, labelled by their first day
+}
+TREND_COLUMNS = ['Period', 'Shipments', 'On-Time %', 'Avg Transit Days', 'Avg Cost']
+UNKNOWN_TIER = 'Unknown'
+
+def empty_trend_state():
+    state = pd.DataFrame({
+        'Date': pd.Series(dtype='datetime64[ns]'),
+        'Xparcel Type': pd.Series(dtype=object)
+    })
+    for measure in TREND_MEASURES:
+        state[measure] = pd.Series(dtype=float if measure.endswith('_sum') else np.int64)
+    return state
+
+def daily_trend_state(df, request_dates=None, weights=None):
+    """Per-day, per-tier volume/SLA/transit/cost measures for one frame
+
+    Rows are placed in (day, tier) slots and every measure is one
+    np.bincount over those slots. Rows without a valid Request Date are
+    left out of the trend. request_dates, when given, are the already
+    parsed Request Date values (e.g. from a ShipmentDataset). weights,
+    when given, is the number of shipments each row stands for.
+    """
+    if df is None or df.empty or 'Request Date' not in df.columns:
+        return empty_trend_state()
+
+    if request_dates is None:
+        request_dates = pd.to_datetime(df['Request Date'], errors='coerce')
+    days = pd.Series(request_dates).to_numpy(dtype='datetime64[D]')
+    valid = ~np.isnat(days)
+    if not valid.any():
+        return empty_trend_state()
+
+    if 'Xparcel Type' in df.columns:
+        tier_codes, tier_labels = pd.factorize(df['Xparcel Type'], use_na_sentinel=True)
+        tier_labels = list(np.asarray(tier_labels, dtype=object))
+        tier_codes = tier_codes[valid]
+    else:
+        tier_codes, tier_labels = np.full(int(valid.sum()), -1), []
+    # Missing tiers share the 'Unknown' slot
+    if (tier_codes < 0).any():
+        if UNKNOWN_TIER not in tier_labels:
+            tier_labels.append(UNKNOWN_TIER)
+        tier_codes = np.where(tier_codes < 0, tier_labels.index(UNKNOWN_TIER), tier_codes)
+
+    day_numbers = days[valid].astype(np.int64)
+    first_day = day_numbers.min()
+    tier_count = len(tier_labels)
+    slots = (day_numbers - first_day) * tier_count + tier_codes
+    size = int(slots.max()) + 1
+
+    def column(name):
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)[valid]
+        return np.full(int(valid.sum()), np.nan)
+
+    transit = column('Days In Transit')
+    cost = column('Cost')
+    if 'SLA Status' in df.columns:
+        sla_known = df['SLA Status'].notna().to_numpy()[valid]
+        on_time = (df['SLA Status'] == 'On-Time').to_numpy(dtype=bool, na_value=False)[valid]
+    else:
+        sla_known = on_time = np.zeros(int(valid.sum()), dtype=bool)
+
+    row_weights = np.ones(len(slots)) if weights is None else np.asarray(weights, dtype=float)[valid]
+
+    def count(mask):
+        return np.rint(np.bincount(slots, weights=mask * row_weights, minlength=size)).astype(np.int64)
+
+    def total(values):
+        return np.bincount(slots, weights=np.nan_to_num(values) * row_weights, minlength=size)
+
+    measures = {
+        'rows': count(np.ones(len(slots), dtype=bool)),
+        'sla_n': count(sla_known),
+        'on_time': count(on_time),
+        'transit_n': count(~np.isnan(transit)),
+        'transit_sum': total(transit),
+        'cost_n': count(~np.isnan(cost)),
+        'cost_sum': total(cost)
+    }
+
+    occupied = np.flatnonzero(measures['rows'])
+    state = pd.DataFrame({
+        'Date': (first_day + occupied // tier_count).astype('datetime64[D]').astype('datetime64[ns]'),
+        'Xparcel Type': np.asarray(tier_labels, dtype=object)[occupied % tier_count]
+    })
+    for measure, values in measures.items():
+        state[measure] = values[occupied]
+    return state.sort_values(TREND_KEYS, kind='stable').reset_index(drop=True)
+
+def merge_trend_states(states):
+    """Sum several trend states (files, months, appended days) into one"""
+    frames = [state for state in states if state is not None and not state.empty]
+    if not frames:
+        return empty_trend_state()
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.groupby(TREND_KEYS, sort=True)[TREND_MEASURES].sum().reset_index()
+
+def update_trend_state(state, new_df):
+    """Fold newly uploaded shipments into an existing trend state"""
+    return merge_trend_states([state, daily_trend_state(new_df)])
+
+def trend_table(state, freq='W', by_tier=False):
+    """Volume, on-time %, average transit and cost per day ('D'), week ('W') or month ('M')
+
+    Periods with no shipments are kept with zero volume so gaps stay visible.
+    """
+    columns = TREND_COLUMNS[:1] + ['Xparcel Type'] + TREND_COLUMNS[1:] if by_tier else TREND_COLUMNS
+    if state is None or state.empty:
+        return pd.DataFrame(columns=columns)
+
+    indexed = state.set_index('Date').sort_index()
+    rule = TREND_RULES[freq]
+    if by_tier:
+        buckets = indexed.groupby('Xparcel Type')[TREND_MEASURES].resample(rule).sum().reset_index()
+    else:
+        buckets = indexed[TREND_MEASURES].resample(rule).sum().reset_index()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'Period': buckets['Date'],
+            'Shipments': buckets['rows'].astype(np.int64),
+            'On-Time %': np.where(buckets['sla_n'] > 0, buckets['on_time'] / buckets['sla_n'] * 100, np.nan).round(1),
+            'Avg Transit Days': np.where(buckets['transit_n'] > 0, buckets['transit_sum'] / buckets['transit_n'], np.nan).round(2),
+            'Avg Cost': np.where(buckets['cost_n'] > 0, buckets['cost_sum'] / buckets['cost_n'], np.nan).round(2)
+        })
+    if by_tier:
+        table.insert(1, 'Xparcel Type', buckets['Xparcel Type'])
+    return table[columns]
@@ -0,0 +1,95 @@
+# typed_parsing.py - Typed parsing of the canonical numeric fields
+# Days In Transit, Cost, Weight and Calculated Zone arrive as text as often as
+# numbers ("$12.50", "1,234", "Zone 4"). Each column is parsed in one pass:
+# the distinct values are cleaned with vectorized string ops, parsed once and
+# mapped back to rows, then stored in a compact dtype. Values that still do
+# not parse are counted per column instead of silently becoming NaN.
+#
+# parse_numeric_columns works on a whole frame or on one chunk at a time;
+# iter_typed_chunks applies it to a stream of chunks with one shared report.
+
+import numpy as np
+import pandas as pd
+
+# Field -> target: 'integer' is the smallest int dtype that fits (float32 when
+# values are missing or fractional); otherwise a fixed float dtype
+NUMERIC_FIELDS = {
+    'Days In Transit': 'integer',
+    'Calculated Zone': 'integer',
+    'Cost': 'float64',    # Kept at full precision for currency totals
+    'Weight': 'float32'
+}
+# Currency symbols, thousands separators, whitespace and a leading "Zone" label
+NUMERIC_NOISE = r'(?i)[\s$€£,]|^zone'
+# Accounting negatives, e.g. "(12.50)"
+ACCOUNTING_NEGATIVE = r'^\((.*)\)$'
+
+def _compact(values, target):
+    """Downcast parsed float64 values to the field's target dtype"""
+    if target != 'integer':
+        return values.astype(target)
+    finite = values[~np.isnan(values)]
+    if len(finite) == len(values) and np.array_equal(finite, np.floor(finite)):
+        if len(finite) == 0:
+            return values.astype(np.int8)
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if finite.min() >= info.min and finite.max() <= info.max:
+                return values.astype(dtype)
+    return values.astype(np.float32)
+
+def parse_numeric(series, target='float64'):
+    """(parsed values, failure count) for one column
+
+    Failures are non-blank values that could not be read as a number.
+    """
+    if pd.api.types.is_bool_dtype(series.dtype):
+        series = series.astype(np.int8)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        return pd.Series(_compact(values, target), index=series.index, name=series.name), 0
+
+    labels, uniques = pd.factorize(series, use_na_sentinel=True)
+    text = pd.Series(uniques, dtype=object).astype(str)
+    cleaned = (
+        text.str.replace(NUMERIC_NOISE, '', regex=True)
+            .str.replace(ACCOUNTING_NEGATIVE, r'-\1', regex=True)
+    )
+    parsed = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=float)
+    blank = cleaned.str.len().to_numpy() == 0
+    unparsed = np.isnan(parsed) & ~blank
+
+    values = np.where(labels >= 0, np.append(parsed, np.nan)[labels], np.nan)
+    failures = int(np.bincount(labels[labels >= 0], minlength=len(uniques))[unparsed].sum())
+    return pd.Series(_compact(values, target), index=series.index, name=series.name), failures
+
+def parse_numeric_columns(df, fields=None, report=None):
+    """Parse the canonical numeric fields of df in place
+
+    Failure counts are added to report (a dict, created if not given) and
+    recorded in df.attrs['parse_failures']. Returns the report.
+    """
+    fields = NUMERIC_FIELDS if fields is None else fields
+    report = {} if report is None else report
+    for col, target in fields.items():
+        if col not in df.columns:
+            continue
+        df[col], failures = parse_numeric(df[col], target)
+        if failures:
+            report[col] = report.get(col, 0) + failures
+    df.attrs['parse_failures'] = dict(report)
+    return report
+
+def iter_typed_chunks(chunks, fields=None, report=None):
+    """Yield each mapped chunk with its numeric fields parsed
+
+    report accumulates failure counts across the whole stream.
+    """
+    report = {} if report is None else report
+    for chunk in chunks:
+        parse_numeric_columns(chunk, fields, report)
+        yield chunk
+
+def describe_parse_failures(report):
+    """One-line summary such as "Cost: 12, Weight: 3", or '' when clean"""
+    return ', '.join(f"{col}: {count:,}" for col, count in report.items() if count)
@@ -0,0 +1,92 @@
+# weight_units.py - Weight unit detection and normalization
+# The analyzers bucket weight in pounds (0.25 / 0.5 / 1 / 2 lb), so every
+# upload is normalized to pounds once, right after column mapping. The unit
+# comes from the original header when it says so ("Weight (oz)", "lbs"),
+# otherwise from quantiles of a sample of the values, which outliers such as
+# a single pallet or a zero-weight row cannot swing. The decision is
+# recorded in df.attrs['weight_unit'].
+
+import re
+
+import numpy as np
+import pandas as pd
+
+CANONICAL_WEIGHT_UNIT = 'lb'
+# Multiply by these to get pounds
+WEIGHT_UNITS = {
+    'lb': 1.0,
+    'oz': 1 / 16,
+    'kg': 2.20462,
+    'g': 0.00220462
+}
+HEADER_HINTS = [
+    (r'\b(oz|ozs|ounces?)\b', 'oz'),
+    (r'\b(lb|lbs|pounds?)\b', 'lb'),
+    (r'\b(kg|kgs|kilo(gram)?s?)\b', 'kg'),
+    (r'\b(g|grams?)\b', 'g')
+]
+
+# Analysis weight buckets, in pounds
+WEIGHT_BINS = [0, 0.25, 0.5, 1, 2, float('inf')]
+WEIGHT_LABELS = ['1-4 oz', '5-8 oz', '9-15 oz', '16-32 oz', '>32 oz']
+
+UNIT_SAMPLE_SIZE = 10000
+# Parcel medians: a few ounces to a few pounds. Above 16 the values are ounces,
+# at or below 4 they are pounds; in between, whole numbers point to ounces.
+OUNCE_MEDIAN = 16
+POUND_MEDIAN = 4
+WHOLE_NUMBER_SHARE = 0.9
+
+def unit_from_header(header):
+    """Unit named in a column header, or None"""
+    if not header:
+        return None
+    name = re.sub(r'[_()\[\]/-]', ' ', str(header).lower())
+    for pattern, unit in HEADER_HINTS:
+        if re.search(pattern, name):
+            return unit
+    return None
+
+def detect_weight_unit(values, header=None, sample_size=UNIT_SAMPLE_SIZE):
+    """(unit, reason) for a weight column: header hint first, then a quantile test"""
+    unit = unit_from_header(header)
+    if unit:
+        return unit, f"header '{header}'"
+
+    weights = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    weights = weights[np.isfinite(weights) & (weights > 0)]
+    if len(weights) == 0:
+        return CANONICAL_WEIGHT_UNIT, 'no positive weights'
+    if len(weights) > sample_size:
+        weights = np.random.default_rng(0).choice(weights, sample_size, replace=False)
+
+    median = float(np.median(weights))
+    if median > OUNCE_MEDIAN:
+        return 'oz', f'median {median:.2f} > {OUNCE_MEDIAN}'
+    if median <= POUND_MEDIAN:
+        return 'lb', f'median {median:.2f} <= {POUND_MEDIAN}'
+    whole = float(np.mean(weights == np.round(weights)))
+    if whole >= WHOLE_NUMBER_SHARE:
+        return 'oz', f'median {median:.2f}, {whole:.0%} whole numbers'
+    return 'lb', f'median {median:.2f}, {whole:.0%} whole numbers'
+
+def normalize_weight(df, column='Weight', header=None, unit=None):
+    """Convert df[column] to pounds in place and record the decision
+
+    unit skips detection, e.g. to apply the first chunk's decision to the
+    rest of a stream. Returns the decision dict, or None without the column.
+    """
+    if column not in df.columns:
+        return None
+    reason = 'given'
+    if unit is None:
+        unit, reason = detect_weight_unit(df[column], header)
+
+    factor = WEIGHT_UNITS[unit]
+    if factor != 1.0:
+        # Replaces the one column; the rest of the frame is untouched
+        df[column] = pd.to_numeric(df[column], errors='coerce') * factor
+
+    decision = {'column': header or column, 'unit': unit, 'reason': reason, 'factor': factor}
+    df.attrs['weight_unit'] = decision
+    return decision
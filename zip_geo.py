@@ -0,0 +1,222 @@
+# zip_geo.py - Offline ZIP5 geography and distance enrichment
+# A 100k-slot ZIP5 -> (lat, lon, state, city) table is built from the bundled
+# centroid data and memory-mapped, so destination state/city backfill,
+# shipment distances and zone cross-checks are plain NumPy operations with
+# no geocoding calls.
+#
+# ZIP5s inherit their ZIP3 (SCF) centroid and state from
+# data/zip3_centroids.csv, but not its city: the city of an SCF is wrong for
+# most of the ZIPs it serves. Cities only come from a finer
+# data/zip5_centroids.csv (zip,lat,lon,state,city), which overrides
+# individual ZIPs when present. Rebuild after editing either file:
+#   python zip_geo.py
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from zip_index import ZIP5_SLOTS, zip5_codes
+from zone_inference import (
+    DATA_DIR,
+    DEFAULT_ORIGIN_ZIP,
+    ZIP3_CENTROIDS_PATH,
+    find_origin_zip_column,
+    haversine_miles,
+    load_zip3_centroids,
+    zone_mile_bands
+)
+
+ZIP5_CENTROIDS_PATH = os.path.join(DATA_DIR, 'zip5_centroids.csv')
+ZIP5_TABLE_PATH = os.path.join(DATA_DIR, 'zip5_geo.npy')
+ZIP5_LABELS_PATH = os.path.join(DATA_DIR, 'zip5_geo_labels.json')
+ZIP5_GEO_DTYPE = np.dtype([('lat', '<f4'), ('lon', '<f4'), ('state', '<u1'), ('city', '<u2')])
+
+# Carrier zone charts use SCF ranges, so neighbouring zones at band edges are normal
+ZONE_CHECK_TOLERANCE = 1
+
+_geo_table = None
+
+def build_zip5_table(zip3_path=ZIP3_CENTROIDS_PATH, zip5_path=ZIP5_CENTROIDS_PATH,
+                     output_path=ZIP5_TABLE_PATH, labels_path=ZIP5_LABELS_PATH):
+    """Write the ZIP5 geography table (.npy) and its state/city labels (.json)
+
+    State and city are stored as small integer codes; code 0 means unknown.
+    """
+    zip3 = load_zip3_centroids(zip3_path)
+    rows = pd.DataFrame({
+        'zip': (zip3['zip3'].to_numpy()[:, None] * 100 + np.arange(100)).ravel(),
+        'lat': np.repeat(zip3['lat'].to_numpy(), 100),
+        'lon': np.repeat(zip3['lon'].to_numpy(), 100),
+        'state': np.repeat(zip3['state'].to_numpy(), 100),
+        'city': None
+    })
+    if zip5_path and os.path.exists(zip5_path):
+        detail = pd.read_csv(zip5_path, dtype={'zip': str})
+        detail['zip'] = zip5_codes(detail['zip'])
+        detail = detail[detail['zip'] >= 0]
+        rows = pd.concat([rows, detail[['zip', 'lat', 'lon', 'state', 'city']]]).drop_duplicates('zip', keep='last')
+
+    states = [''] + sorted(rows['state'].dropna().unique().tolist())
+    cities = [''] + sorted(rows['city'].dropna().unique().tolist())
+    table = np.zeros(ZIP5_SLOTS, dtype=ZIP5_GEO_DTYPE)
+    table['lat'] = np.nan
+    table['lon'] = np.nan
+    slots = rows['zip'].to_numpy()
+    table['lat'][slots] = rows['lat'].to_numpy()
+    table['lon'][slots] = rows['lon'].to_numpy()
+    # Missing labels (code -1) map to 0, unknown
+    table['state'][slots] = np.maximum(pd.Categorical(rows['state'], categories=states).codes, 0)
+    table['city'][slots] = np.maximum(pd.Categorical(rows['city'], categories=cities).codes, 0)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    np.save(output_path, table)
+    with open(labels_path, 'w', encoding='utf-8') as handle:
+        json.dump({'states': states, 'cities': cities}, handle)
+    return table
+
+def load_zip5_table():
+    """(memory-mapped table, state labels, city labels), built on first use if missing"""
+    global _geo_table
+    if _geo_table is None:
+        if not (os.path.exists(ZIP5_TABLE_PATH) and os.path.exists(ZIP5_LABELS_PATH)):
+            build_zip5_table()
+        with open(ZIP5_LABELS_PATH, encoding='utf-8') as handle:
+            labels = json.load(handle)
+        _geo_table = (
+            np.load(ZIP5_TABLE_PATH, mmap_mode='r'),
+            np.array(labels['states'], dtype=object),
+            np.array(labels['cities'], dtype=object)
+        )
+    return _geo_table
+
+def zip_geo_lookup(zips):
+    """Latitude, longitude, state and city arrays for a column of ZIPs (NaN/None when unknown)"""
+    table, states, cities = load_zip5_table()
+    codes = zip5_codes(zips)
+    valid = codes >= 0
+    rows = np.zeros(len(codes), dtype=ZIP5_GEO_DTYPE)
+    rows['lat'] = np.nan
+    rows['lon'] = np.nan
+    rows[valid] = table[codes[valid]]
+
+    state = states[rows['state']]
+    city = cities[rows['city']]
+    state[rows['state'] == 0] = None
+    city[rows['city'] == 0] = None
+    return {'lat': rows['lat'].astype(float), 'lon': rows['lon'].astype(float), 'state': state, 'city': city}
+
+def shipment_miles(df, origin_zip=None):
+    """Origin-to-destination distance per row, or None without an origin or destination ZIP"""
+    if 'Destination ZIP' not in df.columns:
+        return None
+    origin_col = find_origin_zip_column(df)
+    origin = df[origin_col] if origin_col is not None else (origin_zip or DEFAULT_ORIGIN_ZIP)
+    if origin is None:
+        return None
+
+    destination = zip_geo_lookup(df['Destination ZIP'])
+    if origin_col is None:
+        source = zip_geo_lookup([origin])
+        origin_lat, origin_lon = source['lat'][0], source['lon'][0]
+    else:
+        source = zip_geo_lookup(origin)
+        origin_lat, origin_lon = source['lat'], source['lon']
+    return haversine_miles(origin_lat, origin_lon, destination['lat'], destination['lon'])
+
+def _blank_rows(df, column):
+    """Rows where column is missing, empty or a placeholder"""
+    if column not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    series = df[column]
+    return (series.isna() | series.astype(str).str.strip().isin(['', 'Unknown', 'nan', 'None'])).to_numpy()
+
+def fill_destination_geo(df):
+    """Fill missing or blank Destination State / Destination City from the ZIP, in place
+
+    Only the blank rows are looked up. Cities are only filled for ZIPs listed
+    in data/zip5_centroids.csv; the rest stay blank.
+    """
+    if 'Destination ZIP' not in df.columns:
+        return df
+    blanks = {column: _blank_rows(df, column) for column in ('Destination State', 'Destination City')}
+    needed = blanks['Destination State'] | blanks['Destination City']
+    if not needed.any():
+        return df
+
+    geo = zip_geo_lookup(df['Destination ZIP'][needed])
+    for column, key in (('Destination State', 'state'), ('Destination City', 'city')):
+        found = np.full(len(df), None, dtype=object)
+        found[needed] = geo[key]
+        fill = blanks[column] & pd.notna(found)
+        if not fill.any():
+            continue
+        if column not in df.columns:
+            df[column] = found
+        else:
+            df[column] = df[column].astype(object).where(~fill, found)
+    return df
+
+def zones_from_miles(miles, zone_definitions=None):
+    """Zone number per distance using the ZONE_DEFINITIONS mile bands (0 where unknown)"""
+    if zone_definitions is None:
+        from dashboard_imports import ZONE_DEFINITIONS
+        zone_definitions = ZONE_DEFINITIONS
+    miles = np.asarray(miles, dtype=float)
+    zones = np.searchsorted(zone_mile_bands(zone_definitions), np.nan_to_num(miles), side='left') + 1
+    return np.where(np.isnan(miles), 0, zones)
+
+def empty_zone_check():
+    return {'checked': 0, 'mismatches': 0, 'mismatch_rate': 0.0}
+
+def zone_check_rows(df, origin_zip=None, miles=None):
+    """(comparable, mismatched) boolean arrays per row, or None when zones cannot be checked
+
+    A row is comparable when it has a reported zone and a ZIP distance, and
+    mismatched when the two are more than ZONE_CHECK_TOLERANCE zones apart.
+    """
+    if 'Calculated Zone' not in df.columns:
+        return None
+    if miles is None and 'Distance Miles' in df.columns:
+        miles = df['Distance Miles'].to_numpy(dtype=float)
+    elif miles is None:
+        miles = shipment_miles(df, origin_zip)
+    if miles is None:
+        return None
+
+    reported = pd.to_numeric(df['Calculated Zone'], errors='coerce').to_numpy(dtype=float)
+    expected = zones_from_miles(miles)
+    comparable = ~np.isnan(reported) & (expected > 0)
+    return comparable, comparable & (np.abs(reported - expected) > ZONE_CHECK_TOLERANCE)
+
+def zone_check(df, origin_zip=None, miles=None, weights=None):
+    """Compare Calculated Zone with the zone implied by ZIP distance
+
+    Counts rows whose reported zone is more than ZONE_CHECK_TOLERANCE zones
+    away from the distance band. weights, when given, is the number of
+    shipments each row stands for (e.g. distinct rows with their counts).
+    """
+    result = empty_zone_check()
+    rows = zone_check_rows(df, origin_zip, miles)
+    if rows is None:
+        return result
+
+    comparable, mismatches = rows
+    weights = np.ones(len(comparable), dtype=np.int64) if weights is None else np.asarray(weights)
+    result['checked'] = int(np.rint(weights[comparable].sum()))
+    result['mismatches'] = int(np.rint(weights[mismatches].sum()))
+    result['mismatch_rate'] = round(result['mismatches'] / result['checked'] * 100, 1) if result['checked'] else 0.0
+    return result
+
+def enrich_shipments(df, origin_zip=None):
+    """Add 'Distance Miles' and backfill destination state/city, in place"""
+    miles = shipment_miles(df, origin_zip)
+    if miles is not None:
+        df['Distance Miles'] = np.round(miles, 1)
+    return fill_destination_geo(df)
+
+if __name__ == "__main__":
+    table = build_zip5_table()
+    print(f"Wrote {ZIP5_TABLE_PATH}: {len(table):,} slots, "
+          f"{int((~np.isnan(table['lat'])).sum()):,} ZIP5s with coordinates")
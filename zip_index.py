@@ -0,0 +1,240 @@
+# zip_index.py - Materialized ZIP5 performance index
+# Volume, SLA misses, transit and cost are kept in fixed 100k-slot arrays
+# addressed by the integer ZIP5 code, so drill-downs, top-N lists and ZIP3
+# roll-ups read the index instead of the raw rows. Indexes are additive:
+# new uploads are folded in with update_zip_index / merge_zip_indexes.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+ZIP5_SLOTS = 100000
+ZIP3_SLOTS = 1000
+ZIP_INDEX_MEASURES = {
+    'rows': np.uint32,
+    'sla_n': np.uint32,
+    'misses': np.uint32,
+    'transit_n': np.uint32,
+    'transit_sum': np.float64,
+    'cost_n': np.uint32,
+    'cost_sum': np.float64
+}
+# 12345, 12345-6789, 123456789, 12345.0; 3-4 digit values lost their leading zeros
+ZIP5_PATTERN = r'^\s*(\d{5})(?:-?\d{4})?(?:\.0+)?\s*$|^\s*(\d{3,4})(?:\.0+)?\s*$'
+
+def find_zip_column(df):
+    """First ZIP/postal column, matched the same way as the analyzers"""
+    for col in df.columns:
+        if 'zip' in col.lower() or 'postal' in col.lower():
+            return col
+    return None
+
+def zip5_codes(values):
+    """Integer ZIP5 codes (0-99999) for a column of ZIPs; -1 where no ZIP can be read
+
+    Only the distinct values are parsed (there are at most ~42k real ZIPs),
+    then mapped back to rows, so this stays fast on millions of rows.
+    """
+    labels, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    if pd.api.types.is_integer_dtype(uniques.dtype):
+        parsed = np.asarray(uniques, dtype=np.int64)
+        # ZIP+4 stored as a number (902101234, or 7-8 digits without leading zeros): keep the ZIP5
+        zip_plus4 = (parsed >= ZIP5_SLOTS * 10) & (parsed < ZIP5_SLOTS * 10000)
+        parsed = np.where(zip_plus4, parsed // 10000, parsed)
+        parsed = np.where((parsed >= 0) & (parsed < ZIP5_SLOTS), parsed, -1)
+    else:
+        text = pd.Series(uniques).astype(str).str.strip()
+        parsed = np.full(len(text), -1, dtype=np.int64)
+        # Plain 5-digit ZIPs skip the regex
+        plain = text.str.fullmatch(r'\d{5}').to_numpy(dtype=bool)
+        parsed[plain] = text[plain].astype(np.int64).to_numpy()
+        if not plain.all():
+            parts = text[~plain].str.extract(ZIP5_PATTERN)
+            digits = parts[0].fillna(parts[1])
+            parsed[~plain] = pd.to_numeric(digits, errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    return np.where(labels >= 0, np.append(parsed, -1)[labels], -1)
+
+def format_zip5(codes):
+    codes = np.asarray(codes)
+    if codes.size == 0:
+        return codes.astype('<U5')
+    return np.char.zfill(codes.astype(str), 5)
+
+def empty_zip_index():
+    index = {name: np.zeros(ZIP5_SLOTS, dtype=dtype) for name, dtype in ZIP_INDEX_MEASURES.items()}
+    index['sources'] = []
+    return index
+
+def zip_row_measures(df, zip_col):
+    """(ZIP5 code per row, measure -> per-row contribution) for one frame
+
+    Codes are -1 where no ZIP can be read; summing the contributions per
+    code gives the index measures.
+    """
+    codes = zip5_codes(df[zip_col])
+
+    def numeric(name):
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+        return np.full(len(df), np.nan)
+
+    # Compare on the column itself; no per-row object array
+    if 'SLA Status' in df.columns:
+        sla_known = df['SLA Status'].notna().to_numpy()
+        sla_miss = (df['SLA Status'] == 'SLA Miss').to_numpy(dtype=bool, na_value=False)
+    else:
+        sla_known = sla_miss = np.zeros(len(df), dtype=bool)
+    transit = numeric('Days In Transit')
+    cost = numeric('Cost')
+    return codes, {
+        'rows': np.ones(len(df)),
+        'sla_n': sla_known,
+        'misses': sla_miss,
+        'transit_n': ~np.isnan(transit),
+        'transit_sum': np.nan_to_num(transit),
+        'cost_n': ~np.isnan(cost),
+        'cost_sum': np.nan_to_num(cost)
+    }
+
+def _zip_measures(df, zip_col, weights=None):
+    """Per-slot measure arrays for one frame, one np.bincount each"""
+    codes, contributions = zip_row_measures(df, zip_col)
+    valid = codes >= 0
+    if weights is None:
+        return {name: np.bincount(codes[valid], weights=values[valid], minlength=ZIP5_SLOTS)
+                for name, values in contributions.items()}
+    weights = np.asarray(weights, dtype=float)[valid]
+    measures = {name: np.bincount(codes[valid], weights=values[valid] * weights, minlength=ZIP5_SLOTS)
+                for name, values in contributions.items()}
+    # Weighted counts are rounded rather than truncated into the uint32 slots
+    for name, dtype in ZIP_INDEX_MEASURES.items():
+        if dtype == np.uint32:
+            measures[name] = np.rint(measures[name])
+    return measures
+
+def update_zip_index(index, df, source_id=None, weights=None):
+    """Add one upload's shipments to index in place
+
+    Uploads already recorded under source_id are skipped, so re-uploading
+    the same file does not double count it. weights, when given, is the
+    number of shipments each row stands for.
+    """
+    if source_id is not None and source_id in index['sources']:
+        return index
+    zip_col = find_zip_column(df) if df is not None else None
+    if zip_col is not None and len(df):
+        for name, values in _zip_measures(df, zip_col, weights).items():
+            index[name] += values.astype(ZIP_INDEX_MEASURES[name])
+    if source_id is not None:
+        index['sources'].append(source_id)
+    return index
+
+def build_zip_index(df, weights=None):
+    return update_zip_index(empty_zip_index(), df, weights=weights)
+
+def merge_zip_indexes(indexes):
+    merged = empty_zip_index()
+    for index in indexes:
+        for name in ZIP_INDEX_MEASURES:
+            merged[name] += index[name]
+        merged['sources'].extend(source for source in index['sources'] if source not in merged['sources'])
+    return merged
+
+def save_zip_index(index, path):
+    """Persist the index as a compressed .npz file"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(path, sources=np.asarray(index['sources'], dtype=str),
+                        **{name: index[name] for name in ZIP_INDEX_MEASURES})
+
+def load_zip_index(path):
+    """Load a saved index, or an empty one when the file does not exist"""
+    if not os.path.exists(path):
+        return empty_zip_index()
+    with np.load(path) as saved:
+        index = {name: saved[name].astype(dtype) for name, dtype in ZIP_INDEX_MEASURES.items()}
+        index['sources'] = saved['sources'].tolist()
+    return index
+
+# ----------------------
+# Table form (for results, exports and batch merging)
+# ----------------------
+def zip_index_frame(index):
+    """Occupied ZIPs as a table of raw measures, sorted by ZIP"""
+    occupied = np.flatnonzero(index['rows'])
+    frame = pd.DataFrame({'ZIP': format_zip5(occupied)})
+    for name, dtype in ZIP_INDEX_MEASURES.items():
+        frame[name] = index[name][occupied].astype(np.int64 if dtype == np.uint32 else np.float64)
+    return frame
+
+def zip_index_from_frame(frame):
+    """Rebuild the slot arrays from zip_index_frame output (e.g. merged batch partials)"""
+    index = empty_zip_index()
+    if frame is None or frame.empty:
+        return index
+    slots = zip5_codes(frame['ZIP'])
+    valid = slots >= 0
+    for name, dtype in ZIP_INDEX_MEASURES.items():
+        np.add.at(index[name], slots[valid], frame[name].to_numpy()[valid].astype(dtype))
+    return index
+
+def zip_index_from_groups(zips, measures):
+    """Index from per-value measure sums, e.g. a SQL or Polars group-by on the ZIP column
+
+    Each distinct ZIP value is parsed once; values sharing a ZIP5 are added up.
+    """
+    index = empty_zip_index()
+    codes = zip5_codes(zips)
+    valid = codes >= 0
+    for name, dtype in ZIP_INDEX_MEASURES.items():
+        weights = np.asarray(measures[name], dtype=float)[valid]
+        index[name] += np.bincount(codes[valid], weights=weights, minlength=len(index[name])).astype(dtype)
+    return index
+
+# ----------------------
+# Queries
+# ----------------------
+def _summarize(label, rows, sla_n, misses, transit_n, transit_sum, cost_n, cost_sum):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            label[0]: label[1],
+            'Shipments': rows.astype(np.int64),
+            'SLA Misses': misses.astype(np.int64),
+            'Miss Rate %': np.where(sla_n > 0, misses / np.maximum(sla_n, 1) * 100, 0).round(1),
+            'Avg Transit Days': np.where(transit_n > 0, transit_sum / np.maximum(transit_n, 1), np.nan).round(2),
+            'Avg Cost': np.where(cost_n > 0, cost_sum / np.maximum(cost_n, 1), np.nan).round(2)
+        })
+
+def zip_lookup(index, zip_code):
+    """Stats for one ZIP5 (O(1)); None for unknown or unseen ZIPs"""
+    code = zip5_codes([zip_code])[0]
+    if code < 0 or index['rows'][code] == 0:
+        return None
+    values = {name: index[name][code:code + 1] for name in ZIP_INDEX_MEASURES}
+    return _summarize(('ZIP', format_zip5([code])), **values).iloc[0].to_dict()
+
+def top_zips(index, n=10, by='misses'):
+    """Top n ZIP5s by a measure; ties go to the lower ZIP"""
+    values = index[by]
+    candidates = np.flatnonzero(values)
+    if len(candidates) > n:
+        # Keep everything tied with the n-th value so the tie-break is exact
+        kth = np.partition(values[candidates], len(candidates) - n)[len(candidates) - n]
+        candidates = candidates[values[candidates] >= kth]
+    order = np.lexsort((candidates, -values[candidates].astype(np.int64)))
+    slots = candidates[order][:n]
+    return _summarize(('ZIP', format_zip5(slots)), **{name: index[name][slots] for name in ZIP_INDEX_MEASURES})
+
+def zip3_rollup(index):
+    """Per-ZIP3 totals from one reshape of the ZIP5 arrays (for heatmaps)"""
+    totals = {name: index[name].reshape(ZIP3_SLOTS, -1).sum(axis=1) for name in ZIP_INDEX_MEASURES}
+    occupied = np.flatnonzero(totals['rows'])
+    prefixes = np.char.zfill(occupied.astype(str), 3)
+    return _summarize(('ZIP3', prefixes), **{name: values[occupied] for name, values in totals.items()})
+
+def zip3_detail(index, prefix):
+    """ZIP5 rows inside one ZIP3 prefix; reads only that prefix's 100 slots"""
+    prefix = int(prefix)
+    slots = np.arange(prefix * 100, prefix * 100 + 100)
+    slots = slots[index['rows'][slots] > 0]
+    return _summarize(('ZIP', format_zip5(slots)), **{name: index[name][slots] for name in ZIP_INDEX_MEASURES})
@@ -0,0 +1,141 @@
+# zone_inference.py - Offline ZIP3-to-ZIP3 shipping zone lookup
+# A 1000x1000 uint8 matrix of zones (origin ZIP3 x destination ZIP3) is built
+# once from the bundled ZIP3 centroid table and the ZONE_DEFINITIONS mile
+# bands, saved next to it, and memory-mapped at runtime, so filling a missing
+# Calculated Zone is a single fancy-indexing lookup per batch of rows.
+#
+# Rebuild the matrix after editing data/zip3_centroids.csv:
+#   python zone_inference.py
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from zip_index import ZIP3_SLOTS, zip5_codes
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+ZIP3_CENTROIDS_PATH = os.path.join(DATA_DIR, 'zip3_centroids.csv')
+ZONE_MATRIX_PATH = os.path.join(DATA_DIR, 'zip3_zones.npy')
+
+# Origin used when a report has no origin ZIP column (e.g. the customer's warehouse)
+DEFAULT_ORIGIN_ZIP = os.environ.get('TRANSITIQ_ORIGIN_ZIP')
+
+EARTH_RADIUS_MILES = 3958.8
+UNKNOWN_ZONE = 0
+
+_zone_matrix = None
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles; broadcasts over NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def zone_mile_bands(zone_definitions):
+    """Upper mile bound of each zone but the last, e.g. [50, 150, ..., 1800]"""
+    bounds = []
+    for zone in sorted(zone_definitions, key=int):
+        upper = re.findall(r'\d+', zone_definitions[zone]['miles'])
+        if '-' in zone_definitions[zone]['miles']:
+            bounds.append(float(upper[-1]))
+    return np.array(bounds)
+
+def load_zip3_centroids(path=ZIP3_CENTROIDS_PATH):
+    """One row per ZIP3 prefix (zip3, state, city, lat, lon) from the ranged table"""
+    ranges = pd.read_csv(path, dtype={'zip3_start': str, 'zip3_end': str})
+    starts = ranges['zip3_start'].astype(int).to_numpy()
+    ends = ranges['zip3_end'].astype(int).to_numpy()
+    repeat = ends - starts + 1
+    table = ranges.loc[ranges.index.repeat(repeat), ['state', 'city', 'lat', 'lon']].reset_index(drop=True)
+    table.insert(0, 'zip3', np.concatenate([np.arange(s, e + 1) for s, e in zip(starts, ends)]))
+    return table
+
+def centroid_arrays(path=ZIP3_CENTROIDS_PATH):
+    """Latitude/longitude per ZIP3 slot (NaN for unassigned prefixes)"""
+    table = load_zip3_centroids(path)
+    lat = np.full(ZIP3_SLOTS, np.nan)
+    lon = np.full(ZIP3_SLOTS, np.nan)
+    lat[table['zip3']] = table['lat']
+    lon[table['zip3']] = table['lon']
+    return lat, lon
+
+def build_zone_matrix(centroids_path=ZIP3_CENTROIDS_PATH, output_path=ZONE_MATRIX_PATH, zone_definitions=None):
+    """Compute and save the origin x destination zone matrix (0 = unknown prefix)"""
+    if zone_definitions is None:
+        from dashboard_imports import ZONE_DEFINITIONS
+        zone_definitions = ZONE_DEFINITIONS
+
+    lat, lon = centroid_arrays(centroids_path)
+    miles = haversine_miles(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    zones = np.searchsorted(zone_mile_bands(zone_definitions), miles, side='left') + 1
+    matrix = np.where(np.isnan(miles), UNKNOWN_ZONE, zones).astype(np.uint8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    np.save(output_path, matrix)
+    return matrix
+
+def load_zone_matrix(path=ZONE_MATRIX_PATH):
+    """Memory-mapped zone matrix, built on first use if the file is missing"""
+    global _zone_matrix
+    if _zone_matrix is None or path != ZONE_MATRIX_PATH:
+        if not os.path.exists(path):
+            build_zone_matrix(output_path=path)
+        matrix = np.load(path, mmap_mode='r')
+        if path != ZONE_MATRIX_PATH:
+            return matrix
+        _zone_matrix = matrix
+    return _zone_matrix
+
+def zip3_codes(values):
+    """Integer ZIP3 prefixes for a column of ZIPs; -1 where no ZIP can be read"""
+    codes = zip5_codes(values)
+    return np.where(codes >= 0, codes // 100, -1)
+
+def infer_zones(origin_zips, destination_zips):
+    """Zones (uint8, 0 = unknown) for origin/destination ZIPs
+
+    origin_zips may be a single ZIP or one per destination.
+    """
+    destination = zip3_codes(destination_zips)
+    if np.ndim(origin_zips) == 0:
+        origin = np.full(len(destination), zip3_codes([origin_zips])[0])
+    else:
+        origin = zip3_codes(origin_zips)
+    valid = (origin >= 0) & (destination >= 0)
+    zones = np.zeros(len(destination), dtype=np.uint8)
+    zones[valid] = load_zone_matrix()[origin[valid], destination[valid]]
+    return zones
+
+def find_origin_zip_column(df):
+    for col in df.columns:
+        name = col.lower()
+        if ('zip' in name or 'postal' in name) and any(word in name for word in ('origin', 'from', 'shipper', 'sender')):
+            return col
+    return None
+
+def infer_zone_column(df, origin_zip=None):
+    """Calculated Zone strings ('1'-'8', NaN where unknown) for a frame, or None
+
+    Uses an origin ZIP column when the report has one, otherwise origin_zip
+    or TRANSITIQ_ORIGIN_ZIP. Returns None without an origin or a destination ZIP.
+    """
+    if 'Destination ZIP' not in df.columns:
+        return None
+    origin_col = find_origin_zip_column(df)
+    origin = df[origin_col] if origin_col is not None else (origin_zip or DEFAULT_ORIGIN_ZIP)
+    if origin is None:
+        return None
+
+    zones = infer_zones(origin, df['Destination ZIP'])
+    labels = np.array([None] + [str(zone) for zone in range(1, 256)], dtype=object)
+    return pd.Series(labels[zones], index=df.index, dtype=object)
+
+if __name__ == "__main__":
+    matrix = build_zone_matrix()
+    known = matrix[matrix > 0]
+    print(f"Wrote {ZONE_MATRIX_PATH}: {matrix.shape[0]}x{matrix.shape[1]} uint8, "
+          f"{len(known):,} known ZIP3 pairs")
+    print("Pairs per zone:", {int(zone): int((known == zone).sum()) for zone in np.unique(known)})